@@ -1,21 +1,95 @@
+import json
 import uuid
+import asyncio
+import geo
+import cache
+import facets
+import listing
+import warmup
+import metrics
+import profiling
 
-from database import get_db
+from auth import issue_token, require_admin, session_user_id
+from database import (
+    engine, open_session, session_scope, pipeline, publish_invalidation, slow_queries,
+    register_invalidation_handler, FLUSH_ALL, db_breaker, is_database_outage, DatabaseUnavailable,
+    Deadline, DeadlineExceeded, request_deadline, sqlstate, QUERY_CANCELED, LOCK_NOT_AVAILABLE
+)
 from decimal import Decimal
 from settings import settings
-from typing import List, Optional
-from pydantic import BaseModel, Field
-from sqlalchemy import and_, or_, func
-from datetime import datetime, timedelta
+from collections import namedtuple
+from seat_map import (
+    negotiate_format, encode_columnar, pack_msgpack,
+    FORMAT_JSON, FORMAT_COLUMNAR, FORMAT_MSGPACK, COLUMNAR_MEDIA_TYPE, MSGPACK_MEDIA_TYPE
+)
+from typing import Any, Dict, List, Optional, Union
+from pydantic import BaseModel, Field, TypeAdapter, ValidationError
+from sqlalchemy import and_, or_, func, insert, update
+from datetime import datetime, timedelta, date as date_type
 from sqlalchemy.orm import Session, joinedload
-from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.pool import StaticPool
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, Response
+from fastapi.concurrency import run_in_threadpool
+from singleflight import SingleFlight, request_key
+from response_cache import ResponseCache
+from microbatch import MicroBatcher
+from inventory_engine import InventoryEngine
+from schedule_generator import WEEKDAYS, generate_schedules, occurrences, parse_showtimes, parse_weekdays
 from models import (
-    Event, Schedule, ScheduleSeat, Seat, Section, Venue, User, Booking, 
+    Event, Schedule, ScheduleSeat, ScheduleInventory, Seat, Section, Venue, User, Booking, 
     BookingSeat, Payment, EventSeat, EventType, SeatStatus, BookingStatus, 
     PaymentStatus, PaymentMethod
 )
 
 
+# Request deadlines -------------------------------------------------------------------------------------------
+
+DISCONNECT_POLL_INTERVAL = 0.25
+
+async def watch_disconnect(request: Request, deadline: Deadline):
+    while True:
+        await asyncio.sleep(DISCONNECT_POLL_INTERVAL)
+        if await request.is_disconnected():
+            deadline.cancel()
+            return
+
+async def enforce_deadline(request: Request):
+    """
+    Give the request its route's budget (see database.Deadline) and cancel its queries if the client leaves.
+    Only routes that query the database take it (through get_db, or dependencies= for the render routes),
+    so /health, /metrics and the stats routes don't start a disconnect poller.
+    """
+    route = request.scope.get("route")
+    budget = settings.ROUTE_BUDGETS_MS.get(f"{request.method} {route.path}", settings.REQUEST_BUDGET_MS)
+    deadline = Deadline(budget, settings.LOCK_TIMEOUT_MS)
+    request_deadline.set(deadline)
+    watcher = asyncio.ensure_future(watch_disconnect(request, deadline))
+    try:
+        yield deadline
+    finally:
+        watcher.cancel()
+
+def failure_response(e: Exception) -> HTTPException:
+    """The HTTPException for a failed request: timeouts become 503 and lock timeouts 409 instead of 500."""
+    if isinstance(e, HTTPException):
+        return e
+    if isinstance(e, DeadlineExceeded):
+        return HTTPException(status_code=503, detail=str(e))
+    code = sqlstate(e)
+    if code == LOCK_NOT_AVAILABLE:
+        return HTTPException(status_code=409, detail="Seats are held by another request, try again")
+    if code == QUERY_CANCELED:
+        return HTTPException(status_code=503, detail="Request deadline exceeded")
+    if is_database_outage(e):
+        return HTTPException(status_code=503, detail="Database unavailable")
+    return HTTPException(status_code=500, detail=str(e))
+
+
+def get_db(deadline: Deadline = Depends(enforce_deadline)):
+    yield from open_session(deadline)
+
+
 router = APIRouter()
 
 
@@ -49,14 +123,76 @@ async def test_api():
         },
     }
 
+@router.get("/test/slow-queries")
+async def get_slow_queries(limit: int = Query(50, ge=1, description="Most recent entries to return")):
+    if settings.is_production:
+        return {"error": "Slow-query log not available in production"}
+    
+    entries = list(slow_queries)[-limit:]
+    return {
+        "threshold_ms": settings.SLOW_QUERY_MS,
+        "explain_sample": settings.SLOW_QUERY_EXPLAIN_SAMPLE,
+        "count": len(entries),
+        "queries": entries[::-1]
+    }
+
+@router.post("/test/tracemalloc/start")
+async def start_tracemalloc(frames: int = Query(10, ge=1, description="Stack frames kept per allocation")):
+    if settings.is_production:
+        return {"error": "Memory tracing not available in production"}
+    
+    profiling.start_tracing(frames)
+    return {"status": "success", "message": "tracemalloc started", "frames": frames}
+
+@router.get("/test/tracemalloc/snapshot")
+async def tracemalloc_snapshot(
+    limit: int = Query(25, ge=1, description="Allocation sites to return"),
+    group_by: str = Query("lineno", pattern="^(lineno|filename|traceback)$")
+):
+    if settings.is_production:
+        return {"error": "Memory tracing not available in production"}
+    if not profiling.tracemalloc.is_tracing():
+        raise HTTPException(status_code=400, detail="tracemalloc is not running; POST /test/tracemalloc/start first")
+    
+    return profiling.snapshot_report(limit, group_by)
+
+@router.post("/test/tracemalloc/stop")
+async def stop_tracemalloc():
+    if settings.is_production:
+        return {"error": "Memory tracing not available in production"}
+    
+    profiling.stop_tracing()
+    return {"status": "success", "message": "tracemalloc stopped"}
+
+# Internal stats endpoints are admin only (require_admin); /metrics is the public surface
+@router.get("/cache/stats", dependencies=[Depends(require_admin)])
+async def get_cache_stats():
+    return {**cache.cache_stats(), "responses": response_cache.stats(), "db_circuit": db_breaker.stats()}
+
+@router.get("/singleflight/stats", dependencies=[Depends(require_admin)])
+async def get_singleflight_stats():
+    return read_flight.stats()
+
+@router.get("/metrics")
+async def get_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
 # Health check -------------------------------------------------------------------------------------------
 @router.get("/health")
 async def health_check():
-    """Health check endpoint"""
+    """Health check endpoint; reports 503 until the startup warm-up has finished"""
+    if not warmup.state["ready"]:
+        return JSONResponse(status_code=503, content={
+            "status": "warming_up",
+            "service": "Epicly Event Booking System",
+            "version": "1.0.0"
+        })
+    
     return {
         "status": "healthy",
         "service": "Epicly Event Booking System",
-        "version": "1.0.0"
+        "version": "1.0.0",
+        "warmup_ms": warmup.state["duration_ms"]
     }
 
 # ----------------------------------------------------------------------------------------------------------------------------------------------------------------------
@@ -77,15 +213,24 @@ class EventResponse(BaseModel):
     class Config:
         from_attributes = True
 
-@router.get("/events", response_model=List[EventResponse])
-async def get_events(
-    type: Optional[str] = Query(None, description="Filter by event type"),
-    language: Optional[str] = Query(None, description="Filter by language"),
-    genre: Optional[str] = Query(None, description="Filter by genre"),
-    city: Optional[str] = Query(None, description="Filter by city"),
-    date: Optional[str] = Query(None, description="Filter by date (YYYY-MM-DD)"),
-    db: Session = Depends(get_db)
+def fetch_events(
+    db: Session,
+    type: Optional[str] = None,
+    language: Optional[str] = None,
+    genre: Optional[str] = None,
+    city: Optional[str] = None,
+    date: Optional[str] = None
 ):
+    if city and date:
+        listed = listing.events_by_city_and_day(db, city, date)
+        if listed is not None:
+            return [
+                event for event in listed
+                if (not type or event.event_type == type.upper())
+                and (not language or language.lower() in (event.language or "").lower())
+                and (not genre or genre.lower() in (event.genre or "").lower())
+            ]
+    
     query = db.query(Event)
     
     if type:
@@ -106,12 +251,110 @@ async def get_events(
             except ValueError:
                 raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
     
-    events = query.distinct().all()
-    return events
+    return query.distinct().all()
+
+class EventFacetsResponse(BaseModel):
+    events: List[EventResponse]
+    facets: Dict[str, Dict[str, int]]
+
+@router.get("/events", response_model=Union[List[EventResponse], EventFacetsResponse], dependencies=[Depends(enforce_deadline)])
+async def get_events(
+    request: Request,
+    type: Optional[str] = Query(None, description="Filter by event type"),
+    language: Optional[str] = Query(None, description="Filter by language"),
+    genre: Optional[str] = Query(None, description="Filter by genre"),
+    city: Optional[str] = Query(None, description="Filter by city"),
+    date: Optional[str] = Query(None, description="Filter by date (YYYY-MM-DD)"),
+    include_facets: bool = Query(False, alias="facets", description="Also return per-facet counts of events with upcoming schedules")
+):
+    return await cached_response(request, render_events, type, language, genre, city, date, include_facets)
+
+def render_events(type, language, genre, city, date, include_facets: bool):
+    with session_scope(request_deadline.get()) as db:
+        events = event_list_adapter.validate_python(fetch_events(db, type, language, genre, city, date))
+        if not include_facets:
+            return event_list_adapter.dump_json(events), "application/json"
+        counts = facets.facet_counts(db, event_type=type, genre=genre, language=language, city=city, date=date)
+    
+    return EventFacetsResponse(events=events, facets=counts).model_dump_json().encode(), "application/json"
 
-@router.get("/events/{event_id}", response_model=EventResponse)
-async def get_event_details(event_id: int, db: Session = Depends(get_db)):
-    event = db.query(Event).filter(Event.event_id == event_id).first()
+class NearbyScheduleResponse(BaseModel):
+    schedule_id: int
+    event_id: int
+    event_title: str
+    event_type: str
+    venue_id: int
+    venue_name: str
+    city: Optional[str]
+    section_id: int
+    section_name: str
+    start_time: datetime
+    end_time: datetime
+    distance_km: float
+
+def fetch_nearby_schedules(db: Session, lat: float, lon: float, radius: float, date: Optional[str], limit: int):
+    """Venues within radius from the in-process grid, then their upcoming schedules in one query."""
+    distances = dict(geo.nearby_venues(db, lat, lon, radius))
+    if not distances:
+        return []
+    
+    query = db.query(Schedule).filter(
+        Schedule.venue_id.in_(distances),
+        Schedule.start_time > datetime.now()
+    )
+    
+    if date:
+        try:
+            day_start = datetime.strptime(date, "%Y-%m-%d")
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
+        # A range rather than func.date() so the (venue_id, start_time) index is usable
+        query = query.filter(Schedule.start_time >= day_start, Schedule.start_time < day_start + timedelta(days=1))
+    
+    response = []
+    for schedule in query.order_by(Schedule.start_time).limit(limit).all():
+        event = cache.get_event(db, schedule.event_id)
+        venue = cache.get_venue(db, schedule.venue_id)
+        section = cache.get_section(db, schedule.section_id)
+        response.append({
+            "schedule_id": schedule.schedule_id,
+            "event_id": schedule.event_id,
+            "event_title": event.title,
+            "event_type": event.event_type,
+            "venue_id": schedule.venue_id,
+            "venue_name": venue.name,
+            "city": venue.city,
+            "section_id": schedule.section_id,
+            "section_name": section.name,
+            "start_time": schedule.start_time,
+            "end_time": schedule.end_time,
+            "distance_km": round(distances[schedule.venue_id], 2)
+        })
+    
+    return response
+
+# Declared before /events/{event_id} so "nearby" isn't parsed as an event id
+@router.get("/events/nearby", response_model=List[NearbyScheduleResponse])
+async def get_nearby_events(
+    lat: float = Query(..., ge=-90, le=90, description="Latitude"),
+    lon: float = Query(..., ge=-180, le=180, description="Longitude"),
+    radius: float = Query(10, gt=0, le=100, description="Search radius in km"),
+    date: Optional[str] = Query(None, description="Filter by date (YYYY-MM-DD)"),
+    limit: int = Query(100, ge=1, le=500, description="Maximum schedules returned"),
+    db: Session = Depends(get_db)
+):
+    return fetch_nearby_schedules(db, lat, lon, radius, date, limit)
+
+@router.get("/events/{event_id}", response_model=EventResponse, dependencies=[Depends(enforce_deadline)])
+async def get_event_details(event_id: int, request: Request):
+    return await cached_response(request, render_event, event_id)
+
+def render_event(event_id: int):
+    with session_scope(request_deadline.get()) as db:
+        return EventResponse.model_validate(fetch_event(db, event_id)).model_dump_json().encode(), "application/json"
+
+def fetch_event(db: Session, event_id: int):
+    event = cache.get_event(db, event_id)
     if not event:
         raise HTTPException(status_code=404, detail="Event not found")
     return event
@@ -145,23 +388,109 @@ class SeatResponse(BaseModel):
         from_attributes = True
 
 
-@router.get("/events/{event_id}/schedules", response_model=List[ScheduleResponse])
-async def get_event_schedules(
-    event_id: int,
-    date: Optional[str] = Query(None, description="Filter by date (YYYY-MM-DD)"),
-    venue: Optional[str] = Query(None, description="Filter by venue name"),
-    city: Optional[str] = Query(None, description="Filter by city"),
-    db: Session = Depends(get_db)
-):
-    event = db.query(Event).filter(Event.event_id == event_id).first()
+event_list_adapter = TypeAdapter(List[EventResponse])
+schedule_list_adapter = TypeAdapter(List[ScheduleResponse])
+seat_list_adapter = TypeAdapter(List[SeatResponse])
+
+read_flight = SingleFlight(settings.SINGLEFLIGHT_WAIT_TIMEOUT)
+
+@metrics.register_collector
+def _singleflight_metrics():
+    stats = read_flight.stats()
+    return [
+        ("epicly_singleflight_requests_total", "counter", "Coalescable read requests", [({}, stats["requests"])]),
+        ("epicly_singleflight_executions_total", "counter", "Reads actually executed", [({}, stats["executions"])]),
+        ("epicly_singleflight_timeouts_total", "counter", "Waits that hit the timeout", [({}, stats["timeouts"])]),
+    ]
+
+def profiled(request: Request) -> bool:
+    # Same condition as ProfilingMiddleware, which main.py only installs outside production
+    return not settings.is_production and profiling.profile_requested(request.scope)
+
+async def render_in_flight(key, render, *args):
+    """
+    render(*args) in the threadpool, shared by identical concurrent reads. Renders open their
+    session with request_deadline, so the flight runs under the deadline of the request that
+    started it; if that client disconnects, the requests that only joined it render again under
+    their own deadline.
+    """
+    async def flight():
+        started_by = request_deadline.get()
+        try:
+            return await run_in_threadpool(render, *args)
+        except Exception as e:
+            if started_by is not None and started_by.cancelled:
+                raise DeadlineExceeded("Client disconnected") from e
+            raise
+    
+    try:
+        return await read_flight.do(key, flight)
+    except DeadlineExceeded:
+        deadline = request_deadline.get()
+        if deadline is None or deadline.cancelled or deadline.remaining_ms() <= 0:
+            raise
+        return await read_flight.do(key, flight)
+
+async def coalesced_response(request: Request, render, *args, key_extra=()):
+    """Serve identical concurrent reads from one in-flight render(*args) -> (body, media_type)."""
+    if profiled(request):
+        # Profile this request's own render, not someone else's flight
+        body, media_type = await run_in_threadpool(render, *args)
+        return Response(body, media_type=media_type)
+    try:
+        body, media_type = await render_in_flight(request_key(request, *key_extra), render, *args)
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=503, detail="Timed out waiting for an identical in-flight request")
+    return Response(body, media_type=media_type)
+
+# Catalog reads that may be served stale (see response_cache.py); writes never go through this
+response_cache = ResponseCache(
+    settings.RESPONSE_CACHE_TTL,
+    settings.RESPONSE_STALE_TTL,
+    settings.RESPONSE_CACHE_MAXSIZE,
+    available=db_breaker.ready
+)
+
+@register_invalidation_handler
+def _expire_responses(entity: str, key):
+    if entity in (FLUSH_ALL, "event", "schedule", "venue"):
+        response_cache.invalidate_all()
+
+async def cached_response(request: Request, render, *args, key_extra=()):
+    """coalesced_response through the response cache; X-Cache is HIT, MISS or STALE (with Age)."""
+    if profiled(request):
+        # A cache hit would profile nothing; render without reading or filling the cache
+        body, media_type = await run_in_threadpool(render, *args)
+        return Response(body, media_type=media_type, headers={"X-Cache": "BYPASS"})
+    key = request_key(request, *key_extra)
+    try:
+        served = await response_cache.serve(key, lambda: render_in_flight(key, render, *args))
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=503, detail="Timed out waiting for an identical in-flight request")
+    except DatabaseUnavailable:
+        raise
+    except Exception as e:
+        if is_database_outage(e):
+            raise HTTPException(status_code=503, detail="Database unavailable and no cached response")
+        raise
+    
+    headers = {"X-Cache": served.status}
+    if served.status == "STALE":
+        headers["Age"] = str(int(served.age))
+    return Response(served.body, media_type=served.media_type, headers=headers)
+
+def dump_json(payload) -> bytes:
+    # Same encoding as starlette's JSONResponse
+    return json.dumps(payload, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+
+def fetch_event_schedules(db: Session, event_id: int, date: Optional[str], venue: Optional[str], city: Optional[str]):
+    event = cache.get_event(db, event_id)
     
     if not event:
         raise HTTPException(status_code=404, detail="Event not found")
     
-    query = db.query(Schedule).options(
-        joinedload(Schedule.venue),
-        joinedload(Schedule.section)
-    ).filter(
+    query = db.query(Schedule).filter(
         Schedule.event_id == event_id,
         Schedule.start_time > datetime.now()
     )
@@ -185,6 +514,8 @@ async def get_event_schedules(
     
     response = []
     for schedule in schedules:
+        schedule_venue = cache.get_venue(db, schedule.venue_id)
+        schedule_section = cache.get_section(db, schedule.section_id)
         response.append({
             "schedule_id": schedule.schedule_id,
             "event_id": schedule.event_id,
@@ -192,33 +523,59 @@ async def get_event_schedules(
             "section_id": schedule.section_id,
             "start_time": schedule.start_time,
             "end_time": schedule.end_time,
-            "venue_name": schedule.venue.name,
-            "section_name": schedule.section.name,
-            "city": schedule.venue.city
+            "venue_name": schedule_venue.name,
+            "section_name": schedule_section.name,
+            "city": schedule_venue.city
         })
     
     return response
 
-@router.get("/schedules/{schedule_id}/seats", response_model=List[SeatResponse])
-async def get_schedule_seats(schedule_id: int, db: Session = Depends(get_db)):
-    schedule = db.query(Schedule).filter(Schedule.schedule_id == schedule_id).first()
+def render_event_schedules(event_id: int, date: Optional[str], venue: Optional[str], city: Optional[str]):
+    with session_scope(request_deadline.get()) as db:
+        response = fetch_event_schedules(db, event_id, date, venue, city)
+    return schedule_list_adapter.dump_json(schedule_list_adapter.validate_python(response)), "application/json"
+
+@router.get("/events/{event_id}/schedules", response_model=List[ScheduleResponse], dependencies=[Depends(enforce_deadline)])
+async def get_event_schedules(
+    event_id: int,
+    request: Request,
+    date: Optional[str] = Query(None, description="Filter by date (YYYY-MM-DD)"),
+    venue: Optional[str] = Query(None, description="Filter by venue name"),
+    city: Optional[str] = Query(None, description="Filter by city")
+):
+    return await cached_response(request, render_event_schedules, event_id, date, venue, city)
+
+SeatMapRow = namedtuple("SeatMapRow", "seat_id row_label seat_number seat_type base_price status")
+
+def fetch_schedule_seats(db: Session, schedule_id: int):
+    """Cached section layout + this schedule's seat statuses, in (row_label, seat_number) order."""
+    schedule = cache.get_schedule(db, schedule_id)
     if not schedule:
-        raise HTTPException(status_code=404, detail="Schedule not found")
+        return []
     
-    seats_query = db.query(
-        Seat.seat_id,
-        Seat.row_label,
-        Seat.seat_number,
-        Seat.seat_type,
-        Seat.base_price,
-        ScheduleSeat.status
-    ).join(
-        ScheduleSeat, Seat.seat_id == ScheduleSeat.seat_id
-    ).filter(
-        ScheduleSeat.schedule_id == schedule_id
-    ).order_by(Seat.row_label, Seat.seat_number)
-    
-    seats = seats_query.all()
+    layout = cache.get_section_layout(db, schedule.section_id)
+    statuses = dict(db.query(ScheduleSeat.seat_id, ScheduleSeat.status).filter(
+        ScheduleSeat.schedule_id == schedule_id,
+        ScheduleSeat.schedule_start == schedule.start_time
+    ).all())
+    
+    if seat_inventory is not None:
+        statuses.update(seat_inventory.statuses(schedule_id) or {})
+    
+    return [SeatMapRow(*seat, statuses[seat.seat_id]) for seat in layout if seat.seat_id in statuses]
+
+def render_schedule_seats(schedule_id: int, seat_map_format: str):
+    with session_scope(request_deadline.get()) as db:
+        schedule = cache.get_schedule(db, schedule_id)
+        if not schedule:
+            raise HTTPException(status_code=404, detail="Schedule not found")
+        
+        seats = fetch_schedule_seats(db, schedule_id)
+    
+    if seat_map_format == FORMAT_COLUMNAR:
+        return dump_json(encode_columnar(seats)), COLUMNAR_MEDIA_TYPE
+    if seat_map_format == FORMAT_MSGPACK:
+        return pack_msgpack(encode_columnar(seats)), MSGPACK_MEDIA_TYPE
     
     response = []
     for seat in seats:
@@ -231,43 +588,362 @@ async def get_schedule_seats(schedule_id: int, db: Session = Depends(get_db)):
             "status": seat.status
         })
     
-    return response
+    return seat_list_adapter.dump_json(seat_list_adapter.validate_python(response)), "application/json"
+
+@router.get("/schedules/{schedule_id}/seats", response_model=List[SeatResponse], dependencies=[Depends(enforce_deadline)])
+async def get_schedule_seats(
+    schedule_id: int,
+    request: Request,
+    format: Optional[str] = Query(None, description="Seat map format: json, columnar or msgpack")
+):
+    try:
+        seat_map_format = negotiate_format(format, request.headers.get("accept"))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return await coalesced_response(
+        request, render_schedule_seats, schedule_id, seat_map_format, key_extra=(seat_map_format,)
+    )
+
+
+# Schedule generation -------------------------------------------------------------------------------------------
+
+class ScheduleRuleRequest(BaseModel):
+    event_id: int
+    section_id: int
+    start_date: date_type
+    end_date: date_type
+    weekdays: List[str] = list(WEEKDAYS)
+    showtimes: List[str]  # "HH:MM"
+    duration: Optional[int] = Field(None, gt=0)  # minutes; defaults to the event's duration
+    dry_run: bool = False
+
+@router.post("/admin/schedules/generate", dependencies=[Depends(require_admin)])
+async def generate_event_schedules(request: ScheduleRuleRequest, db: Session = Depends(get_db)):
+    """Create every schedule of a recurrence rule, with its seat inventory, in one statement."""
+    try:
+        weekdays = parse_weekdays(",".join(request.weekdays))
+        showtimes = parse_showtimes(",".join(request.showtimes))
+        if request.dry_run:
+            return {"start_times": occurrences(request.start_date, request.end_date, weekdays, showtimes)}
+        
+        if db.get_bind().dialect.name != "postgresql":
+            raise HTTPException(status_code=501, detail="Schedule generation needs Postgres")
+        created, start_times, seats = await run_in_threadpool(
+            generate_schedules, db, request.event_id, request.section_id,
+            request.start_date, request.end_date, weekdays, showtimes, request.duration
+        )
+        db.commit()
+    except LookupError as e:
+        db.rollback()
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        db.rollback()
+        if sqlstate(e) == LOCK_NOT_AVAILABLE:
+            raise HTTPException(status_code=409, detail="Schedules are being generated for this section, try again")
+        raise failure_response(e)
+    
+    return {
+        "created": len(created),
+        "skipped_overlapping": len(start_times) - len(created),
+        "schedule_seats": len(created) * seats,
+        "schedules": [{"schedule_id": schedule_id, "start_time": start_time} for schedule_id, start_time in created]
+    }
+
+
+# Batch reads -------------------------------------------------------------------------------------------
+# Several read operations in one HTTP request, under one deadline. A Session is not safe to use
+# from several threads, so each sub-request runs on its own session in the threadpool, up to
+# BATCH_CONCURRENCY at once; each one gets its own status in the keyed result.
+
+MAX_BATCH_SIZE = 10
+
+class BatchItem(BaseModel):
+    op: str
+    params: Dict[str, Any] = Field(default_factory=dict)
+
+class BatchRequest(BaseModel):
+    requests: Dict[str, BatchItem]
+
+# Each op's params are validated (and coerced: "5" becomes 5, so cache keys match the int keys
+# invalidations use) before the op runs; bad params are that item's 400
+
+class BatchParams(BaseModel):
+    class Config:
+        extra = "forbid"
+
+class BatchEventsParams(BatchParams):
+    type: Optional[str] = None
+    language: Optional[str] = None
+    genre: Optional[str] = None
+    city: Optional[str] = None
+    date: Optional[str] = None
+
+class BatchEventParams(BatchParams):
+    event_id: int
+
+class BatchEventSchedulesParams(BatchParams):
+    event_id: int
+    date: Optional[str] = None
+    venue: Optional[str] = None
+    city: Optional[str] = None
+
+class BatchScheduleSeatsParams(BatchParams):
+    schedule_id: int
+    format: str = FORMAT_JSON
+
+def _batch_events(db: Session, **params):
+    return event_list_adapter.dump_python(event_list_adapter.validate_python(fetch_events(db, **params)), mode="json")
+
+def _batch_event(db: Session, event_id: int):
+    return EventResponse.model_validate(fetch_event(db, event_id)).model_dump(mode="json")
+
+def _batch_event_schedules(db: Session, event_id: int, date: Optional[str], venue: Optional[str], city: Optional[str]):
+    response = fetch_event_schedules(db, event_id, date, venue, city)
+    return schedule_list_adapter.dump_python(schedule_list_adapter.validate_python(response), mode="json")
+
+def _batch_schedule_seats(db: Session, schedule_id: int, format: str):
+    if format not in (FORMAT_JSON, FORMAT_COLUMNAR):
+        raise HTTPException(status_code=400, detail="Batch seat maps support the json and columnar formats")
+    if not cache.get_schedule(db, schedule_id):
+        raise HTTPException(status_code=404, detail="Schedule not found")
+    
+    seats = fetch_schedule_seats(db, schedule_id)
+    if format == FORMAT_COLUMNAR:
+        return encode_columnar(seats)
+    return seat_list_adapter.dump_python(seat_list_adapter.validate_python([seat._asdict() for seat in seats]), mode="json")
+
+BATCH_OPERATIONS = {
+    "events": (BatchEventsParams, _batch_events),
+    "event": (BatchEventParams, _batch_event),
+    "event_schedules": (BatchEventSchedulesParams, _batch_event_schedules),
+    "schedule_seats": (BatchScheduleSeatsParams, _batch_schedule_seats),
+}
+
+# With one connection shared by every session (StaticPool: SQLite in memory, development) the reads
+# would only interleave on it, so they run one at a time
+BATCH_CONCURRENCY = 1 if isinstance(engine.pool, StaticPool) else settings.BATCH_CONCURRENCY
+
+def run_batch_item(deadline: Deadline, op: str, params: dict):
+    try:
+        with session_scope(deadline) as db:
+            return {"status": 200, "body": BATCH_OPERATIONS[op][1](db, **params)}
+    except HTTPException as e:
+        return {"status": e.status_code, "error": e.detail}
+    except Exception as e:
+        failure = failure_response(e)
+        return {"status": failure.status_code, "error": failure.detail}
+
+async def run_batch(requests: Dict[str, BatchItem], deadline: Deadline):
+    """Validate every item, then run the valid ones concurrently, each on its own session."""
+    results = {}
+    valid = {}
+    for key, item in requests.items():
+        try:
+            valid[key] = (item.op, BATCH_OPERATIONS[item.op][0].model_validate(item.params).model_dump())
+        except ValidationError as e:
+            results[key] = {"status": 400, "error": f"Invalid params for '{item.op}': {e}"}
+    
+    limit = asyncio.Semaphore(BATCH_CONCURRENCY)
+    
+    async def run(key, op, params):
+        async with limit:
+            results[key] = await run_in_threadpool(run_batch_item, deadline, op, params)
+    
+    await asyncio.gather(*(run(key, op, params) for key, (op, params) in valid.items()))
+    return {key: results[key] for key in requests}
+
+@router.post("/batch")
+async def batch_read(request: BatchRequest, deadline: Deadline = Depends(enforce_deadline)):
+    if len(request.requests) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_SIZE} operations per batch")
+    
+    unknown = sorted({item.op for item in request.requests.values()} - BATCH_OPERATIONS.keys())
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown operations {unknown}; expected one of {sorted(BATCH_OPERATIONS)}"
+        )
+    
+    return {"results": await run_batch(request.requests, deadline)}
+
+
+# General admission -------------------------------------------------------------------------------------------
+# Standing/unnumbered sections sell from a capacity counter instead of per-seat rows: a booking
+# takes tickets with one conditional UPDATE, so concurrent buyers never read-modify-write and
+# the counter can't go below zero.
+
+class InventoryResponse(BaseModel):
+    inventory_id: int
+    schedule_id: int
+    section_id: int
+    tier: str
+    price: Decimal
+    capacity: int
+    available: int
+    
+    class Config:
+        from_attributes = True
+
+def reserve_inventory(db: Session, schedule_id: int, inventory_id: int, quantity: int) -> Decimal:
+    """Take quantity tickets if that many are left; returns the ticket price."""
+    price = db.execute(
+        update(ScheduleInventory)
+        .where(
+            ScheduleInventory.inventory_id == inventory_id,
+            ScheduleInventory.schedule_id == schedule_id,
+            ScheduleInventory.available >= quantity
+        )
+        .values(available=ScheduleInventory.available - quantity, updated_at=datetime.now())
+        .returning(ScheduleInventory.price),
+        execution_options={"synchronize_session": False}
+    ).scalar()
+    
+    if price is None:
+        available = db.query(ScheduleInventory.available).filter(
+            ScheduleInventory.inventory_id == inventory_id,
+            ScheduleInventory.schedule_id == schedule_id
+        ).scalar()
+        if available is None:
+            raise HTTPException(status_code=404, detail="Inventory not found for this schedule")
+        metrics.ga_sold_out.inc()
+        raise HTTPException(status_code=400, detail=f"Only {available} tickets left")
+    return price
+
+def release_inventory(db: Session, inventory_id: int, quantity: int):
+    db.execute(
+        update(ScheduleInventory)
+        .where(ScheduleInventory.inventory_id == inventory_id)
+        .values(available=ScheduleInventory.available + quantity, updated_at=datetime.now()),
+        execution_options={"synchronize_session": False}
+    )
+
+@router.get("/schedules/{schedule_id}/inventory", response_model=List[InventoryResponse])
+async def get_schedule_inventory(schedule_id: int, db: Session = Depends(get_db)):
+    if not cache.get_schedule(db, schedule_id):
+        raise HTTPException(status_code=404, detail="Schedule not found")
+    
+    return db.query(ScheduleInventory).filter(ScheduleInventory.schedule_id == schedule_id).all()
+
+
+# Inventory Engine -------------------------------------------------------------------------------------------
+# With INVENTORY_ENGINE on, seat transitions of the schedules this worker owns go through the
+# in-memory engine instead of schedule_seats rows; see inventory_engine.py.
+
+seat_inventory = InventoryEngine(
+    settings.INVENTORY_WAL_DIR,
+    settings.INVENTORY_FLUSH_INTERVAL_MS / 1000,
+    settings.INVENTORY_SHARD,
+    settings.INVENTORY_SHARDS,
+    settings.INVENTORY_ENGINE_SCHEDULES
+) if settings.INVENTORY_ENGINE else None
+
+def engine_owned(schedule_id: int) -> bool:
+    """Whether the engine serves this schedule's seats; 421 if another worker's shard owns it."""
+    if seat_inventory is None or not seat_inventory.serves(schedule_id):
+        return False
+    if not seat_inventory.owns(schedule_id):
+        raise HTTPException(
+            status_code=421,
+            detail=f"Schedule {schedule_id} is served by inventory shard {seat_inventory.owner_shard(schedule_id)}"
+        )
+    return True
+
+@router.get("/inventory/stats", dependencies=[Depends(require_admin)])
+async def get_inventory_engine_stats():
+    if seat_inventory is None:
+        return {"enabled": False}
+    return {"enabled": True, **seat_inventory.stats()}
 
 
 # Seat Locking -------------------------------------------------------------------------------------------
+# All locks go through lock_seat_batch: requests are resolved against each other in arrival order
+# and the winners applied with one bulk UPDATE in one transaction. Without LOCK_BATCHING each
+# request is a batch of one; with it, concurrent requests for a schedule are group-committed.
 
 class SeatLockRequest(BaseModel):
     schedule_id: int
     seat_ids: List[int]
 
+SeatLockResult = namedtuple("SeatLockResult", "locked not_found unavailable")
+
+def lock_seat_batch(db: Session, schedule, requests: List[List[int]]) -> List[SeatLockResult]:
+    wanted = {seat_id for seat_ids in requests for seat_id in seat_ids}
+    seats = {
+        seat_id: [schedule_seat_id, status]
+        for schedule_seat_id, seat_id, status in db.query(
+            ScheduleSeat.schedule_seat_id, ScheduleSeat.seat_id, ScheduleSeat.status
+        ).filter(
+            ScheduleSeat.schedule_id == schedule.schedule_id,
+            ScheduleSeat.schedule_start == schedule.start_time,
+            ScheduleSeat.seat_id.in_(wanted)
+        ).with_for_update()
+    }
+    
+    results = []
+    to_block = []
+    for seat_ids in requests:
+        if len(set(seat_ids)) != len(seat_ids) or any(seat_id not in seats for seat_id in seat_ids):
+            results.append(SeatLockResult(False, True, []))
+            continue
+        
+        unavailable = [seat_id for seat_id in seat_ids if seats[seat_id][1] != SeatStatus.AVAILABLE]
+        if unavailable:
+            results.append(SeatLockResult(False, False, unavailable))
+            continue
+        
+        for seat_id in seat_ids:
+            seats[seat_id][1] = SeatStatus.BLOCKED
+            to_block.append(seats[seat_id][0])
+        results.append(SeatLockResult(True, False, []))
+    
+    if to_block:
+        db.execute(
+            update(ScheduleSeat)
+            .where(ScheduleSeat.schedule_start == schedule.start_time, ScheduleSeat.schedule_seat_id.in_(to_block))
+            .values(status=SeatStatus.BLOCKED, updated_at=datetime.now()),
+            execution_options={"synchronize_session": False}
+        )
+        publish_invalidation(db, "schedule_seats", schedule.schedule_id)
+    db.commit()
+    return results
+
+def apply_lock_batch(schedule_id: int, requests: List[List[int]]):
+    with session_scope() as db:
+        return lock_seat_batch(db, cache.get_schedule(db, schedule_id), requests)
+
+lock_batcher = MicroBatcher(apply_lock_batch, settings.LOCK_BATCH_WINDOW_MS / 1000, settings.LOCK_BATCH_MAX)
 
 @router.post("/seats/lock")
 async def lock_seats(request: SeatLockRequest, db: Session = Depends(get_db)):
     try:
-        schedule = db.query(Schedule).filter(Schedule.schedule_id == request.schedule_id).first()
+        schedule = cache.get_schedule(db, request.schedule_id)
         if not schedule:
             raise HTTPException(status_code=404, detail="Schedule not found")
         
-        schedule_seats = db.query(ScheduleSeat).filter(
-            ScheduleSeat.schedule_id == request.schedule_id,
-            ScheduleSeat.seat_id.in_(request.seat_ids)
-        ).all()
+        if engine_owned(request.schedule_id):
+            result = await seat_inventory.transition(
+                request.schedule_id, request.seat_ids, (SeatStatus.AVAILABLE,), SeatStatus.BLOCKED.value
+            )
+        elif settings.LOCK_BATCHING:
+            result = await lock_batcher.submit(request.schedule_id, request.seat_ids)
+        else:
+            result = lock_seat_batch(db, schedule, [request.seat_ids])[0]
         
-        if len(schedule_seats) != len(request.seat_ids):
+        if result.not_found:
             raise HTTPException(status_code=400, detail="Some seats not found for this schedule")
         
-        unavailable_seats = [ss.seat_id for ss in schedule_seats if ss.status != SeatStatus.AVAILABLE]
-        if unavailable_seats:
+        if result.unavailable:
+            metrics.seat_lock_conflicts.inc()
             raise HTTPException(
                 status_code=400, 
-                detail=f"Seats {unavailable_seats} are not available"
+                detail=f"Seats {result.unavailable} are not available"
             )
         
-        for schedule_seat in schedule_seats:
-            schedule_seat.status = SeatStatus.BLOCKED
-            schedule_seat.updated_at = datetime.now()
-        
-        db.commit()
+        metrics.seats_locked.inc(len(request.seat_ids))
         
         return {
             "status": "success",
@@ -279,16 +955,22 @@ async def lock_seats(request: SeatLockRequest, db: Session = Depends(get_db)):
         
     except Exception as e:
         db.rollback()
-        raise HTTPException(status_code=500, detail=str(e))
+        raise failure_response(e)
+
+@router.get("/seats/lock/batching/stats", dependencies=[Depends(require_admin)])
+async def get_lock_batching_stats():
+    return {"enabled": settings.LOCK_BATCHING, **lock_batcher.stats()}
 
 
 # Bookings -------------------------------------------------------------------------------------------
 
 class BookingRequest(BaseModel):
-    user_id: int
+    user_id: Optional[int] = None  # taken from the session token when one is sent
     event_id: int
     schedule_id: int
-    seat_ids: List[int]
+    seat_ids: List[int] = []
+    inventory_id: Optional[int] = None  # general admission: book quantity tickets from this inventory
+    quantity: Optional[int] = Field(None, gt=0)
     payment_method: str
 
 class BookingResponse(BaseModel):
@@ -304,25 +986,51 @@ class BookingResponse(BaseModel):
     class Config:
         from_attributes = True
 
+def resolve_user_id(db: Session, token_user_id: Optional[int], user_id: Optional[int]) -> int:
+    """The acting user: a session token's, trusted as is, else a raw user_id that must exist."""
+    if token_user_id is not None:
+        if user_id is not None and user_id != token_user_id:
+            raise HTTPException(status_code=403, detail="user_id does not match the session")
+        return token_user_id
+    
+    if user_id is None:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    if not cache.get_user(db, user_id):
+        raise HTTPException(status_code=404, detail="User not found")
+    return user_id
+
 @router.post("/bookings", response_model=BookingResponse)
-async def create_booking(request: BookingRequest, db: Session = Depends(get_db)):
+async def create_booking(
+    request: BookingRequest,
+    db: Session = Depends(get_db),
+    token_user_id: Optional[int] = Depends(session_user_id)
+):
     try:
-        user = db.query(User).filter(User.user_id == request.user_id).first()
-        if not user:
-            raise HTTPException(status_code=404, detail="User not found")
+        request.user_id = resolve_user_id(db, token_user_id, request.user_id)
         
-        event = db.query(Event).filter(Event.event_id == request.event_id).first()
+        event = cache.get_event(db, request.event_id)
         if not event:
             raise HTTPException(status_code=404, detail="Event not found")
         
-        schedule = db.query(Schedule).filter(Schedule.schedule_id == request.schedule_id).first()
+        schedule = cache.get_schedule(db, request.schedule_id)
         if not schedule:
             raise HTTPException(status_code=404, detail="Schedule not found")
         
+        if request.inventory_id is not None:
+            if request.quantity is None or request.seat_ids:
+                raise HTTPException(status_code=400, detail="General-admission bookings take inventory_id and quantity, not seat_ids")
+            return create_general_admission_booking(db, request, schedule)
+        if not request.seat_ids:
+            raise HTTPException(status_code=400, detail="Provide seat_ids, or inventory_id and quantity")
+        if engine_owned(request.schedule_id):
+            return await create_engine_booking(db, request, schedule)
+        
+        # Locked so a concurrent booking of the same seats waits and then sees them BOOKED
         schedule_seats = db.query(ScheduleSeat).join(Seat).filter(
             ScheduleSeat.schedule_id == request.schedule_id,
+            ScheduleSeat.schedule_start == schedule.start_time,
             ScheduleSeat.seat_id.in_(request.seat_ids)
-        ).all()
+        ).with_for_update(of=ScheduleSeat).all()
         
         if len(schedule_seats) != len(request.seat_ids):
             raise HTTPException(status_code=400, detail="Some seats not found")
@@ -343,23 +1051,33 @@ async def create_booking(request: BookingRequest, db: Session = Depends(get_db))
             user_id=request.user_id,
             event_id=request.event_id,
             schedule_id=request.schedule_id,
+            schedule_start=schedule.start_time,
             amount=total_amount,
             status=BookingStatus.PENDING
         )
         db.add(booking)
         db.flush()
         
-        for schedule_seat in schedule_seats:
-            booking_seat = BookingSeat(
-                booking_id=booking.booking_id,
-                schedule_seat_id=schedule_seat.schedule_seat_id
+        # Plain statements rather than a unit-of-work flush: in pipeline mode the ORM's executemany
+        # UPDATE cannot see real rowcounts. RETURNING rows are reliable once the pipeline has synced.
+        schedule_seat_ids = [ss.schedule_seat_id for ss in schedule_seats]
+        with pipeline(db):
+            db.execute(insert(BookingSeat), [
+                {"booking_id": booking.booking_id, "schedule_seat_id": schedule_seat_id}
+                for schedule_seat_id in schedule_seat_ids
+            ])
+            booked = db.execute(
+                update(ScheduleSeat)
+                .where(ScheduleSeat.schedule_start == schedule.start_time, ScheduleSeat.schedule_seat_id.in_(schedule_seat_ids))
+                .values(status=SeatStatus.BOOKED, updated_at=datetime.now())
+                .returning(ScheduleSeat.schedule_seat_id),
+                execution_options={"synchronize_session": False}
             )
-            db.add(booking_seat)
-            
-            schedule_seat.status = SeatStatus.BOOKED
-            schedule_seat.updated_at = datetime.now()
-        
+            publish_invalidation(db, "schedule_seats", request.schedule_id)
+        if len(booked.all()) != len(schedule_seat_ids):
+            raise HTTPException(status_code=409, detail="Seats changed while booking, try again")
         db.commit()
+        metrics.bookings_created.inc()
         
         payment_link = f"https://payment.epicly.com/pay/{booking.booking_id}"
         
@@ -376,7 +1094,83 @@ async def create_booking(request: BookingRequest, db: Session = Depends(get_db))
         
     except Exception as e:
         db.rollback()
-        raise HTTPException(status_code=500, detail=str(e))
+        metrics.booking_failures.inc(reason=e.status_code if isinstance(e, HTTPException) else "error")
+        raise failure_response(e)
+
+async def create_engine_booking(db: Session, request: BookingRequest, schedule):
+    transition = await seat_inventory.transition(
+        request.schedule_id, request.seat_ids, (SeatStatus.AVAILABLE, SeatStatus.BLOCKED), SeatStatus.BOOKED.value
+    )
+    if transition.not_found:
+        raise HTTPException(status_code=400, detail="Some seats not found")
+    if transition.unavailable:
+        raise HTTPException(status_code=400, detail=f"Seats {transition.unavailable} are not available")
+    
+    try:
+        prices = {seat.seat_id: seat.base_price for seat in cache.get_section_layout(db, schedule.section_id)}
+        total_amount = sum(prices[seat_id] for seat_id in request.seat_ids)
+        
+        booking = Booking(
+            user_id=request.user_id,
+            event_id=request.event_id,
+            schedule_id=request.schedule_id,
+            schedule_start=schedule.start_time,
+            amount=total_amount,
+            status=BookingStatus.PENDING
+        )
+        db.add(booking)
+        db.flush()
+        db.add_all(
+            BookingSeat(booking_id=booking.booking_id, schedule_seat_id=schedule_seat_id)
+            for schedule_seat_id in transition.schedule_seat_ids
+        )
+        db.commit()
+    except Exception:
+        db.rollback()
+        await seat_inventory.restore(request.schedule_id, transition.previous)
+        raise
+    metrics.bookings_created.inc()
+    
+    return {
+        "booking_id": booking.booking_id,
+        "user_id": booking.user_id,
+        "event_id": booking.event_id,
+        "schedule_id": booking.schedule_id,
+        "amount": booking.amount,
+        "status": booking.status,
+        "total_amount": total_amount,
+        "payment_link": f"https://payment.epicly.com/pay/{booking.booking_id}"
+    }
+
+def create_general_admission_booking(db: Session, request: BookingRequest, schedule):
+    price = reserve_inventory(db, request.schedule_id, request.inventory_id, request.quantity)
+    total_amount = price * request.quantity
+    
+    booking = Booking(
+        user_id=request.user_id,
+        event_id=request.event_id,
+        schedule_id=request.schedule_id,
+        inventory_id=request.inventory_id,
+        quantity=request.quantity,
+        schedule_start=schedule.start_time,
+        amount=total_amount,
+        status=BookingStatus.PENDING
+    )
+    db.add(booking)
+    db.commit()
+    metrics.bookings_created.inc()
+    metrics.ga_tickets_reserved.inc(request.quantity)
+    
+    return {
+        "booking_id": booking.booking_id,
+        "user_id": booking.user_id,
+        "event_id": booking.event_id,
+        "schedule_id": booking.schedule_id,
+        "amount": booking.amount,
+        "status": booking.status,
+        "total_amount": total_amount,
+        "payment_link": f"https://payment.epicly.com/pay/{booking.booking_id}"
+    }
 
 @router.get("/bookings/{booking_id}", response_model=dict)
 async def get_booking_details(booking_id: int, db: Session = Depends(get_db)):
@@ -394,7 +1188,8 @@ async def get_booking_details(booking_id: int, db: Session = Depends(get_db)):
     for booking_seat in booking.booking_seats:
         if booking_seat.schedule_seat_id:
             seat_info = db.query(Seat).join(ScheduleSeat).filter(
-                ScheduleSeat.schedule_seat_id == booking_seat.schedule_seat_id
+                ScheduleSeat.schedule_seat_id == booking_seat.schedule_seat_id,
+                ScheduleSeat.schedule_start == booking.schedule_start
             ).first()
             if seat_info:
                 seats.append({
@@ -423,6 +1218,8 @@ async def get_booking_details(booking_id: int, db: Session = Depends(get_db)):
             "end_time": booking.schedule.end_time
         } if booking.schedule else None,
         "seats": seats,
+        "inventory_id": booking.inventory_id,
+        "quantity": booking.quantity,
         "amount": booking.amount,
         "status": booking.status,
         "created_at": booking.created_at
@@ -450,7 +1247,7 @@ class PaymentResponse(BaseModel):
 @router.post("/payments", response_model=PaymentResponse)
 async def create_payment(request: PaymentRequest, db: Session = Depends(get_db)):
     try:
-        booking = db.query(Booking).filter(Booking.booking_id == request.booking_id).first()
+        booking = db.query(Booking).filter(Booking.booking_id == request.booking_id).with_for_update().first()
         if not booking:
             raise HTTPException(status_code=404, detail="Booking not found")
         
@@ -469,6 +1266,7 @@ async def create_payment(request: PaymentRequest, db: Session = Depends(get_db))
         )
         db.add(payment)
         db.flush()
+        engine_released = []
         
         import random
         payment_success = random.choice([True, True, True, False]) # making payment random as we are not adding payment gateway
@@ -478,6 +1276,9 @@ async def create_payment(request: PaymentRequest, db: Session = Depends(get_db))
             booking.status = BookingStatus.CONFIRMED
         else:
             payment.status = PaymentStatus.FAILED
+            booking.status = BookingStatus.CANCELLED  # its seats go back on sale, so it can't be paid later
+            seats_released = 0
+            in_engine = booking.schedule_id is not None and engine_owned(booking.schedule_id)
             booking_seats = db.query(BookingSeat).filter(
                 BookingSeat.booking_id == request.booking_id
             ).all() # Removing lock
@@ -485,12 +1286,35 @@ async def create_payment(request: PaymentRequest, db: Session = Depends(get_db))
             for booking_seat in booking_seats:
                 if booking_seat.schedule_seat_id:
                     schedule_seat = db.query(ScheduleSeat).filter(
-                        ScheduleSeat.schedule_seat_id == booking_seat.schedule_seat_id
+                        ScheduleSeat.schedule_seat_id == booking_seat.schedule_seat_id,
+                        ScheduleSeat.schedule_start == booking.schedule_start
                     ).first()
                     if schedule_seat:
-                        schedule_seat.status = SeatStatus.AVAILABLE
+                        if in_engine:
+                            engine_released.append(schedule_seat.seat_id)
+                        else:
+                            schedule_seat.status = SeatStatus.AVAILABLE
+                        seats_released += 1
+            
+            if booking.inventory_id:
+                release_inventory(db, booking.inventory_id, booking.quantity)
+            
+            if booking.schedule_id:
+                publish_invalidation(db, "schedule_seats", booking.schedule_id)
         
+        publish_invalidation(db, "booking", booking.booking_id)
         db.commit()
+        if engine_released:
+            await seat_inventory.transition(
+                booking.schedule_id, engine_released, (SeatStatus.BOOKED,), SeatStatus.AVAILABLE.value
+            )
+        if payment_success:
+            metrics.payments.inc(status=PaymentStatus.SUCCESS.value)
+        else:
+            metrics.payments.inc(status=PaymentStatus.FAILED.value)
+            metrics.seats_released.inc(seats_released)
+            if booking.inventory_id:
+                metrics.ga_tickets_released.inc(booking.quantity)
         
         return {
             "payment_id": payment.payment_id,
@@ -503,7 +1327,7 @@ async def create_payment(request: PaymentRequest, db: Session = Depends(get_db))
         
     except Exception as e:
         db.rollback()
-        raise HTTPException(status_code=500, detail=str(e))
+        raise failure_response(e)
 
 @router.get("/payments/{payment_id}", response_model=PaymentResponse)
 async def get_payment_status(payment_id: int, db: Session = Depends(get_db)):
@@ -545,6 +1369,9 @@ async def register_user(request: UserRegisterRequest, db: Session = Depends(get_
             phone=request.phone
         )
         db.add(user)
+        db.flush()
+        publish_invalidation(db, "user", user.user_id)
+        publish_invalidation(db, "user_email", user.email)
         db.commit()
         db.refresh(user)
         
@@ -558,11 +1385,11 @@ async def register_user(request: UserRegisterRequest, db: Session = Depends(get_
         
     except Exception as e:
         db.rollback()
-        raise HTTPException(status_code=500, detail=str(e))
+        raise failure_response(e)
 
 @router.post("/users/login")
 async def login_user(request: UserLoginRequest, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.email == request.email).first()
+    user = cache.get_user_by_email(db, request.email)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
@@ -571,15 +1398,25 @@ async def login_user(request: UserLoginRequest, db: Session = Depends(get_db)):
         "message": "Login successful",
         "user_id": user.user_id,
         "name": user.name,
-        "email": user.email
+        "email": user.email,
+        "token": issue_token(user.user_id),
+        "token_type": "bearer",
+        "expires_in": settings.SESSION_TOKEN_TTL
     }
 
+@router.get("/users/me/bookings")
+async def get_my_bookings(db: Session = Depends(get_db), token_user_id: Optional[int] = Depends(session_user_id)):
+    return fetch_user_bookings(db, resolve_user_id(db, token_user_id, None))
+
 @router.get("/users/{user_id}/bookings")
-async def get_user_bookings(user_id: int, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.user_id == user_id).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    
+async def get_user_bookings(
+    user_id: int,
+    db: Session = Depends(get_db),
+    token_user_id: Optional[int] = Depends(session_user_id)
+):
+    return fetch_user_bookings(db, resolve_user_id(db, token_user_id, user_id))
+
+def fetch_user_bookings(db: Session, user_id: int):
     bookings = db.query(Booking).options(
         joinedload(Booking.event),
         joinedload(Booking.schedule)
@@ -0,0 +1,69 @@
+"""
+Stateless signed session tokens.
+
+/users/login issues a token carrying the user id, signed with SECRET_KEY
+(itsdangerous: HMAC over a timestamped payload) and valid for
+SESSION_TOKEN_TTL seconds. Verifying one is a signature check with no
+database access, so requests that present one are trusted with its user id
+instead of looking the user up.
+"""
+import hmac
+from typing import Optional
+
+from fastapi import Header, HTTPException
+from itsdangerous import BadSignature, SignatureExpired, URLSafeTimedSerializer
+
+from settings import settings
+
+_serializer = None
+
+
+def serializer() -> URLSafeTimedSerializer:
+    global _serializer
+    if _serializer is None:
+        if not settings.SECRET_KEY:
+            raise RuntimeError("SECRET_KEY is not set")
+        _serializer = URLSafeTimedSerializer(settings.SECRET_KEY, salt="epicly-session")
+    return _serializer
+
+
+def _unauthorized(detail: str) -> HTTPException:
+    return HTTPException(status_code=401, detail=detail, headers={"WWW-Authenticate": "Bearer"})
+
+
+def issue_token(user_id: int) -> str:
+    return serializer().dumps({"uid": user_id})
+
+
+def verify_token(token: str) -> int:
+    """The token's user id; 401 if it's forged or expired."""
+    try:
+        payload = serializer().loads(token, max_age=settings.SESSION_TOKEN_TTL)
+    except SignatureExpired:
+        raise _unauthorized("Session expired, log in again")
+    except BadSignature:
+        raise _unauthorized("Invalid session token")
+    return payload["uid"]
+
+
+async def session_user_id(authorization: Optional[str] = Header(None)) -> Optional[int]:
+    """Dependency: the user id of an "Authorization: Bearer <token>" header, None without one."""
+    if authorization is None:
+        if settings.REQUIRE_SESSION_TOKEN:
+            raise _unauthorized("Not authenticated")
+        return None
+
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token.strip():
+        raise _unauthorized("Expected a Bearer token")
+    return verify_token(token.strip())
+
+
+async def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """Dependency for /admin routes: the ADMIN_TOKEN header, or no check outside production when it's unset."""
+    if not settings.ADMIN_TOKEN:
+        if settings.is_production:
+            raise HTTPException(status_code=403, detail="Admin routes are disabled (ADMIN_TOKEN is not set)")
+        return
+    if x_admin_token is None or not hmac.compare_digest(x_admin_token, settings.ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
@@ -0,0 +1,143 @@
+"""
+psycopg2 vs psycopg 3 (server-side prepared statements + pipeline mode).
+
+Runs the same workload through both drivers against the configured database:
+the get_schedule_seats query, the lock_seats transaction and the
+create_booking transaction. Writes are rolled back, so the seeded data is
+left untouched.
+
+    python -m benchmarks.driver_compare [--iterations 500] [--seats 4]
+"""
+import argparse
+import statistics
+import time
+from decimal import Decimal
+from types import SimpleNamespace
+
+from sqlalchemy import func, insert, update
+from sqlalchemy.orm import sessionmaker
+
+from api import fetch_schedule_seats
+from database import create_database_engine, pipeline
+from models import Booking, BookingSeat, BookingStatus, Schedule, ScheduleSeat, SeatStatus, User
+
+
+def pick_target(session, seat_count):
+    """The schedule with the largest seat map, its first seats and any user."""
+    schedule_id = session.query(ScheduleSeat.schedule_id).group_by(ScheduleSeat.schedule_id).order_by(
+        func.count(ScheduleSeat.schedule_seat_id).desc()
+    ).limit(1).scalar()
+    schedule = session.query(Schedule).filter(Schedule.schedule_id == schedule_id).one()
+    return SimpleNamespace(
+        schedule_id=schedule_id,
+        schedule_start=schedule.start_time,
+        event_id=schedule.event_id,
+        user_id=session.query(User.user_id).limit(1).scalar(),
+        seat_ids=[row.seat_id for row in session.query(ScheduleSeat.seat_id).filter(
+            ScheduleSeat.schedule_id == schedule_id,
+            ScheduleSeat.schedule_start == schedule.start_time
+        ).order_by(ScheduleSeat.seat_id).limit(seat_count)],
+    )
+
+
+def seat_map(session, target):
+    fetch_schedule_seats(session, target.schedule_id)
+
+
+def lock_transaction(session, target):
+    schedule_seats = session.query(ScheduleSeat).filter(
+        ScheduleSeat.schedule_id == target.schedule_id,
+        ScheduleSeat.schedule_start == target.schedule_start,
+        ScheduleSeat.seat_id.in_(target.seat_ids)
+    ).all()
+    with pipeline(session):
+        session.execute(
+            update(ScheduleSeat)
+            .where(ScheduleSeat.schedule_start == target.schedule_start,
+                   ScheduleSeat.schedule_seat_id.in_([ss.schedule_seat_id for ss in schedule_seats]))
+            .values(status=SeatStatus.BLOCKED),
+            execution_options={"synchronize_session": False}
+        )
+
+
+def booking_transaction(session, target):
+    schedule_seats = session.query(ScheduleSeat).filter(
+        ScheduleSeat.schedule_id == target.schedule_id,
+        ScheduleSeat.schedule_start == target.schedule_start,
+        ScheduleSeat.seat_id.in_(target.seat_ids)
+    ).all()
+    booking = Booking(
+        user_id=target.user_id,
+        event_id=target.event_id,
+        schedule_id=target.schedule_id,
+        schedule_start=target.schedule_start,
+        amount=Decimal("0"),
+        status=BookingStatus.PENDING
+    )
+    session.add(booking)
+    session.flush()
+    schedule_seat_ids = [ss.schedule_seat_id for ss in schedule_seats]
+    with pipeline(session):
+        session.execute(insert(BookingSeat), [
+            {"booking_id": booking.booking_id, "schedule_seat_id": schedule_seat_id} for schedule_seat_id in schedule_seat_ids
+        ])
+        booked = session.execute(
+            update(ScheduleSeat)
+            .where(ScheduleSeat.schedule_start == target.schedule_start, ScheduleSeat.schedule_seat_id.in_(schedule_seat_ids))
+            .values(status=SeatStatus.BOOKED)
+            .returning(ScheduleSeat.schedule_seat_id),
+            execution_options={"synchronize_session": False}
+        )
+    assert len(booked.all()) == len(schedule_seat_ids)
+
+
+WORKLOAD = [
+    ("seat map", seat_map),
+    ("lock txn", lock_transaction),
+    ("booking txn", booking_transaction),
+]
+
+
+def run(driver, iterations, seat_count):
+    engine = create_database_engine(driver)
+    engine.echo = False
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    session = Session()
+    results = {}
+    try:
+        target = pick_target(session, seat_count)
+        session.rollback()
+
+        for name, operation in WORKLOAD:
+            latencies = []
+            for _ in range(iterations):
+                started = time.perf_counter()
+                operation(session, target)
+                session.rollback()
+                latencies.append(time.perf_counter() - started)
+            latencies.sort()
+            results[name] = {
+                "ops_per_sec": len(latencies) / sum(latencies),
+                "p50_ms": statistics.median(latencies) * 1000,
+                "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+            }
+    finally:
+        session.close()
+        engine.dispose()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="psycopg2 vs psycopg 3 driver benchmark")
+    parser.add_argument("--iterations", type=int, default=500)
+    parser.add_argument("--seats", type=int, default=4, help="Seats per lock/booking transaction")
+    args = parser.parse_args()
+
+    print(f"{'driver':<10}{'operation':<14}{'ops/s':>10}{'p50 ms':>10}{'p99 ms':>10}")
+    for driver in ("psycopg2", "psycopg"):
+        for name, stats in run(driver, args.iterations, args.seats).items():
+            print(f"{driver:<10}{name:<14}{stats['ops_per_sec']:>10.1f}{stats['p50_ms']:>10.2f}{stats['p99_ms']:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
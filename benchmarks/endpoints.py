@@ -0,0 +1,293 @@
+"""
+Endpoint microbenchmarks, in-process through an ASGI test client.
+
+For each dataset size (--sizes, in events; each event has two schedules of a
+200-seat section), the tables are recreated and seeded, then every case
+below is called --calls times with varying ids. Reported per endpoint:
+latency (p50/p95/mean), SQL statements per call and memory allocated per
+call (tracemalloc peak, measured in a separate pass so tracing doesn't skew
+the timings). Catalog responses are re-rendered on every call (the response
+cache is invalidated before each one) unless --response-cache.
+
+Runs against the embedded SQLite mode (default; nothing to set up) or the
+configured Postgres (--db postgres), whose tables are DROPPED and recreated,
+so point it at a scratch database and pass --reset. Results are saved as
+JSON; --compare prints the change against an earlier run.
+
+    python -m benchmarks.endpoints [--sizes 100,1000] [--calls 200] [--only events,seats]
+    python -m benchmarks.endpoints --compare benchmarks/results/endpoints-sqlite-1a2b3c4.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+SEATS_PER_SECTION = 200
+SCHEDULES_PER_EVENT = 2
+
+
+def seed(Session, events, users=50):
+    """A dataset of `events` events; returns the ids the cases draw from."""
+    from sqlalchemy import text
+    from models import Event, Schedule, Seat, Section, User, Venue
+    from partitions import ensure_partitions
+
+    rng = random.Random(events)
+    cities = ["Bangalore", "Mumbai", "Delhi", "Chennai", "Pune"]
+    with Session() as session:
+        venues = [
+            Venue(name=f"Venue {i}", location=f"Area {i}", capacity=SEATS_PER_SECTION, city=cities[i % len(cities)],
+                  latitude=12.9 + rng.random() / 5, longitude=77.5 + rng.random() / 5)
+            for i in range(max(2, events // 20))
+        ]
+        session.add_all(venues)
+        session.flush()
+        sections = [Section(venue_id=venue.venue_id, name="Main", capacity=SEATS_PER_SECTION) for venue in venues]
+        session.add_all(sections)
+        session.flush()
+        session.execute(Seat.__table__.insert(), [
+            {"section_id": section.section_id, "row_label": chr(65 + i // 10), "seat_number": i % 10 + 1,
+             "seat_type": "PREMIUM" if i < 40 else "REGULAR", "base_price": Decimal("400.00" if i < 40 else "250.00")}
+            for section in sections for i in range(SEATS_PER_SECTION)
+        ])
+
+        event_rows = [
+            Event(title=f"Event {i}", event_type=rng.choice(["MOVIE", "COMEDY_SHOW", "SPORTS", "CONCERT"]),
+                  language=rng.choice(["English", "Hindi", "Kannada"]), genre=rng.choice(["Action", "Drama", "Comedy"]),
+                  duration=120)
+            for i in range(events)
+        ]
+        session.add_all(event_rows)
+        session.flush()
+        today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        schedules = []
+        for i, event in enumerate(event_rows):
+            section = sections[i % len(sections)]
+            for n in range(SCHEDULES_PER_EVENT):
+                start_time = today + timedelta(days=1 + (i * SCHEDULES_PER_EVENT + n) // len(sections), hours=10 + 4 * n)
+                schedules.append(Schedule(
+                    event_id=event.event_id, venue_id=section.venue_id, section_id=section.section_id,
+                    start_time=start_time, end_time=start_time + timedelta(minutes=event.duration)
+                ))
+        session.add_all(schedules)
+        session.flush()
+        if session.get_bind().dialect.name == "postgresql":
+            ensure_partitions(session.connection(), min(s.start_time for s in schedules), max(s.start_time for s in schedules))
+        session.execute(text("""
+            INSERT INTO schedule_seats (schedule_id, seat_id, schedule_start, status)
+            SELECT schedules.schedule_id, seats.seat_id, schedules.start_time, 'AVAILABLE'
+            FROM schedules JOIN seats ON seats.section_id = schedules.section_id
+        """))
+
+        user_rows = [User(name=f"User {i}", email=f"user{i}@bench.local") for i in range(users)]
+        session.add_all(user_rows)
+        session.commit()
+        return {
+            "event_ids": [event.event_id for event in event_rows],
+            "schedules": [(s.schedule_id, s.event_id, s.section_id) for s in schedules],
+            "seat_ids": {section.section_id: [seat_id for (seat_id,) in session.query(Seat.seat_id).filter(
+                Seat.section_id == section.section_id).order_by(Seat.seat_id)] for section in sections},
+            "users": [(user.user_id, user.email) for user in user_rows],
+        }
+
+
+class Cases:
+    """name -> (method, path, body) per call; writes take fresh seats each time."""
+
+    def __init__(self, data, rng):
+        self.data = data
+        self.rng = rng
+        self._free = {}  # schedule_id -> unused seat ids, for locks and bookings
+
+    def _seats(self, count):
+        while True:
+            schedule_id, event_id, section_id = self.rng.choice(self.data["schedules"])
+            free = self._free.setdefault(schedule_id, list(self.data["seat_ids"][section_id]))
+            if len(free) >= count:
+                return schedule_id, event_id, [free.pop() for _ in range(count)]
+
+    def build(self):
+        rng, data = self.rng, self.data
+        event_id = lambda: rng.choice(data["event_ids"])
+        schedule_id = lambda: rng.choice(data["schedules"])[0]
+        user = lambda: rng.choice(data["users"])
+
+        def lock():
+            schedule, _, seats = self._seats(2)
+            return "POST", "/seats/lock", {"schedule_id": schedule, "seat_ids": seats}
+
+        def book():
+            schedule, event, seats = self._seats(2)
+            return "POST", "/bookings", {
+                "user_id": user()[0], "event_id": event, "schedule_id": schedule, "seat_ids": seats, "payment_method": "UPI"
+            }
+
+        return {
+            "events": lambda: ("GET", "/events", None),
+            "events_filtered": lambda: ("GET", "/events?type=MOVIE&city=Bangalore", None),
+            "events_facets": lambda: ("GET", "/events?facets=true", None),
+            "event": lambda: ("GET", f"/events/{event_id()}", None),
+            "event_schedules": lambda: ("GET", f"/events/{event_id()}/schedules", None),
+            "events_nearby": lambda: ("GET", "/events/nearby?lat=13.0&lon=77.6&radius=20", None),
+            "seats": lambda: ("GET", f"/schedules/{schedule_id()}/seats", None),
+            "seats_columnar": lambda: ("GET", f"/schedules/{schedule_id()}/seats?format=columnar", None),
+            "batch": lambda: ("POST", "/batch", {"requests": {
+                "event": {"op": "event", "params": {"event_id": event_id()}},
+                "schedules": {"op": "event_schedules", "params": {"event_id": event_id()}},
+                "seats": {"op": "schedule_seats", "params": {"schedule_id": schedule_id()}},
+            }}),
+            "lock": lock,
+            "book": book,
+            "login": lambda: ("POST", "/users/login", {"email": user()[1]}),
+            "user_bookings": lambda: ("GET", f"/users/{user()[0]}/bookings", None),
+        }
+
+
+def measure(client, call, calls, before_call, queries, trace=False):
+    latencies, statements, allocated, statuses = [], [], [], {}
+    for _ in range(calls):
+        method, path, body = call()
+        before_call()
+        if trace:
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+        issued = queries[0]
+        started = time.perf_counter()
+        response = client.request(method, path, json=body)
+        latencies.append(time.perf_counter() - started)
+        if trace:
+            allocated.append(tracemalloc.get_traced_memory()[1] - baseline)
+        statements.append(queries[0] - issued)
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+    return latencies, statements, allocated, statuses
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(previous_path, results):
+    with open(previous_path) as previous_file:
+        previous = {(row["size"], row["endpoint"]): row for row in json.load(previous_file)["results"]}
+    print(f"\nvs {previous_path}")
+    print(f"{'size':>6} {'endpoint':<16}{'p50 ms':>16}{'queries':>14}{'alloc KiB':>18}")
+    for row in results:
+        old = previous.get((row["size"], row["endpoint"]))
+        if old is None:
+            continue
+        change = lambda key: f"{row[key] - old[key]:+.2f} ({(row[key] / old[key] - 1) * 100:+.0f}%)" if old[key] else f"{row[key]:.2f}"
+        print(f"{row['size']:>6} {row['endpoint']:<16}{change('p50_ms'):>16}"
+              f"{row['queries_per_call'] - old['queries_per_call']:>+14.1f}{change('alloc_kib_per_call'):>18}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-endpoint latency, queries and allocations, in-process")
+    parser.add_argument("--db", choices=("sqlite", "postgres"), default="sqlite")
+    parser.add_argument("--reset", action="store_true", help="Allow dropping the Postgres tables (required with --db postgres)")
+    parser.add_argument("--sizes", default="100,1000", help="Dataset sizes, in events")
+    parser.add_argument("--calls", type=int, default=200, help="Timed calls per endpoint and size")
+    parser.add_argument("--alloc-calls", type=int, default=20, help="Traced calls per endpoint for allocations")
+    parser.add_argument("--only", help="Comma-separated endpoint names")
+    parser.add_argument("--response-cache", action="store_true", help="Keep cached catalog responses between calls")
+    parser.add_argument("--out", help="JSON results path (default benchmarks/results/endpoints-<db>-<commit>.json)")
+    parser.add_argument("--compare", help="Earlier results JSON to compare against")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    if args.db == "postgres" and not args.reset:
+        parser.error("--db postgres drops and recreates the configured database's tables; pass --reset to confirm")
+
+    # The app reads its settings when first imported
+    if args.db == "sqlite":
+        os.environ["DB_DRIVER"] = "sqlite"
+        os.environ.setdefault("SQLITE_PATH", ":memory:")
+
+    from fastapi.testclient import TestClient
+    from sqlalchemy import event
+
+    import api
+    import database
+    import main as app_main
+
+    database.engine.echo = False  # development settings log every statement
+    queries = [0]
+
+    @event.listens_for(database.engine, "before_cursor_execute")
+    def count(*_):
+        queries[0] += 1
+
+    def before_call():
+        if not args.response_cache:
+            api.response_cache.invalidate_all()
+
+    # No `with`: the app's lifespan (warm-up, listeners, partition maintenance) isn't started
+    client = TestClient(app_main.app)
+    sizes = [int(size) for size in args.sizes.split(",")]
+    results = []
+    print(f"{args.db}, {args.calls} calls per endpoint, commit {git_commit()}")
+    print(f"{'size':>6} {'endpoint':<16}{'p50 ms':>9}{'p95 ms':>9}{'mean ms':>9}{'queries':>9}{'alloc KiB':>11}  statuses")
+    for size in sizes:
+        database.drop_tables()
+        if not database.create_tables():
+            raise SystemExit("Could not create the tables")
+        database.dispatch_invalidation(database.FLUSH_ALL)
+        started = time.perf_counter()
+        data = seed(database.SessionLocal, size)
+        print(f"-- {size} events seeded in {time.perf_counter() - started:.1f} s")
+
+        cases = Cases(data, random.Random(args.seed)).build()
+        names = args.only.split(",") if args.only else list(cases)
+        for name in names:
+            latencies, statements, _, statuses = measure(client, cases[name], args.calls, before_call, queries)
+            tracemalloc.start()
+            try:
+                _, _, allocated, _ = measure(client, cases[name], args.alloc_calls, before_call, queries, trace=True)
+            finally:
+                tracemalloc.stop()
+
+            latencies.sort()
+            row = {
+                "size": size,
+                "endpoint": name,
+                "calls": len(latencies),
+                "p50_ms": round(statistics.median(latencies) * 1000, 3),
+                "p95_ms": round(latencies[int(len(latencies) * 0.95) - 1] * 1000, 3),
+                "mean_ms": round(statistics.fmean(latencies) * 1000, 3),
+                "queries_per_call": round(statistics.fmean(statements), 2),
+                "alloc_kib_per_call": round(statistics.fmean(allocated) / 1024, 1),
+                "statuses": {str(code): count for code, count in sorted(statuses.items())},
+            }
+            results.append(row)
+            print(f"{size:>6} {name:<16}{row['p50_ms']:>9.2f}{row['p95_ms']:>9.2f}{row['mean_ms']:>9.2f}"
+                  f"{row['queries_per_call']:>9.1f}{row['alloc_kib_per_call']:>11.1f}  "
+                  + " ".join(f"{code}x{count}" for code, count in row["statuses"].items()))
+
+    commit = git_commit()
+    out = args.out or os.path.join("benchmarks", "results", f"endpoints-{args.db}-{commit}.json")
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    with open(out, "w") as out_file:
+        json.dump({
+            "commit": commit,
+            "db": args.db,
+            "recorded_at": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "calls": args.calls,
+            "response_cache": args.response_cache,
+            "results": results,
+        }, out_file, indent=2)
+    print(f"Saved {out}")
+    if args.compare:
+        compare(args.compare, results)
+
+
+if __name__ == "__main__":
+    main()
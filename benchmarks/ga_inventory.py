@@ -0,0 +1,169 @@
+"""
+General-admission inventory: capacity counter vs per-seat rows.
+
+Sells out a synthetic general-admission area with concurrent buyers against
+the configured Postgres, two ways:
+
+  counter   one conditional UPDATE on schedule_inventory (api.reserve_inventory)
+  per-seat  SELECT ... FOR UPDATE SKIP LOCKED of N available schedule_seats,
+            then UPDATE them to BOOKED (the best a seat-row design can do)
+
+Only the inventory step is timed (no booking rows). The scratch section,
+seats, schedule and inventory are deleted afterwards.
+
+    python -m benchmarks.ga_inventory [--capacity 20000] [--workers 16] [--quantity 2]
+"""
+import argparse
+import statistics
+import threading
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from fastapi import HTTPException
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from api import reserve_inventory
+from models import Event, Schedule, ScheduleInventory, ScheduleSeat, Seat, Section, Venue
+from partitions import ensure_partitions
+from settings import settings
+
+
+def create_scratch(Session, capacity):
+    with Session() as session:
+        venue_id = session.query(Venue.venue_id).limit(1).scalar()
+        event_id = session.query(Event.event_id).limit(1).scalar()
+        if venue_id is None or event_id is None:
+            raise SystemExit("Needs at least one venue and event; run seed_data.py first")
+
+        section = Section(venue_id=venue_id, name="GA benchmark", capacity=capacity)
+        session.add(section)
+        session.flush()
+
+        start_time = datetime.now().replace(microsecond=0) + timedelta(days=1)
+        ensure_partitions(session.connection(), start_time, start_time)
+        schedule = Schedule(
+            event_id=event_id, venue_id=venue_id, section_id=section.section_id,
+            start_time=start_time, end_time=start_time + timedelta(hours=3)
+        )
+        session.add(schedule)
+        session.flush()
+
+        seats = [
+            {"section_id": section.section_id, "row_label": str(i // 1000), "seat_number": i % 1000,
+             "seat_type": "GENERAL", "base_price": Decimal("1000.00")}
+            for i in range(capacity)
+        ]
+        session.execute(Seat.__table__.insert(), seats)
+        session.execute(text("""
+            INSERT INTO schedule_seats (schedule_id, seat_id, schedule_start, status)
+            SELECT :schedule_id, seat_id, :schedule_start, 'AVAILABLE' FROM seats WHERE section_id = :section_id
+        """), {"schedule_id": schedule.schedule_id, "schedule_start": start_time, "section_id": section.section_id})
+
+        inventory = ScheduleInventory(
+            schedule_id=schedule.schedule_id, section_id=section.section_id, tier="GENERAL",
+            price=Decimal("1000.00"), capacity=capacity, available=capacity
+        )
+        session.add(inventory)
+        session.commit()
+        return section.section_id, schedule.schedule_id, start_time, inventory.inventory_id
+
+
+def drop_scratch(Session, section_id, schedule_id):
+    with Session() as session:
+        session.query(ScheduleSeat).filter(ScheduleSeat.schedule_id == schedule_id).delete()
+        session.query(ScheduleInventory).filter(ScheduleInventory.schedule_id == schedule_id).delete()
+        session.query(Schedule).filter(Schedule.schedule_id == schedule_id).delete()
+        session.query(Seat).filter(Seat.section_id == section_id).delete()
+        session.query(Section).filter(Section.section_id == section_id).delete()
+        session.commit()
+
+
+def counter_buy(session, target, quantity):
+    try:
+        reserve_inventory(session, target["schedule_id"], target["inventory_id"], quantity)
+    except HTTPException:
+        # Sold out
+        session.rollback()
+        return 0
+    session.commit()
+    return quantity
+
+
+def per_seat_buy(session, target, quantity):
+    seat_ids = session.execute(text("""
+        SELECT schedule_seat_id FROM schedule_seats
+        WHERE schedule_id = :schedule_id AND schedule_start = :schedule_start AND status = 'AVAILABLE'
+        LIMIT :quantity FOR UPDATE SKIP LOCKED
+    """), {**target, "quantity": quantity}).scalars().all()
+    if len(seat_ids) < quantity:
+        session.rollback()
+        return 0
+    session.execute(text("""
+        UPDATE schedule_seats SET status = 'BOOKED', updated_at = now()
+        WHERE schedule_start = :schedule_start AND schedule_seat_id = ANY(:seat_ids)
+    """), {"schedule_start": target["schedule_start"], "seat_ids": seat_ids})
+    session.commit()
+    return quantity
+
+
+def sell_out(Session, buy, target, workers, quantity):
+    latencies = []
+    sold = [0]
+    lock = threading.Lock()
+
+    def worker():
+        with Session() as session:
+            while True:
+                started = time.perf_counter()
+                bought = buy(session, target, quantity)
+                elapsed = time.perf_counter() - started
+                if not bought:
+                    return
+                with lock:
+                    latencies.append(elapsed)
+                    sold[0] += bought
+
+    threads = [threading.Thread(target=worker) for _ in range(workers)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return sold[0], time.perf_counter() - started, sorted(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="General-admission counter vs per-seat rows")
+    parser.add_argument("--capacity", type=int, default=20000)
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--quantity", type=int, default=2, help="Tickets per purchase")
+    args = parser.parse_args()
+
+    engine = create_engine(settings.get_database_url(), pool_size=args.workers, max_overflow=0)
+    if engine.dialect.name != "postgresql":
+        parser.error("needs Postgres")
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    section_id, schedule_id, schedule_start, inventory_id = create_scratch(Session, args.capacity)
+    try:
+        modes = [
+            ("counter", counter_buy, {"schedule_id": schedule_id, "inventory_id": inventory_id}),
+            ("per-seat", per_seat_buy, {"schedule_id": schedule_id, "schedule_start": schedule_start}),
+        ]
+        print(f"{args.capacity} tickets, {args.workers} workers, {args.quantity} per purchase")
+        print(f"{'mode':<10}{'sold':>8}{'seconds':>9}{'tickets/s':>11}{'txn/s':>9}{'p50 ms':>9}{'p99 ms':>9}")
+        for name, buy, target in modes:
+            sold, elapsed, latencies = sell_out(Session, buy, target, args.workers, args.quantity)
+            print(
+                f"{name:<10}{sold:>8}{elapsed:>9.2f}{sold / elapsed:>11.0f}{len(latencies) / elapsed:>9.0f}"
+                f"{statistics.median(latencies) * 1000:>9.2f}{latencies[int(len(latencies) * 0.99) - 1] * 1000:>9.2f}"
+            )
+    finally:
+        drop_scratch(Session, section_id, schedule_id)
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
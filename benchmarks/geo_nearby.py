@@ -0,0 +1,105 @@
+"""
+Venue proximity search benchmark.
+
+Builds a GeoGrid (geo.py) over a synthetic set of venues (clustered around
+Indian cities, plus a uniform sprinkle) and compares radius queries against
+a linear haversine scan of every venue, checking both return the same set.
+
+    python -m benchmarks.geo_nearby [--venues 50000] [--queries 2000] [--cell 0.1]
+"""
+import argparse
+import random
+import statistics
+import time
+
+from geo import GeoGrid, haversine_km
+
+CITIES = [
+    (12.97, 77.59), (19.08, 72.88), (28.61, 77.21), (13.08, 80.27), (22.57, 88.36),
+    (17.39, 78.49), (18.52, 73.86), (23.02, 72.57), (26.91, 75.79), (26.85, 80.95),
+    (21.17, 72.83), (22.72, 75.86), (30.73, 76.78), (9.93, 76.27), (15.30, 74.12),
+]
+BOUNDS = ((8.0, 35.0), (68.0, 97.0))
+
+
+def make_venues(count: int, rng: random.Random):
+    venues = []
+    for venue_id in range(count):
+        if rng.random() < 0.8:
+            lat, lon = rng.choice(CITIES)
+            venues.append((venue_id, rng.gauss(lat, 0.15), rng.gauss(lon, 0.15)))
+        else:
+            venues.append((venue_id, rng.uniform(*BOUNDS[0]), rng.uniform(*BOUNDS[1])))
+    return venues
+
+
+def make_queries(count: int, rng: random.Random):
+    queries = []
+    for _ in range(count):
+        lat, lon = rng.choice(CITIES)
+        queries.append((rng.gauss(lat, 0.1), rng.gauss(lon, 0.1), rng.choice((2.0, 5.0, 10.0, 25.0))))
+    return queries
+
+
+def linear_scan(venues, lat, lon, radius_km):
+    found = []
+    for venue_id, venue_lat, venue_lon in venues:
+        distance = haversine_km(lat, lon, venue_lat, venue_lon)
+        if distance <= radius_km:
+            found.append((venue_id, distance))
+    found.sort(key=lambda item: item[1])
+    return found
+
+
+def timed(fn, queries):
+    latencies = []
+    results = []
+    for lat, lon, radius in queries:
+        started = time.perf_counter()
+        results.append(fn(lat, lon, radius))
+        latencies.append(time.perf_counter() - started)
+    return latencies, results
+
+
+def summary(latencies):
+    latencies = sorted(latencies)
+    return statistics.mean(latencies) * 1e6, latencies[int(len(latencies) * 0.95)] * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Venue proximity search benchmark")
+    parser.add_argument("--venues", type=int, default=50000)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--scan-queries", type=int, default=100, help="Queries timed with the linear scan (slow)")
+    parser.add_argument("--cell", type=float, default=0.1, help="Grid cell size in degrees")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    venues = make_venues(args.venues, rng)
+    queries = make_queries(args.queries, rng)
+
+    started = time.perf_counter()
+    grid = GeoGrid(args.cell)
+    for venue_id, lat, lon in venues:
+        grid.add(venue_id, lat, lon)
+    build_ms = (time.perf_counter() - started) * 1000
+
+    grid_latencies, grid_results = timed(grid.nearby, queries)
+    scan_latencies, scan_results = timed(lambda *query: linear_scan(venues, *query), queries[:args.scan_queries])
+
+    for grid_result, scan_result in zip(grid_results, scan_results):
+        assert {venue_id for venue_id, _ in grid_result} == {venue_id for venue_id, _ in scan_result}
+
+    grid_mean, grid_p95 = summary(grid_latencies)
+    scan_mean, scan_p95 = summary(scan_latencies)
+    print(f"{args.venues} venues, {len(grid.cells)} non-empty {args.cell} degree cells, built in {build_ms:.1f} ms")
+    print(f"mean {statistics.mean(len(result) for result in grid_results):.1f} venues per result")
+    print(f"{'method':<14}{'queries':>9}{'mean us':>11}{'p95 us':>11}")
+    print(f"{'grid':<14}{len(grid_latencies):>9}{grid_mean:>11.1f}{grid_p95:>11.1f}")
+    print(f"{'linear scan':<14}{len(scan_latencies):>9}{scan_mean:>11.1f}{scan_p95:>11.1f}")
+    print(f"speed-up {scan_mean / grid_mean:.0f}x (results identical on {len(scan_results)} queries)")
+
+
+if __name__ == "__main__":
+    main()
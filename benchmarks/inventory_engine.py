@@ -0,0 +1,109 @@
+"""
+Seat-lock throughput: in-memory inventory engine vs database-only locking.
+
+Fires concurrent lock requests (random seats of one scratch schedule) at the
+configured Postgres, two ways:
+
+  database  each request is its own SELECT ... FOR UPDATE / UPDATE
+            transaction (api.lock_seat_batch), on --connections threads
+  engine    InventoryEngine transitions: serial in-memory apply, one fsync'd
+            WAL append per group, persisted by a final flush (timed apart)
+
+The WAL goes to a temporary directory unless --wal-dir is given, so put it
+on the disk you'd deploy it on. The scratch section, seats and schedule are
+deleted afterwards.
+
+    python -m benchmarks.inventory_engine [--seats 20000] [--requests 5000] [--concurrency 1000]
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from api import lock_seat_batch
+from benchmarks.ga_inventory import create_scratch, drop_scratch
+from benchmarks.lock_batching import reset_seats, run
+from inventory_engine import InventoryEngine
+from models import Schedule, ScheduleSeat, SeatStatus
+from settings import settings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inventory engine vs database seat locking")
+    parser.add_argument("--seats", type=int, default=20000)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=1000, help="Requests in flight at once")
+    parser.add_argument("--connections", type=int, default=32, help="Database mode connections")
+    parser.add_argument("--per-request", type=int, default=2, help="Seats per lock request")
+    parser.add_argument("--wal-dir", help="WAL directory (default: a temporary one)")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    engine = create_engine(settings.get_database_url(), pool_size=args.connections, max_overflow=0)
+    if engine.dialect.name != "postgresql":
+        parser.error("needs Postgres")
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    section_id, schedule_id, _, _ = create_scratch(Session, args.seats)
+    try:
+        with Session() as session:
+            seat_ids = [row.seat_id for row in session.query(ScheduleSeat.seat_id).filter(ScheduleSeat.schedule_id == schedule_id)]
+        rng = random.Random(args.seed)
+        requests = [rng.sample(seat_ids, args.per_request) for _ in range(args.requests)]
+
+        executor = ThreadPoolExecutor(args.connections)
+
+        def lock_one(seats):
+            with Session() as session:
+                return lock_seat_batch(session, session.get(Schedule, schedule_id), [seats])[0]
+
+        async def database(seats):
+            return await asyncio.get_running_loop().run_in_executor(executor, lock_one, seats)
+
+        print(f"{args.requests} requests of {args.per_request} seats, {args.concurrency} in flight, {args.seats} seats")
+        print(f"{'mode':<10}{'locked':>8}{'seconds':>9}{'locks/s':>9}{'p50 ms':>9}{'p99 ms':>9}")
+
+        def report(name, locked, elapsed, latencies):
+            print(
+                f"{name:<10}{locked:>8}{elapsed:>9.2f}{len(latencies) / elapsed:>9.0f}"
+                f"{statistics.median(latencies) * 1000:>9.2f}{latencies[int(len(latencies) * 0.99) - 1] * 1000:>9.2f}"
+            )
+
+        reset_seats(Session, schedule_id)
+        report("database", *asyncio.run(run(database, requests, args.concurrency)))
+        executor.shutdown()
+
+        reset_seats(Session, schedule_id)
+        with tempfile.TemporaryDirectory() as scratch_dir:
+            seat_inventory = InventoryEngine(args.wal_dir or scratch_dir, flush_interval=3600)
+
+            async def engine_mode():
+                await seat_inventory.start()
+                await seat_inventory.transition(schedule_id, [], (), SeatStatus.BLOCKED.value)  # load outside the timing
+
+                async def lock(seats):
+                    return await seat_inventory.transition(schedule_id, seats, (SeatStatus.AVAILABLE,), SeatStatus.BLOCKED.value)
+
+                result = await run(lock, requests, args.concurrency)
+                started = time.perf_counter()
+                await seat_inventory.close()
+                return result, time.perf_counter() - started
+
+            result, flush_seconds = asyncio.run(engine_mode())
+            report("engine", *result)
+            stats = seat_inventory.stats()
+            print(f"engine: {stats['fsyncs']} WAL fsyncs for {stats['transitions']} transitions, "
+                  f"final flush to Postgres {flush_seconds * 1000:.0f} ms")
+    finally:
+        drop_scratch(Session, section_id, schedule_id)
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
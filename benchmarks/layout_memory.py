@@ -0,0 +1,94 @@
+"""
+Seat layout memory across worker processes: per-process cache vs mmap store.
+
+Writes a synthetic stadium section's layout file, then starts N worker
+processes that each hold the layout the way a uvicorn worker would:
+
+  cache  the list of row tuples the section_layouts cache keeps per process
+  mmap   layout_store.SeatLayout over the shared file (iterated once, so
+         every page is resident)
+
+With all workers holding it, each reports its proportional set size (PSS:
+shared pages split between the processes mapping them) above its own
+baseline; the sum is the real memory cost. Linux only (/proc/self/smaps_rollup).
+
+    python -m benchmarks.layout_memory [--seats 100000] [--workers 1,2,4,8]
+"""
+import argparse
+import multiprocessing
+import os
+import tempfile
+from decimal import Decimal
+
+from layout_store import LayoutSeat, SeatLayout, write_layout
+
+
+def pss_kb() -> int:
+    with open("/proc/self/smaps_rollup") as rollup:
+        for line in rollup:
+            if line.startswith("Pss:"):
+                return int(line.split()[1])
+    raise RuntimeError("No Pss in smaps_rollup")
+
+
+def make_seats(count: int):
+    seats = []
+    for i in range(count):
+        tier = i * 4 // count
+        seats.append(LayoutSeat(
+            100000 + i, f"{chr(65 + i // 2000 % 26)}{i // 52000}", i % 2000,
+            ("VIP", "PREMIUM", "REGULAR", "REGULAR")[tier], Decimal(("5000.00", "2500.00", "1200.00", "800.00")[tier])
+        ))
+    return seats
+
+
+def worker(mode, path, count, barrier, results):
+    barrier.wait()  # baseline once every worker exists, so shared interpreter pages are split evenly
+    baseline = pss_kb()
+    if mode == "cache":
+        # What the section_layouts cache holds: fresh row objects per process
+        held = [
+            LayoutSeat(seat.seat_id, str(seat.row_label), int(seat.seat_number), str(seat.seat_type), Decimal(str(seat.base_price)))
+            for seat in SeatLayout(path)
+        ]
+    else:
+        held = SeatLayout(path)
+        assert sum(1 for _ in held) == count
+    barrier.wait()  # every worker holds its layout while the others measure
+    results.put(pss_kb() - baseline)
+    barrier.wait()
+    del held
+
+
+def measure(mode, path, count, workers):
+    context = multiprocessing.get_context("fork")
+    barrier = context.Barrier(workers)
+    results = context.Queue()
+    processes = [context.Process(target=worker, args=(mode, path, count, barrier, results)) for _ in range(workers)]
+    for process in processes:
+        process.start()
+    total = sum(results.get() for _ in processes)
+    for process in processes:
+        process.join()
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Seat layout memory across worker processes")
+    parser.add_argument("--seats", type=int, default=100000)
+    parser.add_argument("--workers", default="1,2,4,8")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "section.layout")
+        write_layout(path, make_seats(args.seats))
+        print(f"{args.seats} seats, layout file {os.path.getsize(path) / 1024:.0f} KiB")
+        print(f"{'workers':>8}{'cache MiB':>11}{'mmap MiB':>10}")
+        for workers in map(int, args.workers.split(",")):
+            cache_kb = measure("cache", path, args.seats, workers)
+            mmap_kb = measure("mmap", path, args.seats, workers)
+            print(f"{workers:>8}{cache_kb / 1024:>11.1f}{mmap_kb / 1024:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
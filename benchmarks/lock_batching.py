@@ -0,0 +1,116 @@
+"""
+Seat-lock group commit benchmark.
+
+Fires concurrent lock requests (random seats of one scratch schedule) at the
+configured Postgres, two ways:
+
+  per-request  every request is its own transaction (lock_seat_batch with a
+               batch of one), on a pool of --connections threads
+  batched      requests go through a MicroBatcher, which collects each
+               window's requests into one transaction
+
+Some requests conflict on purpose; both modes resolve them the same way. The
+scratch section, seats and schedule are deleted afterwards.
+
+    python -m benchmarks.lock_batching [--seats 20000] [--requests 5000] [--concurrency 1000]
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import create_engine, update
+from sqlalchemy.orm import sessionmaker
+
+from api import lock_seat_batch
+from benchmarks.ga_inventory import create_scratch, drop_scratch
+from microbatch import MicroBatcher
+from models import Schedule, ScheduleSeat, SeatStatus
+from settings import settings
+
+
+def reset_seats(Session, schedule_id):
+    with Session() as session:
+        session.execute(
+            update(ScheduleSeat).where(ScheduleSeat.schedule_id == schedule_id).values(status=SeatStatus.AVAILABLE)
+        )
+        session.commit()
+
+
+async def run(submit, requests, concurrency):
+    latencies = []
+    locked = [0]
+    gate = asyncio.Semaphore(concurrency)
+
+    async def one(seat_ids):
+        async with gate:
+            started = time.perf_counter()
+            result = await submit(seat_ids)
+            latencies.append(time.perf_counter() - started)
+            locked[0] += not (result.not_found or result.unavailable)
+
+    started = time.perf_counter()
+    await asyncio.gather(*[one(seat_ids) for seat_ids in requests])
+    return locked[0], time.perf_counter() - started, sorted(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Seat-lock group commit benchmark")
+    parser.add_argument("--seats", type=int, default=20000)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=1000, help="Requests in flight at once")
+    parser.add_argument("--connections", type=int, default=32, help="Per-request mode database connections")
+    parser.add_argument("--per-request", type=int, default=2, help="Seats per lock request")
+    parser.add_argument("--window-ms", type=float, default=2.0)
+    parser.add_argument("--max-batch", type=int, default=256)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    engine = create_engine(settings.get_database_url(), pool_size=args.connections, max_overflow=0)
+    if engine.dialect.name != "postgresql":
+        parser.error("needs Postgres")
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    section_id, schedule_id, _, _ = create_scratch(Session, args.seats)
+    try:
+        with Session() as session:
+            seat_ids = [row.seat_id for row in session.query(ScheduleSeat.seat_id).filter(ScheduleSeat.schedule_id == schedule_id)]
+        rng = random.Random(args.seed)
+        requests = [rng.sample(seat_ids, args.per_request) for _ in range(args.requests)]
+
+        def apply(key, batch):
+            with Session() as session:
+                return lock_seat_batch(session, session.get(Schedule, key), batch)
+
+        executor = ThreadPoolExecutor(args.connections)
+
+        async def per_request(seats):
+            loop = asyncio.get_running_loop()
+            return (await loop.run_in_executor(executor, apply, schedule_id, [seats]))[0]
+
+        batcher = MicroBatcher(apply, args.window_ms / 1000, args.max_batch)
+
+        async def batched(seats):
+            return await batcher.submit(schedule_id, seats)
+
+        print(f"{args.requests} requests of {args.per_request} seats, {args.concurrency} in flight, {args.seats} seats")
+        print(f"{'mode':<13}{'locked':>8}{'seconds':>9}{'req/s':>9}{'p50 ms':>9}{'p99 ms':>9}")
+        for name, submit in (("per-request", per_request), ("batched", batched)):
+            reset_seats(Session, schedule_id)
+            locked, elapsed, latencies = asyncio.run(run(submit, requests, args.concurrency))
+            print(
+                f"{name:<13}{locked:>8}{elapsed:>9.2f}{len(latencies) / elapsed:>9.0f}"
+                f"{statistics.median(latencies) * 1000:>9.2f}{latencies[int(len(latencies) * 0.99) - 1] * 1000:>9.2f}"
+            )
+        stats = batcher.stats()
+        print(f"batched: {stats['batches']} transactions, mean {stats['mean_batch_size']} requests each")
+        executor.shutdown()
+    finally:
+        drop_scratch(Session, section_id, schedule_id)
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
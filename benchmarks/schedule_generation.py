@@ -0,0 +1,136 @@
+"""
+Schedule generation: ORM object loop vs one set-based statement.
+
+Generates a month of shows for a synthetic section against the configured
+Postgres, two ways:
+
+  orm         the seed_data.py approach: a Schedule object per show, then a
+              ScheduleSeat object per seat, added in 1,000-row batches
+              (run for --orm-days only and extrapolated; it is slow)
+  set-based   schedule_generator.generate_schedules: one INSERT ... SELECT
+
+The scratch section, its seats and every schedule generated are deleted
+afterwards.
+
+    python -m benchmarks.schedule_generation [--seats 25000] [--days 30] [--times 19:00] [--orm-days 2]
+"""
+import argparse
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from models import Event, Schedule, ScheduleSeat, Seat, Section, SeatStatus, Venue
+from partitions import ensure_partitions
+from schedule_generator import generate_schedules, occurrences, parse_showtimes, parse_weekdays, WEEKDAYS
+from settings import settings
+
+
+def create_section(Session, seats):
+    with Session() as session:
+        venue_id = session.query(Venue.venue_id).limit(1).scalar()
+        event_id = session.query(Event.event_id).limit(1).scalar()
+        if venue_id is None or event_id is None:
+            raise SystemExit("Needs at least one venue and event; run seed_data.py first")
+
+        section = Section(venue_id=venue_id, name="Generation benchmark", capacity=seats)
+        session.add(section)
+        session.flush()
+        session.execute(Seat.__table__.insert(), [
+            {"section_id": section.section_id, "row_label": str(i // 100), "seat_number": i % 100,
+             "seat_type": "REGULAR", "base_price": Decimal("500.00")}
+            for i in range(seats)
+        ])
+        session.commit()
+        return event_id, venue_id, section.section_id
+
+
+def clear_schedules(Session, section_id):
+    with Session() as session:
+        session.execute(text("""
+            DELETE FROM schedule_seats WHERE schedule_id IN (SELECT schedule_id FROM schedules WHERE section_id = :section_id)
+        """), {"section_id": section_id})
+        session.execute(text("DELETE FROM schedules WHERE section_id = :section_id"), {"section_id": section_id})
+        session.commit()
+
+
+def orm_generate(Session, event_id, venue_id, section_id, start_times, duration):
+    with Session() as session:
+        ensure_partitions(session.connection(), start_times[0], start_times[-1])
+        schedules = [
+            Schedule(event_id=event_id, venue_id=venue_id, section_id=section_id,
+                     start_time=start_time, end_time=start_time + timedelta(minutes=duration))
+            for start_time in start_times
+        ]
+        session.add_all(schedules)
+        session.commit()
+
+        schedule_seats = []
+        for schedule in schedules:
+            for seat in session.query(Seat).filter(Seat.section_id == section_id).all():
+                schedule_seats.append(ScheduleSeat(
+                    schedule_id=schedule.schedule_id, seat_id=seat.seat_id,
+                    schedule_start=schedule.start_time, status=SeatStatus.AVAILABLE.value
+                ))
+        for i in range(0, len(schedule_seats), 1000):
+            session.add_all(schedule_seats[i:i + 1000])
+            session.commit()
+        return len(schedule_seats)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ORM vs set-based schedule generation")
+    parser.add_argument("--seats", type=int, default=25000, help="Seats in the section")
+    parser.add_argument("--days", type=int, default=30, help="Days of shows to generate")
+    parser.add_argument("--times", default="19:00", help="Showtimes per day")
+    parser.add_argument("--orm-days", type=int, default=2, help="Days the ORM loop generates (0 to skip it)")
+    parser.add_argument("--duration", type=int, default=150)
+    args = parser.parse_args()
+
+    engine = create_engine(settings.get_database_url())
+    if engine.dialect.name != "postgresql":
+        parser.error("needs Postgres")
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    weekdays = parse_weekdays(",".join(WEEKDAYS))
+    showtimes = parse_showtimes(args.times)
+    first_day = (datetime.now() + timedelta(days=1)).date()
+    last_day = first_day + timedelta(days=args.days - 1)
+    shows = len(occurrences(first_day, last_day, weekdays, showtimes))
+
+    event_id, venue_id, section_id = create_section(Session, args.seats)
+    try:
+        print(f"{shows} shows x {args.seats} seats = {shows * args.seats} schedule seats")
+        print(f"{'mode':<11}{'shows':>7}{'rows':>10}{'seconds':>9}{'rows/s':>10}{'month s':>9}")
+
+        if args.orm_days:
+            start_times = occurrences(first_day, first_day + timedelta(days=args.orm_days - 1), weekdays, showtimes)
+            started = time.perf_counter()
+            rows = orm_generate(Session, event_id, venue_id, section_id, start_times, args.duration)
+            elapsed = time.perf_counter() - started
+            print(f"{'orm':<11}{len(start_times):>7}{rows:>10}{elapsed:>9.2f}{rows / elapsed:>10.0f}"
+                  f"{elapsed * shows / len(start_times):>9.1f}")
+            clear_schedules(Session, section_id)
+
+        with Session() as session:
+            started = time.perf_counter()
+            created, _, seats = generate_schedules(
+                session, event_id, section_id, first_day, last_day, weekdays, showtimes, args.duration
+            )
+            session.commit()
+            elapsed = time.perf_counter() - started
+        rows = len(created) * seats
+        print(f"{'set-based':<11}{len(created):>7}{rows:>10}{elapsed:>9.2f}{rows / elapsed:>10.0f}{elapsed:>9.1f}")
+    finally:
+        clear_schedules(Session, section_id)
+        with Session() as session:
+            session.query(Seat).filter(Seat.section_id == section_id).delete()
+            session.query(Section).filter(Section.section_id == section_id).delete()
+            session.commit()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
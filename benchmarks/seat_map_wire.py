@@ -0,0 +1,105 @@
+"""
+Seat-map wire format benchmark.
+
+Compares today's per-seat JSON body with the columnar JSON and msgpack
+encodings from seat_map.py, raw and compressed, on a synthetic 50,000-seat
+section (same shape as the Palace Grounds seed data).
+
+    python -m benchmarks.seat_map_wire [--seats 50000] [--repeat 5]
+"""
+import argparse
+import json
+import time
+from collections import namedtuple
+from decimal import Decimal
+from typing import List
+
+from pydantic import TypeAdapter
+
+from api import SeatResponse
+from compression import compress
+from seat_map import decode_columnar, encode_columnar, pack_msgpack
+
+SeatRow = namedtuple("SeatRow", "seat_id row_label seat_number seat_type base_price status")
+
+
+def make_seats(count: int):
+    seats = []
+    for i in range(count):
+        row, number = divmod(i, 50)
+        vip = row < count // 500
+        status = "BOOKED" if i % 7 == 0 else ("BLOCKED" if i % 31 == 0 else "AVAILABLE")
+        seats.append(SeatRow(
+            seat_id=100000 + i,
+            row_label=str(row + 1),
+            seat_number=number + 1,
+            seat_type="VIP" if vip else "GENERAL",
+            base_price=Decimal("2000.00") if vip else Decimal("1000.00"),
+            status=status,
+        ))
+    return seats
+
+
+def dumps(payload) -> bytes:
+    # Same settings as starlette.responses.JSONResponse.render
+    return json.dumps(payload, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+
+def encode_json(seats, adapter) -> bytes:
+    response = [seat._asdict() for seat in seats]
+    validated = adapter.validate_python(response)
+    # fastapi.routing.serialize_response: validate, then dump in JSON mode
+    return dumps(adapter.dump_python(validated, mode="json"))
+
+
+def encode_columnar_json(seats, adapter) -> bytes:
+    return dumps(encode_columnar(seats))
+
+
+def encode_columnar_msgpack(seats, adapter) -> bytes:
+    return pack_msgpack(encode_columnar(seats))
+
+
+def best_of(fn, repeat):
+    best = None
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Seat-map wire format benchmark")
+    parser.add_argument("--seats", type=int, default=50000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    seats = make_seats(args.seats)
+    adapter = TypeAdapter(List[SeatResponse])
+
+    encoders = [
+        ("json (today)", encode_json),
+        ("columnar json", encode_columnar_json),
+        ("columnar msgpack", encode_columnar_msgpack),
+    ]
+
+    columnar = json.loads(encode_columnar_json(seats, adapter))
+    assert len(decode_columnar(columnar)) == len(seats)
+
+    print(f"{args.seats} seats, best of {args.repeat}")
+    print(f"{'format':<18}{'encode ms':>11}{'raw bytes':>12}{'gzip':>11}{'gzip ms':>9}{'br':>11}{'br ms':>8}")
+    for name, encoder in encoders:
+        encode_time, body = best_of(lambda: encoder(seats, adapter), args.repeat)
+        gzip_time, gzipped = best_of(lambda: compress(body, "gzip"), args.repeat)
+        br_time, brotlied = best_of(lambda: compress(body, "br"), args.repeat)
+        print(
+            f"{name:<18}{encode_time * 1000:>11.1f}{len(body):>12,}"
+            f"{len(gzipped):>11,}{gzip_time * 1000:>9.1f}{len(brotlied):>11,}{br_time * 1000:>8.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
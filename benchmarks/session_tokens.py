@@ -0,0 +1,84 @@
+"""
+Session tokens: queries and time saved per authenticated request.
+
+Runs the user-resolution and booking-history path of GET
+/users/{user_id}/bookings (api.resolve_user_id + api.fetch_user_bookings)
+for the first --users users of the configured database, three ways:
+
+  raw, cold cache   raw user_id, entity cache empty (TTL expired, or a
+                    worker that hasn't seen the user): a users lookup
+  raw, warm cache   raw user_id, user already cached
+  token             signed session token, verified without the database
+
+and reports SQL statements and milliseconds per request, plus the cost of
+verifying one token.
+
+    python -m benchmarks.session_tokens [--users 50] [--rounds 20]
+"""
+import argparse
+import statistics
+import time
+
+from sqlalchemy import event
+
+import cache
+from api import fetch_user_bookings, resolve_user_id
+from auth import issue_token, verify_token
+from database import SessionLocal, engine, test_connection
+from models import User
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-request savings of session tokens")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--verifications", type=int, default=100000)
+    args = parser.parse_args()
+
+    token = issue_token(1)
+    started = time.perf_counter()
+    for _ in range(args.verifications):
+        verify_token(token)
+    print(f"token verification: {(time.perf_counter() - started) / args.verifications * 1e6:.1f} us")
+
+    if not test_connection():
+        parser.error("needs a database")
+
+    queries = [0]
+    event.listen(engine, "before_cursor_execute", lambda *_: queries.__setitem__(0, queries[0] + 1))
+
+    with SessionLocal() as db:
+        user_ids = [user_id for (user_id,) in db.query(User.user_id).order_by(User.user_id).limit(args.users)]
+        tokens = {user_id: verify_token(issue_token(user_id)) for user_id in user_ids}
+
+        modes = [
+            ("raw, cold cache", lambda user_id: (cache.clear_all(), resolve_user_id(db, None, user_id))[1]),
+            ("raw, warm cache", lambda user_id: resolve_user_id(db, None, user_id)),
+            ("token", lambda user_id: resolve_user_id(db, tokens[user_id], user_id)),
+        ]
+        print(f"{len(user_ids)} users x {args.rounds} rounds")
+        print(f"{'mode':<18}{'queries/req':>12}{'auth queries':>14}{'ms/req':>9}")
+        for name, resolve in modes:
+            cache.clear_all()
+            for user_id in user_ids:  # warm the pool and, for the warm mode, the cache
+                fetch_user_bookings(db, resolve(user_id))
+
+            queries[0] = 0
+            auth_queries = 0
+            latencies = []
+            for _ in range(args.rounds):
+                for user_id in user_ids:
+                    started = time.perf_counter()
+                    before = queries[0]
+                    resolved = resolve(user_id)
+                    auth_queries += queries[0] - before
+                    fetch_user_bookings(db, resolved)
+                    latencies.append(time.perf_counter() - started)
+                    db.rollback()
+            requests = len(latencies)
+            print(f"{name:<18}{queries[0] / requests:>12.2f}{auth_queries / requests:>14.2f}"
+                  f"{statistics.mean(latencies) * 1000:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
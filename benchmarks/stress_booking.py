@@ -0,0 +1,284 @@
+"""
+Concurrency stress test of the seat booking flow, with invariant checks.
+
+Creates a scratch schedule, then --processes worker processes each run their
+share of --sequences booking sequences against a running server (--url),
+--concurrency at a time, all on the same --seats seats so they overlap
+constantly. A sequence is one of:
+
+  full      lock seats, book them, pay (the server fails ~1 in 4 payments)
+  abandon   lock seats and walk away (they stay BLOCKED)
+  direct    book without locking first
+  double    lock, book, then send two payments for the booking at once
+
+Afterwards it checks, straight from the database:
+
+  - no seat is in two CONFIRMED bookings, or in two live (PENDING/CONFIRMED) ones
+  - schedule_seats.status agrees with booking_seats: BOOKED seats have exactly
+    one live booking, seats of live bookings are BOOKED
+  - every BLOCKED seat was locked by a sequence that never booked it (no leaks)
+  - no booking has more than one successful payment, and CONFIRMED ones have one
+
+and reports throughput and per-endpoint latency, so locking changes can be
+judged on correctness and speed together. The scratch data is deleted
+afterwards unless --keep.
+
+    python main.py &    # the server under test, on the same database
+    python -m benchmarks.stress_booking [--url http://localhost:8000] [--processes 8] [--sequences 5000]
+"""
+import argparse
+import asyncio
+import multiprocessing
+import random
+import statistics
+import time
+from collections import Counter
+
+import httpx
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from benchmarks.ga_inventory import create_scratch, drop_scratch
+from models import Schedule, ScheduleSeat, User
+from settings import settings
+
+MIX = {"full": 0.7, "abandon": 0.1, "direct": 0.1, "double": 0.1}
+
+INVARIANTS = {
+    "seat in two CONFIRMED bookings": """
+        SELECT bs.schedule_seat_id FROM booking_seats bs
+        JOIN bookings b ON b.booking_id = bs.booking_id
+        WHERE b.schedule_id = :schedule_id AND b.status = 'CONFIRMED'
+        GROUP BY bs.schedule_seat_id HAVING count(*) > 1
+    """,
+    "seat in two live bookings": """
+        SELECT bs.schedule_seat_id FROM booking_seats bs
+        JOIN bookings b ON b.booking_id = bs.booking_id
+        WHERE b.schedule_id = :schedule_id AND b.status IN ('PENDING', 'CONFIRMED')
+        GROUP BY bs.schedule_seat_id HAVING count(*) > 1
+    """,
+    "BOOKED seat without a live booking": """
+        SELECT ss.schedule_seat_id FROM schedule_seats ss
+        WHERE ss.schedule_id = :schedule_id AND ss.status = 'BOOKED' AND NOT EXISTS (
+            SELECT 1 FROM booking_seats bs JOIN bookings b ON b.booking_id = bs.booking_id
+            WHERE bs.schedule_seat_id = ss.schedule_seat_id AND b.status IN ('PENDING', 'CONFIRMED')
+        )
+    """,
+    "live booking's seat not BOOKED": """
+        SELECT bs.schedule_seat_id FROM booking_seats bs
+        JOIN bookings b ON b.booking_id = bs.booking_id
+        JOIN schedule_seats ss ON ss.schedule_seat_id = bs.schedule_seat_id AND ss.schedule_start = b.schedule_start
+        WHERE b.schedule_id = :schedule_id AND b.status IN ('PENDING', 'CONFIRMED') AND ss.status <> 'BOOKED'
+    """,
+    "booking paid more than once": """
+        SELECT p.booking_id FROM payments p JOIN bookings b ON b.booking_id = p.booking_id
+        WHERE b.schedule_id = :schedule_id AND p.status = 'SUCCESS'
+        GROUP BY p.booking_id HAVING count(*) > 1
+    """,
+    "CONFIRMED booking without a successful payment": """
+        SELECT b.booking_id FROM bookings b
+        WHERE b.schedule_id = :schedule_id AND b.status = 'CONFIRMED' AND NOT EXISTS (
+            SELECT 1 FROM payments p WHERE p.booking_id = b.booking_id AND p.status = 'SUCCESS'
+        )
+    """,
+}
+
+
+class Sequences:
+    """One worker process's sequences; collects outcomes and per-endpoint latencies."""
+
+    def __init__(self, client, target, rng):
+        self.client = client
+        self.target = target
+        self.rng = rng
+        self.outcomes = Counter()
+        self.statuses = Counter()
+        self.latencies = {}
+        self.unbooked_locks = set()  # seats this worker locked and never booked
+
+    async def call(self, name, path, body):
+        """(status code, JSON body); status None when the request failed in transport (outcome unknown)."""
+        started = time.perf_counter()
+        try:
+            response = await self.client.post(path, json=body)
+        except httpx.HTTPError as e:
+            self.statuses[f"{name} {type(e).__name__}"] += 1
+            return None, None
+        self.latencies.setdefault(name, []).append(time.perf_counter() - started)
+        self.statuses[f"{name} {response.status_code}"] += 1
+        is_json = response.headers.get("content-type", "").startswith("application/json")
+        return response.status_code, response.json() if is_json else None
+
+    async def lock(self, seat_ids):
+        status, _ = await self.call("lock", "/seats/lock", {"schedule_id": self.target["schedule_id"], "seat_ids": seat_ids})
+        if status is None:
+            self.unbooked_locks.update(seat_ids)  # the lock may have landed
+        return status == 200
+
+    async def book(self, seat_ids):
+        status, booking = await self.call("book", "/bookings", {
+            "event_id": self.target["event_id"], "schedule_id": self.target["schedule_id"],
+            "seat_ids": seat_ids, "payment_method": "UPI"
+        })
+        return booking if status == 200 else None
+
+    async def pay(self, booking):
+        status, payment = await self.call("pay", "/payments", {
+            "booking_id": booking["booking_id"], "amount": str(booking["total_amount"]), "method": "UPI"
+        })
+        return payment["status"] if status == 200 else "REJECTED"
+
+    async def run(self, kind):
+        seat_ids = self.rng.sample(self.target["seat_ids"], self.rng.randint(1, 4))
+        if kind != "direct":
+            if not await self.lock(seat_ids):
+                self.outcomes[f"{kind}: lock refused"] += 1
+                return
+            if kind == "abandon":
+                self.unbooked_locks.update(seat_ids)
+                self.outcomes["abandon: locked"] += 1
+                return
+
+        booking = await self.book(seat_ids)
+        if booking is None:
+            if kind != "direct":
+                self.unbooked_locks.update(seat_ids)
+            self.outcomes[f"{kind}: booking refused"] += 1
+            return
+
+        if kind == "double":
+            results = await asyncio.gather(self.pay(booking), self.pay(booking))
+            self.outcomes[f"double: {'/'.join(sorted(results))}"] += 1
+        else:
+            self.outcomes[f"{kind}: {await self.pay(booking)}"] += 1
+
+
+def worker(job):
+    target, sequences, concurrency, token, seed = job
+    rng = random.Random(seed)
+    kinds = rng.choices(list(MIX), weights=list(MIX.values()), k=sequences)
+
+    async def main():
+        limits = httpx.Limits(max_connections=concurrency)
+        headers = {"Authorization": f"Bearer {token}"}
+        async with httpx.AsyncClient(base_url=target["url"], headers=headers, limits=limits, timeout=60) as client:
+            runner = Sequences(client, target, rng)
+            gate = asyncio.Semaphore(concurrency)
+
+            async def one(kind):
+                async with gate:
+                    await runner.run(kind)
+
+            await asyncio.gather(*[one(kind) for kind in kinds])
+            return runner
+
+    runner = asyncio.run(main())
+    return runner.outcomes, runner.statuses, runner.latencies, runner.unbooked_locks
+
+
+def check_invariants(Session, schedule_id, unbooked_locks):
+    violations = {}
+    with Session() as session:
+        for name, query in INVARIANTS.items():
+            rows = session.execute(text(query), {"schedule_id": schedule_id}).scalars().all()
+            if rows:
+                violations[name] = rows
+        blocked = session.query(ScheduleSeat.seat_id).filter(
+            ScheduleSeat.schedule_id == schedule_id, ScheduleSeat.status == "BLOCKED"
+        ).all()
+        leaked = sorted({seat_id for (seat_id,) in blocked} - unbooked_locks)
+        if leaked:
+            violations["BLOCKED seat nobody holds"] = leaked
+        statuses = dict(session.execute(text(
+            "SELECT status, count(*) FROM schedule_seats WHERE schedule_id = :schedule_id GROUP BY status"
+        ), {"schedule_id": schedule_id}).all())
+    return violations, statuses
+
+
+def drop_bookings(Session, schedule_id):
+    with Session() as session:
+        booking_ids = "SELECT booking_id FROM bookings WHERE schedule_id = :schedule_id"
+        session.execute(text(f"DELETE FROM payments WHERE booking_id IN ({booking_ids})"), {"schedule_id": schedule_id})
+        session.execute(text(f"DELETE FROM booking_seats WHERE booking_id IN ({booking_ids})"), {"schedule_id": schedule_id})
+        session.execute(text("DELETE FROM bookings WHERE schedule_id = :schedule_id"), {"schedule_id": schedule_id})
+        session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent lock/book/pay stress test with invariant checks")
+    parser.add_argument("--url", default=f"http://localhost:{settings.SERVER_PORT}", help="Server under test")
+    parser.add_argument("--seats", type=int, default=500, help="Seats every sequence competes for")
+    parser.add_argument("--sequences", type=int, default=5000)
+    parser.add_argument("--processes", type=int, default=8)
+    parser.add_argument("--concurrency", type=int, default=25, help="Sequences in flight per process")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--keep", action="store_true", help="Keep the scratch schedule and its bookings")
+    args = parser.parse_args()
+
+    engine = create_engine(settings.get_database_url())
+    if engine.dialect.name != "postgresql":
+        parser.error("needs Postgres")
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    with Session() as session:
+        user = session.query(User).order_by(User.user_id).first()
+        if user is None:
+            parser.error("needs at least one user; run seed_data.py first")
+        email = user.email
+    token = httpx.post(f"{args.url}/users/login", json={"email": email}, timeout=10).json()["token"]
+
+    section_id, schedule_id, _, _ = create_scratch(Session, args.seats)
+    try:
+        with Session() as session:
+            event_id = session.get(Schedule, schedule_id).event_id
+            seat_ids = [seat_id for (seat_id,) in session.query(ScheduleSeat.seat_id).filter(ScheduleSeat.schedule_id == schedule_id)]
+        target = {"url": args.url, "schedule_id": schedule_id, "event_id": event_id, "seat_ids": seat_ids}
+        shares = [args.sequences // args.processes + (i < args.sequences % args.processes) for i in range(args.processes)]
+        jobs = [(target, share, args.concurrency, token, args.seed + i) for i, share in enumerate(shares)]
+
+        print(f"{args.sequences} sequences on {args.seats} seats of schedule {schedule_id}: "
+              f"{args.processes} processes x {args.concurrency} in flight")
+        started = time.perf_counter()
+        with multiprocessing.Pool(args.processes) as pool:
+            results = pool.map(worker, jobs)
+        elapsed = time.perf_counter() - started
+
+        outcomes, statuses, latencies, unbooked_locks = Counter(), Counter(), {}, set()
+        for worker_outcomes, worker_statuses, worker_latencies, worker_locks in results:
+            outcomes.update(worker_outcomes)
+            statuses.update(worker_statuses)
+            unbooked_locks |= worker_locks
+            for name, values in worker_latencies.items():
+                latencies.setdefault(name, []).extend(values)
+
+        calls = sum(len(values) for values in latencies.values())
+        print(f"\n{elapsed:.1f} s: {args.sequences / elapsed:.0f} sequences/s, {calls / elapsed:.0f} requests/s")
+        print(f"{'endpoint':<10}{'calls':>8}{'p50 ms':>9}{'p99 ms':>9}{'max ms':>9}")
+        for name, values in latencies.items():
+            values.sort()
+            print(f"{name:<10}{len(values):>8}{statistics.median(values) * 1000:>9.1f}"
+                  f"{values[int(len(values) * 0.99) - 1] * 1000:>9.1f}{values[-1] * 1000:>9.1f}")
+        print("\nresponses: " + ", ".join(f"{name} x{count}" for name, count in sorted(statuses.items())))
+        print("outcomes:  " + ", ".join(f"{name} x{count}" for name, count in sorted(outcomes.items())))
+
+        violations, seat_statuses = check_invariants(Session, schedule_id, unbooked_locks)
+        print("seats:     " + ", ".join(f"{status} {count}" for status, count in sorted(seat_statuses.items())))
+        if violations:
+            for name, rows in violations.items():
+                print(f"VIOLATION {name}: {len(rows)} (e.g. {rows[:10]})")
+        else:
+            print(f"OK: all {len(INVARIANTS) + 1} invariants hold")
+    finally:
+        if args.keep:
+            print(f"Kept scratch section {section_id}, schedule {schedule_id}")
+        else:
+            drop_bookings(Session, schedule_id)
+            drop_scratch(Session, section_id, schedule_id)
+        engine.dispose()
+
+    if violations:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
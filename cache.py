@@ -0,0 +1,167 @@
+"""
+In-process entity cache for rows that are read on every request but rarely
+change (events, schedules, users, venues, sections).
+
+Cached values are detached snapshots of the row's columns, so they can be
+shared across sessions and used anywhere the ORM object was used for
+attribute access (including pydantic from_attributes responses).
+"""
+from threading import RLock
+from types import SimpleNamespace
+
+from cachetools import TTLCache
+from sqlalchemy import inspect
+from sqlalchemy.orm import Session
+
+import metrics
+import layout_store
+from database import register_invalidation_handler, FLUSH_ALL
+from models import Event, Schedule, User, Venue, Section, Seat
+from settings import settings
+
+_MISSING = object()
+
+
+def snapshot(instance):
+    if instance is None:
+        return None
+    mapper = inspect(instance).mapper
+    return SimpleNamespace(**{attr.key: getattr(instance, attr.key) for attr in mapper.column_attrs})
+
+
+class EntityCache:
+    def __init__(self, name: str, maxsize: int, ttl: float):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = RLock()
+
+    def get(self, key, loader):
+        with self._lock:
+            value = self._cache.get(key, _MISSING)
+            if value is not _MISSING:
+                self.hits += 1
+                return value
+            self.misses += 1
+
+        value = loader()
+        if value is not None:
+            self.set(key, value)
+        return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._cache[key] = value
+
+    def invalidate(self, key):
+        with self._lock:
+            self._cache.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._cache),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+            }
+
+
+events = EntityCache("event", settings.CACHE_MAXSIZE, settings.CACHE_TTL_EVENT)
+schedules = EntityCache("schedule", settings.CACHE_MAXSIZE, settings.CACHE_TTL_SCHEDULE)
+users = EntityCache("user", settings.CACHE_MAXSIZE, settings.CACHE_TTL_USER)
+users_by_email = EntityCache("user_email", settings.CACHE_MAXSIZE, settings.CACHE_TTL_USER)
+venues = EntityCache("venue", settings.CACHE_MAXSIZE, settings.CACHE_TTL_VENUE)
+sections = EntityCache("section", settings.CACHE_MAXSIZE, settings.CACHE_TTL_VENUE)
+section_layouts = EntityCache("section_layout", settings.CACHE_LAYOUT_MAXSIZE, settings.CACHE_TTL_VENUE)
+
+caches = {
+    cache.name: cache
+    for cache in (events, schedules, users, users_by_email, venues, sections, section_layouts)
+}
+
+
+def _load(db: Session, model, criterion):
+    return snapshot(db.query(model).filter(criterion).first())
+
+
+def get_event(db: Session, event_id: int):
+    return events.get(event_id, lambda: _load(db, Event, Event.event_id == event_id))
+
+def get_schedule(db: Session, schedule_id: int):
+    return schedules.get(schedule_id, lambda: _load(db, Schedule, Schedule.schedule_id == schedule_id))
+
+def get_user(db: Session, user_id: int):
+    return users.get(user_id, lambda: _load(db, User, User.user_id == user_id))
+
+def get_user_by_email(db: Session, email: str):
+    return users_by_email.get(email, lambda: _load(db, User, User.email == email))
+
+def get_venue(db: Session, venue_id: int):
+    return venues.get(venue_id, lambda: _load(db, Venue, Venue.venue_id == venue_id))
+
+def get_section(db: Session, section_id: int):
+    return sections.get(section_id, lambda: _load(db, Section, Section.section_id == section_id))
+
+def load_section_layout(db: Session, section_id: int):
+    return db.query(
+        Seat.seat_id,
+        Seat.row_label,
+        Seat.seat_number,
+        Seat.seat_type,
+        Seat.base_price
+    ).filter(
+        Seat.section_id == section_id
+    ).order_by(Seat.row_label, Seat.seat_number).all()
+
+def get_section_layout(db: Session, section_id: int):
+    """The section's seats in seat-map order; the static half of every seat map."""
+    if settings.LAYOUT_STORE_DIR:
+        layout = layout_store.open_layout(section_id)
+        if layout is not None:
+            return layout
+    return section_layouts.get(section_id, lambda: load_section_layout(db, section_id))
+
+
+def invalidate(entity: str, key):
+    cache = caches.get(entity)
+    if cache is not None:
+        cache.invalidate(key)
+
+@register_invalidation_handler
+def _on_invalidation(entity: str, key):
+    if entity == FLUSH_ALL:
+        clear_all()
+    elif entity not in caches:
+        return
+    elif key is None:
+        caches[entity].clear()
+    else:
+        # Bus messages carry string keys; every entity except user_email is keyed by id
+        invalidate(entity, key if entity == users_by_email.name else int(key))
+
+def clear_all():
+    for cache in caches.values():
+        cache.clear()
+
+def cache_stats():
+    return {name: cache.stats() for name, cache in caches.items()}
+
+@metrics.register_collector
+def _cache_metrics():
+    stats = cache_stats()
+    return [
+        ("epicly_cache_hits_total", "counter", "Entity cache hits", [({"cache": name}, entry["hits"]) for name, entry in stats.items()]),
+        ("epicly_cache_misses_total", "counter", "Entity cache misses", [({"cache": name}, entry["misses"]) for name, entry in stats.items()]),
+        ("epicly_cache_entries", "gauge", "Entity cache entries", [({"cache": name}, entry["size"]) for name, entry in stats.items()]),
+    ]
@@ -0,0 +1,166 @@
+"""
+Opt-in traffic capture (CAPTURE_ENABLED) for replay.py.
+
+CaptureMiddleware records every request as one JSON line: start time,
+method, path, route template, query string, JSON body, response status,
+duration and how many requests were in flight. Records are sanitized before
+they leave the request: no headers are kept, and body fields and query
+parameters that carry credentials or personal data are replaced. Writing happens on a background
+thread behind a bounded queue, so a slow disk never delays a response (records
+are dropped and counted instead), and the file is rotated to <path>.1 once it
+reaches CAPTURE_MAX_BYTES, so a capture never takes more than twice that.
+"""
+import json
+import os
+import queue
+import random
+import threading
+import time
+from urllib.parse import parse_qsl, urlencode
+
+import metrics
+
+# Body fields replaced by REDACTED (matched case-insensitively, at any depth)
+SENSITIVE_FIELDS = {"email", "phone", "name", "password", "token", "card_number", "cvv", "upi_id", "transaction_id"}
+REDACTED = "[redacted]"
+
+# Query parameters replaced by REDACTED: the body fields, user ids, and anything token- or key-like
+# (a word of the name, split on "_" / "-", is one of SENSITIVE_QUERY_WORDS: access_token, api-key, sig)
+SENSITIVE_QUERY_PARAMS = SENSITIVE_FIELDS | {"user_id"}
+SENSITIVE_QUERY_WORDS = {"token", "secret", "key", "apikey", "signature", "sig", "password", "auth", "authorization"}
+
+
+def sanitize(value):
+    if isinstance(value, dict):
+        return {key: REDACTED if key.lower() in SENSITIVE_FIELDS else sanitize(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [sanitize(item) for item in value]
+    return value
+
+
+def sanitize_query(query: str) -> str:
+    """The query string with sensitive parameters' values replaced (unchanged when there are none)."""
+    params = parse_qsl(query, keep_blank_values=True)
+    sensitive = [
+        key.lower() in SENSITIVE_QUERY_PARAMS
+        or not SENSITIVE_QUERY_WORDS.isdisjoint(key.lower().replace("-", "_").split("_"))
+        for key, _ in params
+    ]
+    if not any(sensitive):
+        return query
+    return urlencode([(key, REDACTED if redact else value) for (key, value), redact in zip(params, sensitive)])
+
+
+class CaptureWriter:
+    """Appends records to a JSONL file from a daemon thread; submit() never blocks."""
+
+    def __init__(self, path: str, max_bytes: int, queue_size: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = None
+
+    def start(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._thread = threading.Thread(target=self._run, name="capture-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, record):
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            metrics.dropped_captures.inc()
+
+    def _run(self):
+        capture_file = open(self.path, "a")
+        try:
+            while True:
+                record = self._queue.get()
+                if record is None:
+                    return
+                records = [record]
+                while not self._queue.empty() and len(records) < 1000:
+                    records.append(self._queue.get_nowait())
+                stop = None in records
+                records = [record for record in records if record is not None]
+
+                capture_file.write("".join(json.dumps(record, separators=(",", ":"), default=str) + "\n" for record in records))
+                capture_file.flush()
+                metrics.captured_requests.inc(len(records))
+                if capture_file.tell() >= self.max_bytes:
+                    capture_file.close()
+                    os.replace(self.path, f"{self.path}.1")
+                    capture_file = open(self.path, "a")
+                if stop:
+                    return
+        finally:
+            capture_file.close()
+
+    def close(self, timeout: float = 5.0):
+        """Write what is queued, then stop the thread."""
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join(timeout)
+        self._thread = None
+
+
+class CaptureMiddleware:
+    def __init__(self, app, writer: CaptureWriter, sample: float = 1.0, exclude=(), max_body: int = 65536):
+        self.app = app
+        self.writer = writer
+        self.sample = sample
+        self.exclude = set(exclude)
+        self.max_body = max_body
+        self.in_flight = 0
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.exclude or random.random() >= self.sample:
+            await self.app(scope, receive, send)
+            return
+
+        chunks = []
+        size = 0
+        status_code = 500
+
+        async def receive_recording():
+            nonlocal size
+            message = await receive()
+            if message["type"] == "http.request" and size <= self.max_body:
+                size += len(message.get("body", b""))
+                chunks.append(message.get("body", b""))
+            return message
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        self.in_flight += 1
+        record = {"ts": time.time(), "in_flight": self.in_flight}
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive_recording, send_with_status)
+        finally:
+            self.in_flight -= 1
+            record.update(
+                method=scope["method"],
+                path=scope["path"],
+                route=getattr(scope.get("route"), "path", None),
+                query=sanitize_query(scope.get("query_string", b"").decode("latin-1")),
+                body=self._body(chunks, size),
+                status=status_code,
+                duration_ms=round((time.perf_counter() - started) * 1000, 3),
+            )
+            self.writer.submit(record)
+
+    def _body(self, chunks, size):
+        if not chunks or size == 0:
+            return None
+        if size > self.max_body:
+            return {"_omitted_bytes": size}
+        try:
+            return sanitize(json.loads(b"".join(chunks)))
+        except ValueError:
+            return {"_omitted_bytes": size}
@@ -1,16 +1,85 @@
-from sqlalchemy import create_engine
+import re
+import time
+import random
+import asyncio
+from collections import deque
+from contextvars import ContextVar
+from contextlib import contextmanager
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+
+from sqlalchemy import BigInteger, PrimaryKeyConstraint, create_engine, event, text
+from sqlalchemy.exc import DBAPIError, InterfaceError, OperationalError, TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.compiler import compiles
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import StaticPool
+from sqlalchemy.schema import CreateColumn
+from sqlalchemy.pool import QueuePool, StaticPool
 
+import metrics
 from models import Base
 from settings import settings
 
-def create_database_engine():
-    database_url = settings.get_database_url()
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited for a connection."""
+    
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            metrics.pool_checkout_timeouts.inc()
+            db_breaker.failure()
+            raise
+        finally:
+            metrics.pool_checkout_wait.observe(time.perf_counter() - started)
+
+# Embedded SQLite mode: Postgres-only features (partitions, NOTIFY invalidations, statement
+# timeouts, schedule generation, EXPLAIN sampling) are skipped where the dialect is checked.
+# Its DDL needs two changes for ids to auto-increment: only an "INTEGER PRIMARY KEY" column
+# aliases the rowid (INTEGER is 64-bit anyway), and the partitioned tables' (id, schedule_start)
+# keys are reduced to the id.
+
+@compiles(BigInteger, "sqlite")
+def _sqlite_big_integer(type_, compiler, **kw):
+    return "INTEGER"
+
+def _generated_key_column(constraint):
+    generated = [column for column in constraint.columns if column.autoincrement is True]
+    return generated[0] if len(constraint.columns) > 1 and len(generated) == 1 else None
+
+@compiles(PrimaryKeyConstraint, "sqlite")
+def _sqlite_primary_key(constraint, compiler, **kw):
+    column = _generated_key_column(constraint)
+    if column is not None:
+        return f"PRIMARY KEY ({compiler.preparer.format_column(column)})"
+    return compiler.visit_primary_key_constraint(constraint, **kw)
+
+@compiles(CreateColumn, "sqlite")
+def _sqlite_column(create, compiler, **kw):
+    column = create.element
+    if column.primary_key and column is _generated_key_column(column.table.primary_key):
+        # The dialect refuses autoincrement in a composite key; the key is reduced above
+        return f"{compiler.preparer.format_column(column)} INTEGER NOT NULL"
+    return compiler.visit_create_column(create, **kw)
+
+def create_database_engine(driver: str = None):
+    driver = driver or settings.DB_DRIVER
+    database_url = settings.get_database_url(driver)
     engine_config = { "pool_pre_ping": True, "echo": settings.DEBUG }
     
+    if driver == "sqlite":
+        engine_config["connect_args"] = { "check_same_thread": False }
+        if settings.SQLITE_PATH == ":memory:":
+            engine_config["poolclass"] = StaticPool  # one connection, or every checkout gets an empty database
+        return create_engine(database_url, **engine_config)
+    
+    if driver == "psycopg":
+        engine_config["connect_args"] = { "prepare_threshold": settings.DB_PREPARE_THRESHOLD }
+    
     if settings.is_production:
         engine_config.update({
+            "poolclass": InstrumentedQueuePool,
             "pool_size": 10,
             "max_overflow": 20,
             "pool_timeout": 30,
@@ -26,9 +95,393 @@ def create_database_engine():
 engine = create_database_engine()
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Circuit breaker -------------------------------------------------------------------------------------------
+# Connection errors and pool checkout timeouts count as failures, any completed statement as a
+# success. DB_BREAKER_THRESHOLD failures in a row open the circuit: get_db fails fast with
+# DatabaseUnavailable (503) and cached reads are served stale. After DB_BREAKER_RESET seconds
+# one request at a time is let through as a probe; a statement that completes closes it again.
+
+class DatabaseUnavailable(Exception):
+    pass
+
+class CircuitBreaker:
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+    
+    def __init__(self, threshold: int, reset_timeout: float):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trips = 0
+        self._probe_at = 0.0
+        self._lock = Lock()
+    
+    def allow(self) -> bool:
+        if self.state == self.CLOSED:
+            return True
+        with self._lock:
+            now = time.monotonic()
+            if now - self.opened_at < self.reset_timeout or now - self._probe_at < self.reset_timeout:
+                return False
+            self.state = self.HALF_OPEN
+            self._probe_at = now
+            return True
+    
+    def ready(self) -> bool:
+        """Whether allow() would let a request through, without claiming the probe."""
+        now = time.monotonic()
+        return self.state == self.CLOSED or (
+            now - self.opened_at >= self.reset_timeout and now - self._probe_at >= self.reset_timeout
+        )
+    
+    def success(self):
+        if self.failures or self.state != self.CLOSED:
+            with self._lock:
+                self.failures = 0
+                self.state = self.CLOSED
+    
+    def failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or (self.state == self.CLOSED and self.failures >= self.threshold):
+                if self.state == self.CLOSED:
+                    self.trips += 1
+                    metrics.db_circuit_trips.inc()
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+    
+    def stats(self):
+        return {"state": self.state, "consecutive_failures": self.failures, "trips": self.trips}
+
+db_breaker = CircuitBreaker(settings.DB_BREAKER_THRESHOLD, settings.DB_BREAKER_RESET)
+
+def is_database_outage(exc: BaseException) -> bool:
+    """Errors that mean the database is unreachable or saturated, rather than a bad query."""
+    if isinstance(exc, (DatabaseUnavailable, OperationalError, InterfaceError, PoolTimeoutError)):
+        return True
+    return isinstance(exc, DBAPIError) and exc.connection_invalidated
+
+@event.listens_for(engine, "handle_error")
+def _record_database_failure(exception_context):
+    if sqlstate(exception_context.sqlalchemy_exception) in (QUERY_CANCELED, LOCK_NOT_AVAILABLE):
+        return  # our own statement/lock timeouts, not an unhealthy database
+    if exception_context.is_disconnect or isinstance(exception_context.sqlalchemy_exception, (OperationalError, InterfaceError)):
+        db_breaker.failure()
+
+# Request deadlines -------------------------------------------------------------------------------------------
+# A route's latency budget (set per request by api.enforce_deadline) is applied to every
+# transaction of its session (api.get_db, or session_scope(request_deadline.get()) for the
+# renders behind the response cache) as SET LOCAL statement_timeout = what is left of the budget,
+# and lock_timeout = min(LOCK_TIMEOUT_MS, that). When the client disconnects, the statement in
+# flight is cancelled and later ones are refused. Background work uses session_scope() with no
+# deadline.
+
+QUERY_CANCELED = "57014"
+LOCK_NOT_AVAILABLE = "55P03"
+
+class DeadlineExceeded(Exception):
+    pass
+
+class Deadline:
+    def __init__(self, budget_ms: float, lock_timeout_ms: float):
+        self.budget_ms = budget_ms
+        self.lock_timeout_ms = lock_timeout_ms
+        self.expires_at = time.monotonic() + budget_ms / 1000
+        self.cancelled = False
+        self._connections = set()  # DBAPI connections with a transaction open for this request
+        self._lock = Lock()
+    
+    def remaining_ms(self) -> int:
+        return int((self.expires_at - time.monotonic()) * 1000)
+    
+    def check(self):
+        if self.cancelled:
+            raise DeadlineExceeded("Client disconnected")
+        if self.remaining_ms() <= 0:
+            raise DeadlineExceeded(f"Request deadline of {self.budget_ms:g} ms exceeded")
+    
+    def attach(self, dbapi_connection):
+        with self._lock:
+            self._connections.add(dbapi_connection)
+    
+    def detach(self, dbapi_connection):
+        with self._lock:
+            self._connections.discard(dbapi_connection)
+    
+    def cancel(self):
+        """The client went away: cancel whatever statement is running for it (safe from any thread)."""
+        self.cancelled = True
+        with self._lock:
+            connections = list(self._connections)
+        for dbapi_connection in connections:
+            cancel = getattr(dbapi_connection, "cancel", None)
+            if cancel is not None:
+                try:
+                    cancel()
+                except Exception:
+                    pass
+
+request_deadline: ContextVar = ContextVar("request_deadline", default=None)
+
+def sqlstate(exc: BaseException):
+    orig = getattr(exc, "orig", None)
+    return getattr(orig, "pgcode", None) or getattr(orig, "sqlstate", None)
+
+@event.listens_for(SessionLocal, "after_begin")
+def _apply_deadline(session, transaction, connection):
+    deadline = session.info.get("deadline")
+    if deadline is None:
+        return
+    deadline.check()
+    pooled = connection.connection
+    pooled.info["deadline"] = deadline
+    session.info["deadline_connection"] = (pooled.info, pooled.dbapi_connection)
+    deadline.attach(pooled.dbapi_connection)
+    
+    if connection.dialect.name == "postgresql":
+        remaining = max(deadline.remaining_ms(), 1)
+        connection.execute(
+            text("SELECT set_config('statement_timeout', :statement, true), set_config('lock_timeout', :lock, true)"),
+            {"statement": str(remaining), "lock": str(int(min(deadline.lock_timeout_ms, remaining)))}
+        )
+
+@event.listens_for(SessionLocal, "after_transaction_end")
+def _release_deadline(session, transaction):
+    if transaction.parent is not None or "deadline_connection" not in session.info:
+        return
+    # The connection may be back in the pool already, so use what after_begin captured
+    info, dbapi_connection = session.info.pop("deadline_connection")
+    info.pop("deadline", None)
+    session.info["deadline"].detach(dbapi_connection)
+
+def connect_raw():
+    """A DBAPI connection outside the pool, for listeners and diagnostics."""
+    cargs, cparams = engine.dialect.create_connect_args(engine.url)
+    return engine.dialect.loaded_dbapi.connect(*cargs, **cparams)
+
+# Query instrumentation -------------------------------------------------------------------------------------------
+# Every statement is counted towards the current request's metrics; statements slower than
+# SLOW_QUERY_MS are kept in a bounded ring buffer with their parameter types (not values: they
+# hold emails and tokens) and route, and a sample of the read-only SELECTs among them gets an
+# EXPLAIN (ANALYZE, BUFFERS) captured off the request path.
+
+slow_queries = deque(maxlen=settings.SLOW_QUERY_BUFFER_SIZE)
+_explain_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="explain")
+
+# EXPLAIN ANALYZE runs the statement again: skip anything that writes (including a WITH ... INSERT),
+# takes row locks (they would wait behind the request's own locks) or has side effects
+_not_read_only = re.compile(
+    r"\b(INSERT|UPDATE|DELETE|MERGE|FOR\s+(NO\s+KEY\s+)?UPDATE|FOR\s+(KEY\s+)?SHARE)\b"
+    r"|\b(pg_notify|set_config|nextval|setval|pg_advisory\w*|pg_try_advisory\w*|pg_cancel_backend|pg_terminate_backend)\s*\(",
+    re.IGNORECASE
+)
+
+def _explainable(statement: str) -> bool:
+    words = statement.split(None, 1)
+    return bool(words) and words[0].upper() in ("SELECT", "WITH") and not _not_read_only.search(statement)
+
+def _parameter_types(value):
+    if isinstance(value, dict):
+        return {key: _parameter_types(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_parameter_types(item) for item in value]
+    return type(value).__name__
+
+def _explain(entry, statement, parameters):
+    connection = None
+    try:
+        connection = connect_raw()
+        with connection.cursor() as cursor:
+            # Read-only and time-boxed, so a replay can neither write nor hold up the explain thread
+            cursor.execute(f"SET statement_timeout = {int(settings.SLOW_QUERY_EXPLAIN_TIMEOUT_MS)}")
+            cursor.execute("SET default_transaction_read_only = on")
+            connection.commit()
+            cursor.execute("EXPLAIN (ANALYZE, BUFFERS) " + statement, parameters)
+            entry["explain"] = "\n".join(row[0] for row in cursor.fetchall())
+        connection.rollback()
+    except Exception as e:
+        entry["explain"] = f"EXPLAIN failed: {e}"
+    finally:
+        if connection is not None:
+            connection.close()
+
+@event.listens_for(engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    deadline = conn.info.get("deadline")
+    if deadline is not None and deadline.cancelled:
+        deadline.check()
+    metrics.count_query()
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+@event.listens_for(engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    db_breaker.success()
+    elapsed_ms = (time.perf_counter() - conn.info["query_started"].pop()) * 1000
+    if elapsed_ms < settings.SLOW_QUERY_MS:
+        return
+    
+    request = metrics.current_request.get()
+    entry = {
+        "recorded_at": datetime.now().isoformat(),
+        "duration_ms": round(elapsed_ms, 2),
+        "route": request.route if request is not None else None,
+        "statement": statement,
+        "parameters": _parameter_types(parameters),
+        "explain": None,
+    }
+    slow_queries.append(entry)
+    
+    if (
+        not executemany
+        and conn.dialect.name == "postgresql"
+        and _explainable(statement)
+        and random.random() < settings.SLOW_QUERY_EXPLAIN_SAMPLE
+    ):
+        entry["explain"] = "pending"
+        _explain_executor.submit(_explain, entry, statement, parameters)
+
+@event.listens_for(engine, "handle_error")
+def _discard_query_timer(exception_context):
+    started = exception_context.connection.info.get("query_started") if exception_context.connection is not None else None
+    if started:
+        started.pop()
+
+@metrics.register_collector
+def _pool_metrics():
+    pool = engine.pool
+    if not isinstance(pool, QueuePool):
+        return []
+    return [
+        ("epicly_db_pool_size", "gauge", "Configured pool size", [({}, pool.size())]),
+        ("epicly_db_pool_checked_out", "gauge", "Connections currently checked out", [({}, pool.checkedout())]),
+        ("epicly_db_pool_checked_in", "gauge", "Idle connections in the pool", [({}, pool.checkedin())]),
+        ("epicly_db_pool_overflow", "gauge", "Connections open beyond pool_size", [({}, max(pool.overflow(), 0))]),
+    ]
+
+@contextmanager
+def pipeline(db):
+    """
+    Run the statements issued inside the block in psycopg 3 pipeline mode, so they are sent
+    without waiting for each result. A no-op with psycopg2.
+    """
+    if db.get_bind().dialect.driver != "psycopg":
+        yield
+        return
+    
+    with db.connection().connection.driver_connection.pipeline():
+        yield
+
+# Cache invalidation bus -------------------------------------------------------------------------------------------
+# Write paths publish "<entity>:<key>" messages (or "*" to flush everything) on a Postgres
+# NOTIFY channel. Every worker runs listen_for_invalidations() and hands the messages to the
+# handlers registered by its in-process caches.
+
+INVALIDATION_CHANNEL = "epicly_invalidation"
+FLUSH_ALL = "*"
+
+_invalidation_handlers = []
+
+def register_invalidation_handler(handler):
+    """handler(entity, key) is called for every message; entity is "*" on a full flush."""
+    _invalidation_handlers.append(handler)
+    return handler
+
+def dispatch_invalidation(message: str):
+    entity, _, key = message.partition(":")
+    for handler in _invalidation_handlers:
+        handler(entity, key or None)
+
+def publish_invalidation(db, entity: str, key=None):
+    """
+    Queue an invalidation for the current transaction. pg_notify inside the transaction is
+    only delivered to listeners when it commits (and dropped on rollback); the local caches
+    are updated from the session's after_commit hook.
+    """
+    message = entity if key is None else f"{entity}:{key}"
+    pending = db.info.setdefault("pending_invalidations", [])
+    if message in pending:
+        return
+    pending.append(message)
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(text("SELECT pg_notify(:channel, :message)"), {"channel": INVALIDATION_CHANNEL, "message": message})
+
+@event.listens_for(SessionLocal, "after_commit")
+def _apply_pending_invalidations(session):
+    for message in session.info.pop("pending_invalidations", []):
+        dispatch_invalidation(message)
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _discard_pending_invalidations(session):
+    session.info.pop("pending_invalidations", None)
+
+def _connect_listener():
+    connection = connect_raw()
+    connection.autocommit = True
+    with connection.cursor() as cursor:
+        cursor.execute(f"LISTEN {INVALIDATION_CHANNEL}")
+    return connection
+
+def _drain_notifications(connection):
+    if callable(connection.notifies):
+        # psycopg 3
+        for notify in connection.notifies(timeout=0):
+            yield notify.payload
+    else:
+        connection.poll()
+        while connection.notifies:
+            yield connection.notifies.pop(0).payload
+
+async def listen_for_invalidations(reconnect_delay: float = 1.0, keepalive: float = 30.0):
+    """
+    Apply invalidations published by other workers. Runs until cancelled; after a reconnect
+    everything is flushed because messages sent while disconnected are lost.
+    """
+    loop = asyncio.get_running_loop()
+    connected_before = False
+    
+    while True:
+        connection = None
+        try:
+            connection = await asyncio.to_thread(_connect_listener)
+            if connected_before:
+                dispatch_invalidation(FLUSH_ALL)
+            connected_before = True
+            
+            readable = asyncio.Event()
+            fileno = connection.fileno()
+            loop.add_reader(fileno, readable.set)
+            try:
+                while True:
+                    try:
+                        await asyncio.wait_for(readable.wait(), keepalive)
+                    except asyncio.TimeoutError:
+                        with connection.cursor() as cursor:
+                            cursor.execute("SELECT 1")
+                    readable.clear()
+                    for payload in _drain_notifications(connection):
+                        dispatch_invalidation(payload)
+            finally:
+                loop.remove_reader(fileno)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            await asyncio.sleep(reconnect_delay)
+        finally:
+            if connection is not None:
+                try:
+                    connection.close()
+                except Exception:
+                    pass
+
 def create_tables():
     try:
         Base.metadata.create_all(bind=engine)
+        if engine.dialect.name == "postgresql":
+            # Imported here because partitions imports this module
+            from partitions import ensure_upcoming
+            with engine.begin() as connection:
+                ensure_upcoming(connection)
         return True
     except Exception as e:
         return False
@@ -40,13 +493,20 @@ def drop_tables():
     except Exception as e:
         return False
 
-def get_db():
+def open_session(deadline: Deadline = None):
+    if not db_breaker.allow():
+        raise DatabaseUnavailable("Database unavailable, try again shortly")
     db = SessionLocal()
+    if deadline is not None:
+        db.info["deadline"] = deadline
     try:
         yield db
     finally:
         db.close()
 
+# Same lifecycle as api.get_db, for work that runs outside a request's dependencies
+session_scope = contextmanager(open_session)
+
 def test_connection():
     try:
         from sqlalchemy import text
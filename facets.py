@@ -0,0 +1,142 @@
+"""
+Faceted browse counts for the events listing.
+
+For every facet value (event type, genre, language, city, and schedule date
+for filtering) the index keeps a posting bitset of the event ids that have
+an upcoming schedule with that value; a Python int is the bitset. Events get
+dense positions in the order they're added (bit n is event_ids[n]), so the
+bitsets are sized by the number of indexed events rather than by the largest
+event id. Counts for any combination of filters are popcounts of bitset
+intersections, with each facet counted under every filter except its own so
+the UI can show the alternatives. Postings are per event, so city + date
+match events with an upcoming schedule in that city and one on that date,
+not necessarily the same schedule. The index is rebuilt from one query after
+an event/schedule/venue invalidation or FACETS_TTL seconds.
+"""
+import time
+from datetime import datetime
+from threading import Lock
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from database import register_invalidation_handler, FLUSH_ALL
+from models import Event, Schedule, Venue
+from settings import settings
+
+FACETS = ("event_type", "genre", "language", "city")
+FILTERS = FACETS + ("date",)
+
+
+def popcount(bits: int) -> int:
+    return bin(bits).count("1")
+
+
+class FacetIndex:
+    def __init__(self):
+        self.postings = {facet: {} for facet in FILTERS}
+        self.all = 0
+        self.positions = {}  # event_id -> bit position
+        self.event_ids = []  # bit position -> event_id
+
+    def add(self, event_id: int, **values):
+        position = self.positions.get(event_id)
+        if position is None:
+            position = self.positions[event_id] = len(self.event_ids)
+            self.event_ids.append(event_id)
+        bit = 1 << position
+        self.all |= bit
+        for facet, value in values.items():
+            if value is not None:
+                postings = self.postings[facet]
+                postings[value] = postings.get(value, 0) | bit
+
+    def match(self, facet: str, value: str) -> int:
+        """Events matching a filter, with the same semantics as the /events SQL filters."""
+        postings = self.postings[facet]
+        if facet == "event_type":
+            return postings.get(value.upper(), 0)
+        if facet == "date":
+            return postings.get(value, 0)
+
+        needle = value.lower()
+        bits = 0
+        for candidate, candidate_bits in postings.items():
+            if needle in candidate.lower():
+                bits |= candidate_bits
+        return bits
+
+    def decode(self, bits: int):
+        """The event ids of a bitset, in position order."""
+        event_ids = []
+        while bits:
+            low = bits & -bits
+            event_ids.append(self.event_ids[low.bit_length() - 1])
+            bits ^= low
+        return event_ids
+
+    def counts(self, **filters):
+        """{facet: {value: count}} for the events matching filters (None / "" values are ignored)."""
+        masks = {facet: self.match(facet, value) for facet, value in filters.items() if value}
+
+        counts = {}
+        for facet in FACETS:
+            mask = self.all
+            for other, other_mask in masks.items():
+                if other != facet:
+                    mask &= other_mask
+
+            counts[facet] = {}
+            for value in sorted(self.postings[facet]):
+                count = popcount(self.postings[facet][value] & mask)
+                if count:
+                    counts[facet][value] = count
+        return counts
+
+
+def load_facet_index(db: Session) -> FacetIndex:
+    index = FacetIndex()
+    rows = db.query(
+        Event.event_id,
+        Event.event_type,
+        Event.genre,
+        Event.language,
+        Venue.city,
+        func.date(Schedule.start_time)
+    ).join(
+        Schedule, Schedule.event_id == Event.event_id
+    ).join(
+        Venue, Venue.venue_id == Schedule.venue_id
+    ).filter(
+        Schedule.start_time > datetime.now()
+    ).distinct()
+
+    for event_id, event_type, genre, language, city, day in rows:
+        index.add(event_id, event_type=event_type, genre=genre, language=language, city=city, date=str(day))
+    return index
+
+
+_facet_index = None
+_built_at = 0.0
+_lock = Lock()
+
+
+def facet_index(db: Session) -> FacetIndex:
+    global _facet_index, _built_at
+    with _lock:
+        if _facet_index is None or time.monotonic() - _built_at > settings.FACETS_TTL:
+            _facet_index = load_facet_index(db)
+            _built_at = time.monotonic()
+        return _facet_index
+
+
+def facet_counts(db: Session, **filters):
+    return facet_index(db).counts(**filters)
+
+
+@register_invalidation_handler
+def _on_invalidation(entity: str, key):
+    global _facet_index
+    if entity in (FLUSH_ALL, "event", "schedule", "venue"):
+        with _lock:
+            _facet_index = None
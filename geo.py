@@ -0,0 +1,104 @@
+"""
+Venue proximity search.
+
+GeoGrid buckets points into fixed-size latitude/longitude cells, so a radius
+query only visits the cells overlapping the radius' bounding box and checks
+the exact (haversine) distance for the points in them. The venue index is
+built from the venues table on first use and rebuilt after a venue
+invalidation or CACHE_TTL_VENUE seconds.
+"""
+import math
+import time
+from threading import Lock
+
+from sqlalchemy.orm import Session
+
+from database import register_invalidation_handler, FLUSH_ALL
+from models import Venue
+from settings import settings
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+class GeoGrid:
+    def __init__(self, cell_degrees: float = 0.1):
+        self.cell_degrees = cell_degrees
+        self.columns = math.ceil(360 / cell_degrees)
+        self.cells = {}
+        self.size = 0
+
+    def _row(self, lat: float) -> int:
+        return math.floor((lat + 90) / self.cell_degrees)
+
+    def _column(self, lon: float) -> int:
+        # Unwrapped; callers take it modulo self.columns
+        return math.floor((lon + 180) / self.cell_degrees)
+
+    def add(self, key, lat: float, lon: float):
+        cell = (self._row(lat), self._column(lon) % self.columns)
+        self.cells.setdefault(cell, []).append((key, lat, lon))
+        self.size += 1
+
+    def nearby(self, lat: float, lon: float, radius_km: float):
+        """[(key, distance_km)] of the points within radius_km, nearest first."""
+        lat_span = radius_km / KM_PER_DEGREE
+        # A degree of longitude shrinks with latitude; take the widest point of the box
+        cos_lat = math.cos(math.radians(min(abs(lat) + lat_span, 90.0)))
+        lon_span = 180.0 if cos_lat < 1e-9 else min(radius_km / (KM_PER_DEGREE * cos_lat), 180.0)
+
+        first_column = self._column(lon - lon_span)
+        column_count = min(self._column(lon + lon_span) - first_column + 1, self.columns)
+
+        found = []
+        for row in range(self._row(max(lat - lat_span, -90.0)), self._row(min(lat + lat_span, 90.0)) + 1):
+            for column in range(first_column, first_column + column_count):
+                for key, point_lat, point_lon in self.cells.get((row, column % self.columns), ()):
+                    distance = haversine_km(lat, lon, point_lat, point_lon)
+                    if distance <= radius_km:
+                        found.append((key, distance))
+
+        found.sort(key=lambda item: item[1])
+        return found
+
+
+_venue_grid = None
+_built_at = 0.0
+_lock = Lock()
+
+
+def load_venue_grid(db: Session) -> GeoGrid:
+    grid = GeoGrid(settings.GEO_GRID_CELL_DEGREES)
+    for venue_id, lat, lon in db.query(Venue.venue_id, Venue.latitude, Venue.longitude).filter(
+        Venue.latitude.isnot(None),
+        Venue.longitude.isnot(None)
+    ):
+        grid.add(venue_id, lat, lon)
+    return grid
+
+
+def venue_grid(db: Session) -> GeoGrid:
+    global _venue_grid, _built_at
+    with _lock:
+        if _venue_grid is None or time.monotonic() - _built_at > settings.CACHE_TTL_VENUE:
+            _venue_grid = load_venue_grid(db)
+            _built_at = time.monotonic()
+        return _venue_grid
+
+
+def nearby_venues(db: Session, lat: float, lon: float, radius_km: float):
+    return venue_grid(db).nearby(lat, lon, radius_km)
+
+
+@register_invalidation_handler
+def _on_invalidation(entity: str, key):
+    global _venue_grid
+    if entity in (FLUSH_ALL, "venue"):
+        with _lock:
+            _venue_grid = None
@@ -0,0 +1,104 @@
+"""
+Cross-worker cache coherence check for the invalidation bus in database.py.
+
+Starts several listener processes against the configured Postgres, publishes
+invalidations from this process and verifies every worker applied them. With
+--reconnect it also terminates the listeners' backends and checks that each
+worker flushes its caches after reconnecting.
+
+    python invalidation_check.py --workers 4 --reconnect
+"""
+import argparse
+import asyncio
+import multiprocessing
+import queue
+import time
+
+from sqlalchemy import text
+
+import cache
+from database import (
+    SessionLocal, INVALIDATION_CHANNEL, FLUSH_ALL,
+    listen_for_invalidations, publish_invalidation, register_invalidation_handler
+)
+
+
+def run_worker(worker_id, results):
+    register_invalidation_handler(lambda entity, key: results.put((worker_id, entity, key)))
+
+    # Seed the local cache so the check also shows the entry actually disappearing
+    cache.events.set(1, "cached")
+
+    async def main():
+        results.put((worker_id, "ready", None))
+        await listen_for_invalidations(reconnect_delay=0.2)
+
+    asyncio.run(main())
+
+
+def wait_for(results, expected, timeout):
+    pending = set(expected)
+    deadline = time.monotonic() + timeout
+    while pending and time.monotonic() < deadline:
+        try:
+            pending.discard(results.get(timeout=max(deadline - time.monotonic(), 0.01)))
+        except queue.Empty:
+            break
+    return pending
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Invalidation bus check")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--timeout", type=float, default=10.0)
+    parser.add_argument("--reconnect", action="store_true", help="Also check the flush after a listener reconnect")
+    args = parser.parse_args()
+
+    results = multiprocessing.Queue()
+    workers = [multiprocessing.Process(target=run_worker, args=(i, results), daemon=True) for i in range(args.workers)]
+    for worker in workers:
+        worker.start()
+
+    ok = True
+    try:
+        missing = wait_for(results, {(i, "ready", None) for i in range(args.workers)}, args.timeout)
+        time.sleep(1.0)  # give every worker time to issue LISTEN
+
+        db = SessionLocal()
+        try:
+            publish_invalidation(db, "event", 1)
+            publish_invalidation(db, "schedule_seats", 49)
+            db.commit()
+        finally:
+            db.close()
+
+        expected = {(i, entity, key) for i in range(args.workers) for entity, key in (("event", "1"), ("schedule_seats", "49"))}
+        missing = wait_for(results, expected, args.timeout)
+        print(f"publish: {len(expected) - len(missing)}/{len(expected)} deliveries")
+        ok = ok and not missing
+
+        if args.reconnect:
+            db = SessionLocal()
+            try:
+                db.execute(text(
+                    "SELECT pg_terminate_backend(pid) FROM pg_stat_activity "
+                    "WHERE query = :query AND pid <> pg_backend_pid()"
+                ), {"query": f"LISTEN {INVALIDATION_CHANNEL}"})
+                db.commit()
+            finally:
+                db.close()
+
+            expected = {(i, FLUSH_ALL, None) for i in range(args.workers)}
+            missing = wait_for(results, expected, args.timeout)
+            print(f"reconnect flush: {len(expected) - len(missing)}/{len(expected)} workers")
+            ok = ok and not missing
+    finally:
+        for worker in workers:
+            worker.terminate()
+
+    print("OK" if ok else "FAILED")
+    raise SystemExit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Crash-recovery check for the inventory engine's write-ahead log (inventory_engine.py).
+
+Starts an owner process for one schedule against the configured database,
+has it apply seat transitions (each one fsynced to the WAL before it's
+acknowledged) and kills it with SIGKILL before any flush. Then checks that:
+
+- a second engine can't open the WAL directory while the owner holds it,
+- schedule_seats still has the old statuses (nothing was flushed),
+- a restarted engine's start() replays the WAL and overlays every
+  acknowledged status on what the database has,
+- its flush writes them to schedule_seats and discards the replayed segments.
+
+The seats are put back to their original statuses afterwards.
+
+    python inventory_check.py --schedule-id 49 --seats 5
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import signal
+import tempfile
+
+from database import engine, session_scope
+from inventory_engine import InventoryEngine, WriteAheadLog
+from models import Schedule, ScheduleSeat
+
+
+def run_owner(wal_dir, schedule_id, targets, results):
+    engine.dispose(close=False)  # don't share the parent's pooled connections
+
+    async def main():
+        inventory = InventoryEngine(wal_dir, flush_interval=3600, schedule_ids=[schedule_id])
+        await inventory.start()
+        for seat_id, status in targets.items():
+            result = await inventory.transition(schedule_id, [seat_id], None, status)
+            assert result.done, result
+        results.put("acknowledged")
+        await asyncio.sleep(3600)  # killed here, before the first flush
+
+    asyncio.run(main())
+
+
+def database_statuses(schedule_id, seat_ids):
+    with session_scope() as db:
+        schedule = db.get(Schedule, schedule_id)
+        return dict(db.query(ScheduleSeat.seat_id, ScheduleSeat.status).filter(
+            ScheduleSeat.schedule_id == schedule_id,
+            ScheduleSeat.schedule_start == schedule.start_time,
+            ScheduleSeat.seat_id.in_(seat_ids)
+        ))
+
+
+def pick_seats(schedule_id, count):
+    with session_scope() as db:
+        if schedule_id is None:
+            schedule_id = db.query(ScheduleSeat.schedule_id).order_by(ScheduleSeat.schedule_id).limit(1).scalar()
+            if schedule_id is None:
+                raise SystemExit("no schedule seats to check with (seed the database first)")
+        schedule = db.get(Schedule, schedule_id)
+        if schedule is None:
+            raise SystemExit(f"schedule {schedule_id} not found")
+        seats = db.query(ScheduleSeat.seat_id, ScheduleSeat.status).filter(
+            ScheduleSeat.schedule_id == schedule_id,
+            ScheduleSeat.schedule_start == schedule.start_time
+        ).order_by(ScheduleSeat.seat_id).limit(count).all()
+    return schedule_id, dict(seats)
+
+
+async def recover(wal_dir, schedule_id, original, targets):
+    ok = True
+    inventory = InventoryEngine(wal_dir, flush_interval=3600, schedule_ids=[schedule_id])
+    await inventory.start()
+    try:
+        overlaid = {seat_id: status for seat_id, status in inventory.statuses(schedule_id).items() if seat_id in targets}
+        print(f"replayed overlay: {sum(overlaid[seat_id] == status for seat_id, status in targets.items())}"
+              f"/{len(targets)} seats at their acknowledged status")
+        ok = ok and overlaid == targets
+
+        await inventory.flush()
+        flushed = database_statuses(schedule_id, list(targets))
+        print(f"flushed: {sum(flushed[seat_id] == status for seat_id, status in targets.items())}"
+              f"/{len(targets)} seats written, {len(inventory.wal.segments())} WAL segment(s) left")
+        ok = ok and flushed == targets and len(inventory.wal.segments()) == 1
+    finally:
+        # Put the seats back
+        for seat_id, status in original.items():
+            await inventory.transition(schedule_id, [seat_id], None, status)
+        await inventory.close()
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inventory WAL crash-recovery check")
+    parser.add_argument("--schedule-id", type=int, help="Default: the first schedule with seats")
+    parser.add_argument("--seats", type=int, default=5)
+    parser.add_argument("--wal-dir", help="Default: a new temporary directory")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    args = parser.parse_args()
+
+    schedule_id, original = pick_seats(args.schedule_id, args.seats)
+    targets = {
+        seat_id: "BLOCKED" if status == "AVAILABLE" else "AVAILABLE" for seat_id, status in original.items()
+    }
+    wal_dir = args.wal_dir or tempfile.mkdtemp(prefix="inventory_check_")
+    print(f"schedule {schedule_id}: {len(targets)} seats, WAL in {wal_dir}")
+
+    results = multiprocessing.Queue()
+    owner = multiprocessing.Process(target=run_owner, args=(wal_dir, schedule_id, targets, results), daemon=True)
+    owner.start()
+    ok = True
+    try:
+        results.get(timeout=args.timeout)
+
+        try:
+            WriteAheadLog(wal_dir).open()
+            print("second owner: opened the WAL (should have been refused)")
+            ok = False
+        except RuntimeError:
+            print("second owner: refused")
+    finally:
+        os.kill(owner.pid, signal.SIGKILL)
+        owner.join()
+
+    unflushed = database_statuses(schedule_id, list(targets))
+    print(f"after kill: {sum(unflushed[seat_id] == status for seat_id, status in original.items())}"
+          f"/{len(original)} seats still at their old status in the database")
+    ok = ok and unflushed == original
+
+    ok = asyncio.run(recover(wal_dir, schedule_id, original, targets)) and ok
+
+    print("OK" if ok else "FAILED")
+    raise SystemExit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,373 @@
+"""
+In-memory, authoritative seat inventory for the hottest schedules.
+
+With INVENTORY_ENGINE on, this worker owns the seat state of every schedule
+in its shard (schedule_id % INVENTORY_SHARDS == INVENTORY_SHARD, optionally
+narrowed to INVENTORY_ENGINE_SCHEDULES); the load balancer routes a
+schedule's writes to its owner and other workers answer 421. Each owned
+schedule has one owner task that applies transitions (lock, book, release)
+serially against a dict, so there are no row locks in the hot path. Every
+transition is appended to a local write-ahead log and fsynced (one fsync
+per group of transitions the owner drained together) before the caller gets
+its answer; dirty seats are written to schedule_seats every
+INVENTORY_FLUSH_INTERVAL_MS, after which the covered WAL segments are
+deleted.
+
+Recovery: WAL records are absolute statuses, so replaying the surviving
+segments over what Postgres has is idempotent. start() reads the WAL and
+loads every schedule it mentions with its records overlaid (and marked
+dirty, so the next flush makes Postgres current again). inventory_check.py
+kills a worker mid-stream and checks exactly that.
+
+One process per shard: the WAL directory is locked (flock) when it's opened,
+so a second worker started with the same INVENTORY_SHARD and
+INVENTORY_WAL_DIR (e.g. uvicorn --workers N sharing one environment) refuses
+to start instead of interleaving segments with the owner. Run one
+single-worker server per shard, each with its own INVENTORY_SHARD and
+INVENTORY_WAL_DIR.
+
+Reads outside the owner are stale: workers that don't own a schedule (and
+anything reading schedule_seats directly) see Postgres, which lags the
+owner's in-memory state until the next flush, i.e. by up to
+INVENTORY_FLUSH_INTERVAL_MS. Only the owner's statuses() is current.
+"""
+import asyncio
+import fcntl
+import json
+import logging
+import os
+from collections import namedtuple
+from threading import Lock
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import update
+
+import metrics
+from database import session_scope, publish_invalidation
+from models import Schedule, ScheduleSeat
+
+logger = logging.getLogger("uvicorn.error")
+
+# previous: {seat_id: status before the transition}, for the seats it changed
+Transition = namedtuple("Transition", "done not_found unavailable schedule_seat_ids previous")
+
+
+class WriteAheadLog:
+    """JSON-lines segments <seq>.wal in directory; append() returns once the records are fsynced."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._lock = Lock()
+        self._file = None
+        self._owner_lock = None
+        self._seq = 0
+
+    def segments(self):
+        return sorted(
+            os.path.join(self.directory, name) for name in os.listdir(self.directory) if name.endswith(".wal")
+        )
+
+    def open(self):
+        os.makedirs(self.directory, exist_ok=True)
+        self._owner_lock = open(os.path.join(self.directory, "LOCK"), "a+")
+        try:
+            fcntl.flock(self._owner_lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            self._owner_lock.seek(0)
+            holder = self._owner_lock.read().strip() or "unknown"
+            self._owner_lock.close()
+            self._owner_lock = None
+            raise RuntimeError(
+                f"Inventory WAL {self.directory} is in use by another process (pid {holder}): run one worker per "
+                f"INVENTORY_SHARD, each with its own INVENTORY_WAL_DIR"
+            ) from None
+        self._owner_lock.truncate(0)
+        self._owner_lock.write(str(os.getpid()))
+        self._owner_lock.flush()
+        existing = self.segments()
+        self._seq = int(os.path.basename(existing[-1])[:-4]) if existing else 0
+        self.rotate()
+
+    def replay(self):
+        for path in self.segments():
+            with open(path) as segment:
+                for line in segment:
+                    if line.endswith("\n"):  # a torn last line was never acknowledged
+                        yield json.loads(line)
+
+    def append(self, records):
+        data = "".join(json.dumps(record, separators=(",", ":")) + "\n" for record in records)
+        with self._lock:
+            self._file.write(data)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def rotate(self):
+        """Start a new segment; returns the paths of the older ones."""
+        with self._lock:
+            if self._file:
+                self._file.close()
+            self._seq += 1
+            path = os.path.join(self.directory, f"{self._seq:012d}.wal")
+            self._file = open(path, "a")
+        return [segment for segment in self.segments() if segment != path]
+
+    def discard(self, paths):
+        for path in paths:
+            os.remove(path)
+
+    def close(self):
+        with self._lock:
+            if self._file:
+                self._file.close()
+                self._file = None
+            if self._owner_lock:
+                self._owner_lock.close()  # releases the flock
+                self._owner_lock = None
+
+
+class ScheduleState:
+    def __init__(self, schedule_id: int, start_time, seats):
+        self.schedule_id = schedule_id
+        self.start_time = start_time
+        self.seats = seats  # seat_id -> [schedule_seat_id, status]
+        self.dirty = {}     # seat_id -> last fsynced status not yet in Postgres
+        self.queue = asyncio.Queue()
+        self.owner = None
+
+
+class InventoryEngine:
+    def __init__(self, wal_dir: str, flush_interval: float, shard: int = 0, shards: int = 1, schedule_ids=()):
+        self.wal = WriteAheadLog(wal_dir)
+        self.flush_interval = flush_interval
+        self.shard = shard
+        self.shards = shards
+        self.schedule_ids = set(schedule_ids)
+        self._states = {}
+        self._loading = {}
+        self._recovered = {}   # schedule_id -> {seat_id: status} from the WAL, until loaded
+        self._unflushed = []   # WAL segments whose transitions aren't in Postgres yet
+        # Held across "append to the WAL, mark dirty" and "rotate, collect dirty", so a segment is
+        # only discarded once everything fsynced into it has been marked dirty
+        self._durable = asyncio.Lock()
+        self.transitions = 0
+        self.fsyncs = 0
+        self.flushes = 0
+
+    def serves(self, schedule_id: int) -> bool:
+        return not self.schedule_ids or schedule_id in self.schedule_ids
+
+    def owner_shard(self, schedule_id: int) -> int:
+        return schedule_id % self.shards
+
+    def owns(self, schedule_id: int) -> bool:
+        return self.serves(schedule_id) and self.owner_shard(schedule_id) == self.shard
+
+    async def start(self):
+        """Open the WAL and load every schedule it has records for, so they get flushed."""
+        await run_in_threadpool(self.wal.open)
+        for record in await run_in_threadpool(lambda: list(self.wal.replay())):
+            statuses = self._recovered.setdefault(record["schedule_id"], {})
+            for seat_id in record["seat_ids"]:
+                statuses[seat_id] = record["status"]
+        self._unflushed = self.wal.segments()[:-1]
+        for schedule_id in list(self._recovered):
+            try:
+                await self._state(schedule_id)
+            except LookupError:
+                self._recovered.pop(schedule_id)
+
+    def statuses(self, schedule_id: int):
+        """{seat_id: status} of a loaded schedule, else None (safe to call from threads)."""
+        state = self._states.get(schedule_id)
+        if state is None:
+            return None
+        return {seat_id: seat[1] for seat_id, seat in list(state.seats.items())}
+
+    # Transitions -------------------------------------------------------------------------------------------
+
+    async def transition(self, schedule_id: int, seat_ids, allowed, status: str) -> Transition:
+        """Move seat_ids to status if every one of them is currently in allowed (None: any); all or nothing."""
+        state = await self._state(schedule_id)
+        future = asyncio.get_running_loop().create_future()
+        state.queue.put_nowait((list(seat_ids), None if allowed is None else tuple(allowed), status, future))
+        return await future
+
+    async def restore(self, schedule_id: int, previous):
+        """Undo a transition, given its previous statuses."""
+        for status in set(previous.values()):
+            seat_ids = [seat_id for seat_id, old in previous.items() if old == status]
+            await self.transition(schedule_id, seat_ids, None, status)
+
+    def _apply(self, state: ScheduleState, seat_ids, allowed, status):
+        seats = state.seats
+        if len(set(seat_ids)) != len(seat_ids) or any(seat_id not in seats for seat_id in seat_ids):
+            return Transition(False, True, [], [], {}), None
+        if allowed is not None:
+            unavailable = [seat_id for seat_id in seat_ids if seats[seat_id][1] not in allowed]
+            if unavailable:
+                return Transition(False, False, unavailable, [], {}), None
+
+        previous = {}
+        for seat_id in seat_ids:
+            previous[seat_id] = seats[seat_id][1]
+            seats[seat_id][1] = status
+        result = Transition(True, False, [], [seats[seat_id][0] for seat_id in seat_ids], previous)
+        return result, {"schedule_id": state.schedule_id, "seat_ids": seat_ids, "status": status}
+
+    async def _run_owner(self, state: ScheduleState):
+        while True:
+            commands = [await state.queue.get()]
+            while not state.queue.empty():
+                commands.append(state.queue.get_nowait())
+
+            applied = [(future, *self._apply(state, *command)) for *command, future in commands]
+            records = [record for _, _, record in applied if record]
+            if records:
+                try:
+                    async with self._durable:
+                        await run_in_threadpool(self.wal.append, records)
+                        # Only now: a flush must not write a status the WAL could still lose
+                        for record in records:
+                            for seat_id in record["seat_ids"]:
+                                state.dirty[seat_id] = record["status"]
+                    self.fsyncs += 1
+                except Exception as e:
+                    for _, result, record in reversed(applied):
+                        if record:
+                            for seat_id, old in result.previous.items():
+                                state.seats[seat_id][1] = old
+                    # Rewrite the restored statuses too, in case a flush already wrote a newer one
+                    for record in records:
+                        for seat_id in record["seat_ids"]:
+                            state.dirty[seat_id] = state.seats[seat_id][1]
+                    for future, _, _ in applied:
+                        if not future.done():
+                            future.set_exception(e)
+                    continue
+
+            self.transitions += len(records)
+            metrics.write_batch_size.observe(len(commands))
+            for future, result, _ in applied:
+                if not future.done():
+                    future.set_result(result)
+
+    # Loading -------------------------------------------------------------------------------------------
+
+    async def _state(self, schedule_id: int) -> ScheduleState:
+        state = self._states.get(schedule_id)
+        if state is not None:
+            return state
+
+        loading = self._loading.get(schedule_id)
+        if loading is None:
+            loading = self._loading[schedule_id] = asyncio.ensure_future(run_in_threadpool(self._load, schedule_id))
+        try:
+            state = await asyncio.shield(loading)
+        finally:
+            self._loading.pop(schedule_id, None)
+
+        if schedule_id not in self._states:
+            recovered = self._recovered.pop(schedule_id, {})
+            for seat_id, status in recovered.items():
+                if seat_id in state.seats:
+                    state.seats[seat_id][1] = status
+                    state.dirty[seat_id] = status
+            state.owner = asyncio.ensure_future(self._run_owner(state))
+            self._states[schedule_id] = state
+        return self._states[schedule_id]
+
+    def _load(self, schedule_id: int) -> ScheduleState:
+        with session_scope() as db:
+            schedule = db.get(Schedule, schedule_id)
+            if schedule is None:
+                raise LookupError(f"Schedule {schedule_id} not found")
+            seats = {
+                seat_id: [schedule_seat_id, status]
+                for seat_id, schedule_seat_id, status in db.query(
+                    ScheduleSeat.seat_id, ScheduleSeat.schedule_seat_id, ScheduleSeat.status
+                ).filter(
+                    ScheduleSeat.schedule_id == schedule_id,
+                    ScheduleSeat.schedule_start == schedule.start_time
+                )
+            }
+            return ScheduleState(schedule_id, schedule.start_time, seats)
+
+    # Persistence -------------------------------------------------------------------------------------------
+
+    async def flush(self):
+        """Write dirty seats to schedule_seats, then drop the WAL segments that covered them."""
+        # Rotate first: every record in the closed segments was marked dirty when its append
+        # returned, so the dirty statuses collected next include all of them.
+        async with self._durable:
+            self._unflushed += await run_in_threadpool(self.wal.rotate)
+            self._unflushed = sorted(set(self._unflushed))
+            batch = []
+            for state in self._states.values():
+                if state.dirty:
+                    batch.append((state, {
+                        seat_id: (state.seats[seat_id][0], status) for seat_id, status in state.dirty.items()
+                    }))
+                    state.dirty = {}
+        if not batch and not self._unflushed:
+            return
+
+        try:
+            await run_in_threadpool(self._write, batch)
+        except Exception:
+            for state, seats in batch:
+                for seat_id, (_, status) in seats.items():
+                    state.dirty.setdefault(seat_id, status)
+            raise
+        await run_in_threadpool(self.wal.discard, self._unflushed)
+        self._unflushed = []
+        self.flushes += 1
+
+    def _write(self, batch):
+        with session_scope() as db:
+            for state, seats in batch:
+                by_status = {}
+                for schedule_seat_id, status in seats.values():
+                    by_status.setdefault(status, []).append(schedule_seat_id)
+                for status, schedule_seat_ids in by_status.items():
+                    db.execute(
+                        update(ScheduleSeat)
+                        .where(
+                            ScheduleSeat.schedule_start == state.start_time,
+                            ScheduleSeat.schedule_seat_id.in_(schedule_seat_ids)
+                        )
+                        .values(status=status),
+                        execution_options={"synchronize_session": False}
+                    )
+                publish_invalidation(db, "schedule_seats", state.schedule_id)
+            db.commit()
+
+    async def run(self):
+        """Background flusher; cancel it and call close() on shutdown."""
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("Inventory flush failed, retrying")
+
+    async def close(self):
+        for state in self._states.values():
+            if state.owner:
+                state.owner.cancel()
+        try:
+            await self.flush()
+        finally:
+            self.wal.close()
+
+    def stats(self):
+        return {
+            "shard": self.shard,
+            "shards": self.shards,
+            "schedules": len(self._states),
+            "transitions": self.transitions,
+            "fsyncs": self.fsyncs,
+            "flushes": self.flushes,
+            "dirty_seats": sum(len(state.dirty) for state in self._states.values()),
+            "unflushed_segments": len(self._unflushed),
+        }
@@ -0,0 +1,271 @@
+"""
+Memory-mapped seat layouts shared by every worker process.
+
+The build step compiles a section's seats, in seat-map order, into a
+fixed-width columnar file: a small JSON header with the dictionaries (row
+labels, seat types, price tiers) followed by one packed array per field:
+
+    seat_id int64 | seat_number int32 | row uint16 | price_tier uint16 | seat_type uint8
+
+Workers mmap the files read-only and read the arrays through memoryview
+casts, so the layout lives once in the page cache however many workers map
+it, instead of once per process in the section_layouts cache. Files are
+replaced atomically (write, fsync, rename); workers notice the new inode on
+their next lookup and map it, while requests still reading the old mapping
+keep it alive until they're done.
+
+A file is only rewritten when its contents would change, so warm-up rebuilds
+every stale file cheaply. A "section" or "section_layout" invalidation on the
+bus stops a worker using the section's file (it falls back to the database)
+until a background rebuild has replaced it; `build` publishes one per section
+it wrote, so workers on other hosts pick the change up too. A FLUSH_ALL (sent
+after every listener reconnect, when events may have been missed) doesn't
+take the files out of service: a background pass compares each file with the
+database and rewrites only the ones that differ.
+
+    python layout_store.py build [--section 3 --section 4] [--missing]
+    python layout_store.py show --section 3
+"""
+import argparse
+import json
+import logging
+import mmap
+import os
+import struct
+import threading
+from collections import namedtuple
+from decimal import Decimal
+from threading import Lock
+
+from sqlalchemy.orm import Session
+
+from database import FLUSH_ALL, register_invalidation_handler, session_scope
+from models import Section
+from settings import settings
+
+logger = logging.getLogger("uvicorn.error")
+
+MAGIC = b"EPLAYT01"
+_PREAMBLE = struct.Struct("<8sII")  # magic, seat count, header length
+# (attribute, memoryview format, width); arrays are laid out in this order
+COLUMNS = (("seat_id", "q", 8), ("seat_number", "i", 4), ("row", "H", 2), ("price_tier", "H", 2), ("seat_type", "B", 1))
+
+LayoutSeat = namedtuple("LayoutSeat", "seat_id row_label seat_number seat_type base_price")
+
+
+def _align(offset: int) -> int:
+    return (offset + 7) & ~7
+
+
+def _codes(values):
+    dictionary = {}
+    codes = [dictionary.setdefault(value, len(dictionary)) for value in values]
+    return list(dictionary), codes
+
+
+def encode_layout(seats) -> bytes:
+    """Layout file contents for rows with seat_id, row_label, seat_number, seat_type and base_price."""
+    seats = list(seats)
+    rows, row_codes = _codes(seat.row_label for seat in seats)
+    seat_types, seat_type_codes = _codes(seat.seat_type for seat in seats)
+    price_tiers, price_tier_codes = _codes(str(seat.base_price) for seat in seats)
+    if len(rows) > 0xFFFF or len(price_tiers) > 0xFFFF or len(seat_types) > 0xFF:
+        raise ValueError("Too many distinct rows, price tiers or seat types for the layout format")
+
+    header = json.dumps({"rows": rows, "seat_types": seat_types, "price_tiers": price_tiers}).encode()
+    columns = {
+        "seat_id": [seat.seat_id for seat in seats],
+        "seat_number": [seat.seat_number for seat in seats],
+        "row": row_codes,
+        "price_tier": price_tier_codes,
+        "seat_type": seat_type_codes,
+    }
+
+    data = bytearray(_PREAMBLE.pack(MAGIC, len(seats), len(header)) + header)
+    data += bytes(_align(len(data)) - len(data))
+    for name, code, _ in COLUMNS:
+        data += struct.pack(f"<{len(seats)}{code}", *columns[name])
+    return bytes(data)
+
+
+def write_layout(path: str, seats) -> bool:
+    """Atomically replace the layout file at path; False (and no write) if it's already current."""
+    data = encode_layout(seats)
+    try:
+        with open(path, "rb") as layout_file:
+            if layout_file.read() == data:
+                return False
+    except FileNotFoundError:
+        pass
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "wb") as layout_file:
+        layout_file.write(data)
+        layout_file.flush()
+        os.fsync(layout_file.fileno())
+    os.replace(temporary, path)
+    directory = os.open(os.path.dirname(path) or ".", os.O_RDONLY)
+    try:
+        os.fsync(directory)
+    finally:
+        os.close(directory)
+    return True
+
+
+class SeatLayout:
+    """A read-only mapped layout file; iterates LayoutSeat rows in seat-map order."""
+
+    def __init__(self, path: str):
+        with open(path, "rb") as layout_file:
+            stat = os.fstat(layout_file.fileno())
+            self.version = (stat.st_ino, stat.st_mtime_ns)
+            self._mmap = mmap.mmap(layout_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        view = memoryview(self._mmap)
+        magic, self.count, header_length = _PREAMBLE.unpack_from(view)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a seat layout file")
+        header = json.loads(bytes(view[_PREAMBLE.size:_PREAMBLE.size + header_length]))
+        self.row_labels = header["rows"]
+        self.seat_types = header["seat_types"]
+        self.price_tiers = [Decimal(price) for price in header["price_tiers"]]
+
+        offset = _align(_PREAMBLE.size + header_length)
+        for name, code, width in COLUMNS:
+            setattr(self, name, view[offset:offset + width * self.count].cast(code))
+            offset += width * self.count
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        rows, seat_types, price_tiers = self.row_labels, self.seat_types, self.price_tiers
+        for seat_id, seat_number, row, price_tier, seat_type in zip(
+            self.seat_id, self.seat_number, self.row, self.price_tier, self.seat_type
+        ):
+            yield LayoutSeat(seat_id, rows[row], seat_number, seat_types[seat_type], price_tiers[price_tier])
+
+
+def layout_path(section_id: int, directory: str = None) -> str:
+    return os.path.join(directory or settings.LAYOUT_STORE_DIR, f"section_{section_id}.layout")
+
+
+_layouts = {}
+_lock = Lock()
+_stale = set()  # sections invalidated since their file was last rebuilt (FLUSH_ALL: a keyless section event)
+
+
+def open_layout(section_id: int):
+    """The section's mapped layout, remapped when its file was replaced; None without a current file."""
+    if section_id in _stale or FLUSH_ALL in _stale:
+        return None
+    path = layout_path(section_id)
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+
+    layout = _layouts.get(section_id)
+    if layout is None or layout.version != (stat.st_ino, stat.st_mtime_ns):
+        with _lock:
+            layout = _layouts.get(section_id)
+            if layout is None or layout.version != (stat.st_ino, stat.st_mtime_ns):
+                layout = _layouts[section_id] = SeatLayout(path)
+    return layout
+
+
+def build_layouts(db: Session, section_ids=None, missing_only: bool = False, directory: str = None):
+    """Write layout files for section_ids (default every section); returns the ids written."""
+    # Imported here because cache reads layouts through this module
+    from cache import load_section_layout
+
+    directory = directory or settings.LAYOUT_STORE_DIR
+    os.makedirs(directory, exist_ok=True)
+    if section_ids is None:
+        section_ids = [section_id for (section_id,) in db.query(Section.section_id).order_by(Section.section_id)]
+
+    built = []
+    for section_id in section_ids:
+        path = layout_path(section_id, directory)
+        if missing_only and os.path.exists(path):
+            continue
+        if write_layout(path, load_section_layout(db, section_id)):
+            built.append(section_id)
+    return built
+
+
+def _layout_sections():
+    """Ids of the sections with a file in LAYOUT_STORE_DIR."""
+    return [
+        int(name[len("section_"):-len(".layout")])
+        for name in os.listdir(settings.LAYOUT_STORE_DIR) if name.endswith(".layout")
+    ]
+
+
+def _rebuild(section_ids):
+    """Rebuild invalidated layouts (None: every file in LAYOUT_STORE_DIR), then serve them again."""
+    marks = section_ids or [FLUSH_ALL]
+    try:
+        with session_scope() as db:
+            build_layouts(db, _layout_sections() if section_ids is None else section_ids)
+    except Exception:
+        # The sections stay on the database-backed cache until the next invalidation or restart
+        logger.exception("Rebuilding seat layouts %s failed", marks)
+        return
+    _stale.difference_update(marks)
+
+
+def _verify():
+    """Rewrite the files that no longer match the database, while they stay in service."""
+    try:
+        with session_scope() as db:
+            rewritten = build_layouts(db, _layout_sections())
+    except Exception:
+        logger.exception("Checking seat layouts against the database failed")
+        return
+    if rewritten:
+        logger.warning("Seat layouts of sections %s were out of date and have been rewritten", rewritten)
+
+
+@register_invalidation_handler
+def _on_invalidation(entity: str, key):
+    if not settings.LAYOUT_STORE_DIR or entity not in (FLUSH_ALL, "section", "section_layout"):
+        return
+    if entity == FLUSH_ALL:
+        threading.Thread(target=_verify, name="layout-verify", daemon=True).start()
+        return
+    section_ids = None if key is None else [int(key)]
+    _stale.update(section_ids or (FLUSH_ALL,))
+    threading.Thread(target=_rebuild, args=(section_ids,), name="layout-rebuild", daemon=True).start()
+
+
+def main():
+    from database import SessionLocal, publish_invalidation
+
+    parser = argparse.ArgumentParser(description="Build memory-mapped seat layout files")
+    parser.add_argument("--dir", default=settings.LAYOUT_STORE_DIR or "layouts", help="Layout directory")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build = commands.add_parser("build", help="Compile sections' seats into layout files")
+    build.add_argument("--section", type=int, action="append", help="Section id (repeatable; default all)")
+    build.add_argument("--missing", action="store_true", help="Only sections without a layout file")
+
+    show = commands.add_parser("show", help="Summarise a layout file")
+    show.add_argument("--section", type=int, required=True)
+    args = parser.parse_args()
+
+    if args.command == "build":
+        with SessionLocal() as db:
+            built = build_layouts(db, args.section, args.missing, args.dir)
+            # Workers (on this and other hosts) drop the old layouts and rebuild their own files
+            for section_id in built:
+                publish_invalidation(db, "section_layout", section_id)
+            db.commit()
+        print(f"Wrote {len(built)} layouts to {args.dir}: {', '.join(map(str, built)) or '-'}")
+    else:
+        layout = SeatLayout(layout_path(args.section, args.dir))
+        print(f"{layout.count} seats, {len(layout.row_labels)} rows, seat types {layout.seat_types}, "
+              f"price tiers {[str(price) for price in layout.price_tiers]}")
+
+
+if __name__ == "__main__":
+    main()
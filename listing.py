@@ -0,0 +1,160 @@
+"""
+Materialized "events by city and day" listing for /events?city=X&date=Y.
+
+Maps (city, local date) to the events with a schedule there that day, plus a
+snapshot of each event's EventResponse fields, for every schedule from today
+on. It is built from one query and kept current incrementally: schedule and
+event invalidations queue the ids, which are re-read on the next lookup.
+Venue changes, a full flush, LISTING_TTL or a new day rebuild it. Dates
+before the build day aren't covered and fall back to SQL.
+"""
+import time
+from datetime import datetime, date as date_type
+from threading import RLock
+
+from sqlalchemy.orm import Session
+
+from cache import snapshot
+from database import register_invalidation_handler, FLUSH_ALL
+from models import Event, Schedule, Venue
+from settings import settings
+
+
+class Listing:
+    def __init__(self, since: date_type):
+        self.since = since
+        self.days = {}       # (city, date) -> {event_id: schedules that day}
+        self.schedules = {}  # schedule_id -> ((city, date), event_id)
+        self.events = {}     # event_id -> event snapshot
+        self.cities = set()
+        self._matching_cities = {}  # filter value -> cities containing it
+
+    def add_schedule(self, schedule_id: int, event_id: int, city, start_time: datetime):
+        self.remove_schedule(schedule_id)
+        if city is None or start_time.date() < self.since:
+            return
+        key = (city.lower(), start_time.date())
+        if key[0] not in self.cities:
+            self.cities.add(key[0])
+            self._matching_cities.clear()
+        day = self.days.setdefault(key, {})
+        day[event_id] = day.get(event_id, 0) + 1
+        self.schedules[schedule_id] = (key, event_id)
+
+    def remove_schedule(self, schedule_id: int):
+        entry = self.schedules.pop(schedule_id, None)
+        if entry is None:
+            return
+        key, event_id = entry
+        day = self.days[key]
+        day[event_id] -= 1
+        if not day[event_id]:
+            del day[event_id]
+        if not day:
+            del self.days[key]
+
+    def lookup(self, city: str, day: date_type):
+        """Events on day in every city containing city (the ILIKE semantics of /events), by id."""
+        needle = city.lower()
+        cities = self._matching_cities.get(needle)
+        if cities is None:
+            if len(self._matching_cities) > 1000:
+                self._matching_cities.clear()
+            cities = self._matching_cities[needle] = tuple(name for name in self.cities if needle in name)
+
+        if len(cities) == 1:
+            event_ids = self.days.get((cities[0], day), ())
+        else:
+            event_ids = set()
+            for name in cities:
+                event_ids.update(self.days.get((name, day), ()))
+        return [self.events[event_id] for event_id in sorted(event_ids) if event_id in self.events]
+
+
+def _schedule_rows(db: Session):
+    return db.query(
+        Schedule.schedule_id, Schedule.event_id, Venue.city, Schedule.start_time
+    ).join(Venue, Venue.venue_id == Schedule.venue_id)
+
+
+def _load_events(db: Session, listing: Listing, event_ids):
+    for event in db.query(Event).filter(Event.event_id.in_(event_ids)).all() if event_ids else []:
+        listing.events[event.event_id] = snapshot(event)
+
+
+def load_listing(db: Session) -> Listing:
+    listing = Listing(datetime.now().date())
+    since = datetime.combine(listing.since, datetime.min.time())
+    for schedule_id, event_id, city, start_time in _schedule_rows(db).filter(Schedule.start_time >= since):
+        listing.add_schedule(schedule_id, event_id, city, start_time)
+    _load_events(db, listing, {event_id for _, event_id in listing.schedules.values()})
+    return listing
+
+
+_listing = None
+_built_at = 0.0
+_pending_schedules = set()
+_pending_events = set()
+_lock = RLock()
+
+
+def _apply_pending(db: Session, listing: Listing):
+    schedule_ids = set(_pending_schedules)
+    event_ids = set(_pending_events)
+    _pending_schedules.difference_update(schedule_ids)
+    _pending_events.difference_update(event_ids)
+
+    if schedule_ids:
+        for schedule_id in schedule_ids:
+            listing.remove_schedule(schedule_id)
+        for schedule_id, event_id, city, start_time in _schedule_rows(db).filter(Schedule.schedule_id.in_(schedule_ids)):
+            listing.add_schedule(schedule_id, event_id, city, start_time)
+        event_ids.update(
+            event_id for _, event_id in listing.schedules.values() if event_id not in listing.events
+        )
+
+    for event_id in event_ids:
+        listing.events.pop(event_id, None)
+    _load_events(db, listing, event_ids)
+
+
+def current_listing(db: Session) -> Listing:
+    global _listing, _built_at
+    with _lock:
+        if (
+            _listing is None
+            or time.monotonic() - _built_at > settings.LISTING_TTL
+            or _listing.since != datetime.now().date()
+        ):
+            _pending_schedules.clear()
+            _pending_events.clear()
+            _listing = load_listing(db)
+            _built_at = time.monotonic()
+        elif _pending_schedules or _pending_events:
+            _apply_pending(db, _listing)
+        return _listing
+
+
+def events_by_city_and_day(db: Session, city: str, date: str):
+    """Event snapshots for /events?city=&date=, or None when the listing can't answer it."""
+    try:
+        day = datetime.strptime(date, "%Y-%m-%d").date()
+    except ValueError:
+        return None
+    with _lock:
+        listing = current_listing(db)
+        if day < listing.since:
+            return None
+        return listing.lookup(city, day)
+
+
+@register_invalidation_handler
+def _on_invalidation(entity: str, key):
+    global _listing
+    with _lock:
+        if entity in (FLUSH_ALL, "venue") or (entity in ("schedule", "event") and key is None):
+            _listing = None
+        elif entity == "schedule":
+            _pending_schedules.add(int(key))
+        elif entity == "event":
+            _pending_events.add(int(key))
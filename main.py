@@ -1,13 +1,22 @@
 import sys
 import signal
+import asyncio
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+from sqlalchemy.exc import DBAPIError
 from fastapi.middleware.cors import CORSMiddleware
 
 from settings import settings
-from api import router as api_router
+from warmup import run_warmup
+from api import router as api_router, seat_inventory, failure_response
+from compression import CompressionMiddleware
+from capture import CaptureMiddleware, CaptureWriter
+from metrics import MetricsMiddleware
+from profiling import ProfilingMiddleware
 from contextlib import asynccontextmanager
-from database import test_connection, create_tables, engine
+from database import test_connection, create_tables, engine, listen_for_invalidations, DatabaseUnavailable, DeadlineExceeded
+from partitions import maintain_partitions
 
 
 @asynccontextmanager
@@ -19,11 +28,48 @@ async def lifespan(app: FastAPI):
         if settings.is_production:
             raise Exception("Database connection failed in production")
     
+    background_tasks = []
+    if engine.dialect.name == "postgresql":
+        background_tasks.append(asyncio.create_task(listen_for_invalidations()))
+        background_tasks.append(asyncio.create_task(maintain_partitions()))
+    
+    if seat_inventory is not None:
+        await seat_inventory.start()
+        background_tasks.append(asyncio.create_task(seat_inventory.run()))
+    
+    warmup_task = asyncio.create_task(run_warmup())
+    
     yield
+    
+    warmup_task.cancel()
+    for task in background_tasks:
+        task.cancel()
+    if capture_writer is not None:
+        capture_writer.close()
+    if seat_inventory is not None:
+        await seat_inventory.close()
     engine.dispose()
 
 app = FastAPI(lifespan=lifespan)
 
+capture_writer = None
+
+@app.exception_handler(DatabaseUnavailable)
+async def database_unavailable_handler(request: Request, exc: DatabaseUnavailable):
+    # The circuit breaker is open: fail fast instead of queueing on a dead pool
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Database temporarily unavailable"},
+        headers={"Retry-After": str(int(settings.DB_BREAKER_RESET))}
+    )
+
+@app.exception_handler(DeadlineExceeded)
+@app.exception_handler(DBAPIError)
+async def database_error_handler(request: Request, exc: Exception):
+    # Routes without their own error handling: statement/lock timeouts still answer 503/409
+    failure = failure_response(exc)
+    return JSONResponse(status_code=failure.status_code, content={"detail": failure.detail})
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=settings.ALLOWED_HOSTS if settings.ALLOWED_HOSTS != ["*"] else ["*"],
@@ -32,6 +78,29 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+if not settings.is_production:
+    app.add_middleware(ProfilingMiddleware, interval=settings.PROFILE_SAMPLE_INTERVAL_MS / 1000)
+
+app.add_middleware(MetricsMiddleware)
+
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=settings.COMPRESSION_MIN_SIZE,
+    brotli_quality=settings.BROTLI_QUALITY,
+    gzip_level=settings.GZIP_LEVEL,
+)
+
+if settings.CAPTURE_ENABLED:
+    # Outermost, so the recorded duration and status are what the client saw
+    capture_writer = CaptureWriter(settings.CAPTURE_PATH, settings.CAPTURE_MAX_BYTES, settings.CAPTURE_QUEUE_SIZE)
+    capture_writer.start()
+    app.add_middleware(
+        CaptureMiddleware,
+        writer=capture_writer,
+        sample=settings.CAPTURE_SAMPLE,
+        exclude=settings.CAPTURE_EXCLUDE,
+    )
+
 def signal_handler(signum, frame):
     engine.dispose()
     sys.exit(0)
@@ -0,0 +1,221 @@
+"""
+Prometheus-style metrics: counters, gauges and histograms rendered in the
+text exposition format on /metrics.
+
+Everything is in-process and lock-protected, with one dict lookup and a few
+integer increments per observation, so it is cheap enough to leave on.
+Per-request state (route, queries issued) lives in a context variable that
+also follows the request into the threadpool.
+"""
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from threading import Lock
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 50, 100)
+
+_metrics = []
+_collectors = []
+
+
+def _format_labels(names, values):
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{str(value)}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = Lock()
+        _metrics.append(self)
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(tuple(labels.get(name, "") for name in self.labelnames), 0)
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, _format_labels(self.labelnames, key), value) for key, value in self._values.items()]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels):
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._values = {}
+        self._lock = Lock()
+        _metrics.append(self)
+
+    def observe(self, value: float, **labels):
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def samples(self):
+        samples = []
+        with self._lock:
+            for key, (bucket_counts, total, count) in self._values.items():
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets + (float("inf"),), bucket_counts):
+                    cumulative += bucket_count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    samples.append((f"{self.name}_bucket", _format_labels(self.labelnames + ("le",), key + (le,)), cumulative))
+                labels = _format_labels(self.labelnames, key)
+                samples.append((f"{self.name}_sum", labels, total))
+                samples.append((f"{self.name}_count", labels, count))
+        return samples
+
+
+def register_collector(collector):
+    """collector() -> iterable of (name, kind, documentation, [(labels_dict, value), ...]), called per scrape."""
+    _collectors.append(collector)
+    return collector
+
+
+def render() -> str:
+    lines = []
+    for metric in _metrics:
+        lines.append(f"# HELP {metric.name} {metric.documentation}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        for name, labels, value in metric.samples():
+            lines.append(f"{name}{labels} {value}")
+
+    for collector in _collectors:
+        for name, kind, documentation, samples in collector():
+            lines.append(f"# HELP {name} {documentation}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                lines.append(f"{name}{_format_labels(tuple(labels), tuple(labels.values()))} {value}")
+
+    return "\n".join(lines) + "\n"
+
+
+# HTTP -------------------------------------------------------------------------------------------
+
+http_requests = Counter("epicly_http_requests_total", "HTTP requests", ("method", "route", "status"))
+http_request_duration = Histogram("epicly_http_request_duration_seconds", "HTTP request latency", ("method", "route"))
+http_in_flight = Gauge("epicly_http_requests_in_flight", "HTTP requests currently being served")
+db_queries_per_request = Histogram(
+    "epicly_db_queries_per_request", "SQL statements issued per HTTP request", ("route",), buckets=COUNT_BUCKETS
+)
+
+# Database pool -------------------------------------------------------------------------------------------
+
+pool_checkout_wait = Histogram(
+    "epicly_db_pool_checkout_wait_seconds", "Time spent waiting for a pooled connection",
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+)
+pool_checkout_timeouts = Counter("epicly_db_pool_checkout_timeouts_total", "Pool checkouts that timed out")
+
+# Domain -------------------------------------------------------------------------------------------
+
+write_batch_size = Histogram(
+    "epicly_write_batch_size", "Requests applied per group-committed batch", buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256, 512)
+)
+db_circuit_trips = Counter("epicly_db_circuit_trips_total", "Times the database circuit breaker opened")
+stale_responses = Counter("epicly_stale_responses_total", "Read responses served from the cache past their TTL", ("reason",))
+seats_locked = Counter("epicly_seats_locked_total", "Seats moved to BLOCKED by lock_seats")
+seat_lock_conflicts = Counter("epicly_seat_lock_conflicts_total", "lock_seats calls rejected because a seat was taken")
+bookings_created = Counter("epicly_bookings_created_total", "Bookings created")
+booking_failures = Counter("epicly_booking_failures_total", "create_booking calls that failed", ("reason",))
+payments = Counter("epicly_payments_total", "Payments processed by create_payment", ("status",))
+seats_released = Counter("epicly_seats_released_total", "Seats returned to AVAILABLE after a failed payment")
+ga_tickets_reserved = Counter("epicly_ga_tickets_reserved_total", "General-admission tickets taken from inventory counters")
+ga_tickets_released = Counter("epicly_ga_tickets_released_total", "General-admission tickets returned after a failed payment")
+ga_sold_out = Counter("epicly_ga_sold_out_total", "General-admission reservations rejected for lack of tickets")
+captured_requests = Counter("epicly_captured_requests_total", "Requests written to the traffic capture")
+dropped_captures = Counter("epicly_dropped_captures_total", "Capture records dropped because the capture writer fell behind")
+
+
+# Per-request context -------------------------------------------------------------------------------------------
+
+class RequestStats:
+    __slots__ = ("scope", "queries")
+
+    def __init__(self, scope):
+        self.scope = scope
+        self.queries = 0
+
+    @property
+    def route(self) -> str:
+        # Route template, set by the router once the request is matched; keeps label cardinality bounded
+        route = self.scope.get("route")
+        return getattr(route, "path", None) or "unmatched"
+
+
+current_request = ContextVar("current_request", default=None)
+
+
+def count_query():
+    stats = current_request.get()
+    if stats is not None:
+        stats.queries += 1
+
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats(scope)
+        token = current_request.set(stats)
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        http_in_flight.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            http_in_flight.dec()
+            current_request.reset(token)
+
+            route = stats.route
+            method = scope["method"]
+            http_requests.inc(method=method, route=route, status=status_code)
+            http_request_duration.observe(elapsed, method=method, route=route)
+            db_queries_per_request.observe(stats.queries, route=route)
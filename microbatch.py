@@ -0,0 +1,68 @@
+"""
+Group commit for write requests (used for seat locks).
+
+Requests with the same key that arrive within a short window are collected
+into one batch and applied by a single call, in arrival order, and each
+caller gets its own result back. While a batch is being applied, new
+requests for that key queue up and form the next batch, so batches grow on
+their own under load and there is only ever one writer per key.
+"""
+import asyncio
+
+from fastapi.concurrency import run_in_threadpool
+
+import metrics
+
+
+class MicroBatcher:
+    def __init__(self, apply, window: float, max_batch: int):
+        # apply(key, [item, ...]) -> [result, ...]; blocking, runs in the threadpool
+        self.apply = apply
+        self.window = window
+        self.max_batch = max_batch
+        self._queues = {}
+        self.requests = 0
+        self.batches = 0
+
+    async def submit(self, key, item):
+        future = asyncio.get_running_loop().create_future()
+        self.requests += 1
+        queue = self._queues.get(key)
+        if queue is None:
+            queue = self._queues[key] = []
+            asyncio.ensure_future(self._drain(key, queue))
+        queue.append((item, future))
+        return await future
+
+    async def _drain(self, key, queue):
+        try:
+            await asyncio.sleep(self.window)
+            while queue:
+                batch = queue[:self.max_batch]
+                del queue[:self.max_batch]
+                self.batches += 1
+                metrics.write_batch_size.observe(len(batch))
+                try:
+                    results = await run_in_threadpool(self.apply, key, [item for item, _ in batch])
+                except Exception as e:
+                    for _, future in batch:
+                        if not future.done():
+                            future.set_exception(e)
+                else:
+                    for (_, future), result in zip(batch, results):
+                        if not future.done():
+                            future.set_result(result)
+        finally:
+            # Nothing can be queued between the loop's last check and here (no await in between)
+            del self._queues[key]
+            for _, future in queue:
+                if not future.done():
+                    future.set_exception(RuntimeError("Batch aborted"))
+
+    def stats(self):
+        return {
+            "requests": self.requests,
+            "batches": self.batches,
+            "mean_batch_size": round(self.requests / self.batches, 2) if self.batches else None,
+            "queued_keys": len(self._queues),
+        }
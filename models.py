@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DECIMAL, DateTime, ForeignKey, CheckConstraint, UniqueConstraint, BigInteger
+from sqlalchemy import Column, Integer, String, Text, DECIMAL, Float, DateTime, ForeignKey, CheckConstraint, UniqueConstraint, PrimaryKeyConstraint, Index, BigInteger
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -62,6 +62,8 @@ class Venue(Base):
     address = Column(Text)
     city = Column(String(100))
     state = Column(String(100))
+    latitude = Column(Float)
+    longitude = Column(Float)
     created_at = Column(DateTime, default=func.current_timestamp())
     updated_at = Column(DateTime, default=func.current_timestamp(), onupdate=func.current_timestamp())
     
@@ -159,61 +161,114 @@ class Schedule(Base):
     created_at = Column(DateTime, default=func.current_timestamp())
     updated_at = Column(DateTime, default=func.current_timestamp(), onupdate=func.current_timestamp())
     
+    __table_args__ = (
+        Index("idx_schedules_venue_start", "venue_id", "start_time"),
+    )
+    
     event = relationship("Event", back_populates="schedules")
     venue = relationship("Venue", back_populates="schedules")
     section = relationship("Section", back_populates="schedules")
     schedule_seats = relationship("ScheduleSeat", back_populates="schedule")
+    inventory = relationship("ScheduleInventory", back_populates="schedule")
     bookings = relationship("Booking", back_populates="schedule")
 
+# schedule_seats and bookings are range-partitioned by month of schedule_start (the schedule's
+# start_time, copied onto each row) on Postgres; see partitions.py. Postgres requires the
+# partition key in every primary key and unique constraint, so the table keys are composite
+# while the ORM still identifies rows by their id alone, and rows in these tables can't be
+# the target of a foreign key: booking_seats and payments join to them without one.
+
 class ScheduleSeat(Base):
     __tablename__ = "schedule_seats"
     
-    schedule_seat_id = Column(BigInteger, primary_key=True, autoincrement=True)
+    schedule_seat_id = Column(BigInteger, autoincrement=True)
     schedule_id = Column(BigInteger, ForeignKey("schedules.schedule_id", ondelete="CASCADE"), nullable=False)
     seat_id = Column(BigInteger, ForeignKey("seats.seat_id", ondelete="CASCADE"), nullable=False)
+    schedule_start = Column(DateTime, nullable=False)  # partition key
     status = Column(String(20), nullable=False, default="AVAILABLE")
     created_at = Column(DateTime, default=func.current_timestamp())
     updated_at = Column(DateTime, default=func.current_timestamp(), onupdate=func.current_timestamp())
     
     __table_args__ = (
+        PrimaryKeyConstraint("schedule_seat_id", "schedule_start"),
         CheckConstraint("status IN ('AVAILABLE', 'BOOKED', 'BLOCKED')", name="check_schedule_seat_status"),
-        UniqueConstraint("schedule_id", "seat_id", name="unique_schedule_seat"),
+        UniqueConstraint("schedule_id", "seat_id", "schedule_start", name="unique_schedule_seat"),
+        {"postgresql_partition_by": "RANGE (schedule_start)"},
     )
+    __mapper_args__ = {"primary_key": [schedule_seat_id]}
     
     schedule = relationship("Schedule", back_populates="schedule_seats")
     seat = relationship("Seat", back_populates="schedule_seats")
-    booking_seats = relationship("BookingSeat", back_populates="schedule_seat")
+    booking_seats = relationship(
+        "BookingSeat", back_populates="schedule_seat",
+        primaryjoin="ScheduleSeat.schedule_seat_id == foreign(BookingSeat.schedule_seat_id)"
+    )
+
+class ScheduleInventory(Base):
+    """General-admission capacity counter for a section/tier of a schedule; no per-seat rows."""
+    __tablename__ = "schedule_inventory"
+    
+    inventory_id = Column(BigInteger, primary_key=True, autoincrement=True)
+    schedule_id = Column(BigInteger, ForeignKey("schedules.schedule_id", ondelete="CASCADE"), nullable=False)
+    section_id = Column(BigInteger, ForeignKey("sections.section_id", ondelete="CASCADE"), nullable=False)
+    tier = Column(String(20), nullable=False, default="GENERAL")
+    price = Column(DECIMAL(10, 2), nullable=False)
+    capacity = Column(Integer, nullable=False)
+    available = Column(Integer, nullable=False)
+    created_at = Column(DateTime, default=func.current_timestamp())
+    updated_at = Column(DateTime, default=func.current_timestamp(), onupdate=func.current_timestamp())
+    
+    __table_args__ = (
+        CheckConstraint("tier IN ('REGULAR', 'PREMIUM', 'VIP', 'GENERAL')", name="check_inventory_tier"),
+        CheckConstraint("available >= 0 AND available <= capacity", name="check_inventory_available"),
+        UniqueConstraint("schedule_id", "section_id", "tier", name="unique_schedule_inventory"),
+    )
+    
+    schedule = relationship("Schedule", back_populates="inventory")
+    section = relationship("Section")
 
 class Booking(Base):
     __tablename__ = "bookings"
     
-    booking_id = Column(BigInteger, primary_key=True, autoincrement=True)
+    booking_id = Column(BigInteger, autoincrement=True)
     user_id = Column(BigInteger, ForeignKey("users.user_id", ondelete="CASCADE"), nullable=False)
     event_id = Column(BigInteger, ForeignKey("events.event_id", ondelete="CASCADE"), nullable=False)
     schedule_id = Column(BigInteger, ForeignKey("schedules.schedule_id", ondelete="CASCADE"))  # NULL if one-time event
     event_seat_id = Column(BigInteger, ForeignKey("event_seats.event_seat_id", ondelete="CASCADE"))  # NULL if recurring
+    inventory_id = Column(BigInteger, ForeignKey("schedule_inventory.inventory_id", ondelete="CASCADE"))  # general admission
+    quantity = Column(Integer)  # general-admission tickets; NULL for seated bookings
+    schedule_start = Column(DateTime, nullable=False)  # partition key: schedule (or one-time event) start
     amount = Column(DECIMAL(10, 2), nullable=False)
     status = Column(String(20), nullable=False, default="PENDING")
     created_at = Column(DateTime, default=func.current_timestamp())
     updated_at = Column(DateTime, default=func.current_timestamp(), onupdate=func.current_timestamp())
     
     __table_args__ = (
+        PrimaryKeyConstraint("booking_id", "schedule_start"),
         CheckConstraint("status IN ('PENDING', 'CONFIRMED', 'CANCELLED')", name="check_booking_status"),
+        {"postgresql_partition_by": "RANGE (schedule_start)"},
     )
+    __mapper_args__ = {"primary_key": [booking_id]}
     
     user = relationship("User", back_populates="bookings")
     event = relationship("Event", back_populates="bookings")
     schedule = relationship("Schedule", back_populates="bookings")
-    booking_seats = relationship("BookingSeat", back_populates="booking")
-    payments = relationship("Payment", back_populates="booking")
+    booking_seats = relationship(
+        "BookingSeat", back_populates="booking",
+        primaryjoin="Booking.booking_id == foreign(BookingSeat.booking_id)"
+    )
+    payments = relationship(
+        "Payment", back_populates="booking",
+        primaryjoin="Booking.booking_id == foreign(Payment.booking_id)"
+    )
 
 class BookingSeat(Base):
     __tablename__ = "booking_seats"
     
     booking_seat_id = Column(BigInteger, primary_key=True, autoincrement=True)
-    booking_id = Column(BigInteger, ForeignKey("bookings.booking_id", ondelete="CASCADE"), nullable=False)
+    booking_id = Column(BigInteger, nullable=False)  # bookings.booking_id (partitioned, no FK)
     event_seat_id = Column(BigInteger, ForeignKey("event_seats.event_seat_id", ondelete="CASCADE"))  # for one-time event
-    schedule_seat_id = Column(BigInteger, ForeignKey("schedule_seats.schedule_seat_id", ondelete="CASCADE"))  # for recurring
+    schedule_seat_id = Column(BigInteger)  # for recurring: schedule_seats.schedule_seat_id (partitioned, no FK)
     created_at = Column(DateTime, default=func.current_timestamp())
     
     __table_args__ = (
@@ -223,15 +278,21 @@ class BookingSeat(Base):
         ),
     )
     
-    booking = relationship("Booking", back_populates="booking_seats")
+    booking = relationship(
+        "Booking", back_populates="booking_seats",
+        primaryjoin="foreign(BookingSeat.booking_id) == Booking.booking_id"
+    )
     event_seat = relationship("EventSeat", back_populates="booking_seats")
-    schedule_seat = relationship("ScheduleSeat", back_populates="booking_seats")
+    schedule_seat = relationship(
+        "ScheduleSeat", back_populates="booking_seats",
+        primaryjoin="foreign(BookingSeat.schedule_seat_id) == ScheduleSeat.schedule_seat_id"
+    )
 
 class Payment(Base):
     __tablename__ = "payments"
     
     payment_id = Column(BigInteger, primary_key=True, autoincrement=True)
-    booking_id = Column(BigInteger, ForeignKey("bookings.booking_id", ondelete="CASCADE"), nullable=False)
+    booking_id = Column(BigInteger, nullable=False)  # bookings.booking_id (partitioned, no FK)
     amount = Column(DECIMAL(10, 2), nullable=False)
     payment_method = Column(String(20), nullable=False)
     status = Column(String(20), nullable=False, default="PENDING")
@@ -244,4 +305,7 @@ class Payment(Base):
         CheckConstraint("status IN ('SUCCESS', 'FAILED', 'PENDING')", name="check_payment_status"),
     )
     
-    booking = relationship("Booking", back_populates="payments")
+    booking = relationship(
+        "Booking", back_populates="payments",
+        primaryjoin="foreign(Payment.booking_id) == Booking.booking_id"
+    )
@@ -0,0 +1,311 @@
+"""
+Monthly range partitions for schedule_seats and bookings (Postgres only).
+
+Both tables are partitioned on schedule_start, so the seat map, lock and
+booking queries (which filter on it) only touch one month's partition and
+its indexes, and past months can be detached without rewriting anything.
+The app creates upcoming partitions at startup and once a day; expiring
+old ones is meant for a scheduled job. booking_seats and payments can't
+reference a partitioned table with a foreign key, so expiry moves (or
+deletes) their rows for the expired bookings in the same transaction instead
+of relying on ON DELETE CASCADE.
+
+Databases created before partitioning are converted with 'migrate': in one
+transaction the old tables are moved aside to PRE_PARTITIONING_SCHEMA, the
+partitioned ones are created in their place with partitions covering the
+data, the rows are copied over (schedule_start filled in from the schedule
+or one-time event) and the id sequences are carried on.
+
+    python partitions.py list
+    python partitions.py ensure --months-ahead 6 --from 2024-01
+    python partitions.py expire --retention-months 12 [--drop] [--dry-run]
+    python partitions.py migrate [--keep-old]
+"""
+import argparse
+import asyncio
+import logging
+import re
+from datetime import datetime
+
+from sqlalchemy import text
+
+from database import engine
+from models import Base
+from settings import settings
+
+logger = logging.getLogger("uvicorn.error")
+
+PARTITIONED_TABLES = ("schedule_seats", "bookings")
+
+# Rows of these reference bookings by booking_id (no FK), and follow their booking on expiry
+BOOKING_DEPENDENTS = ("booking_seats", "payments")
+
+# Where migrate_to_partitions() moves the unpartitioned tables (dropped afterwards unless kept)
+PRE_PARTITIONING_SCHEMA = "pre_partitioning"
+
+# Indexes and triggers schema.sql defines on the partitioned tables, recreated by the migration
+PARTITIONED_TABLE_DDL = {
+    "schedule_seats": (
+        "CREATE INDEX IF NOT EXISTS idx_schedule_seats_schedule_id ON schedule_seats(schedule_id)",
+        "CREATE INDEX IF NOT EXISTS idx_schedule_seats_status ON schedule_seats(status)",
+    ),
+    "bookings": (
+        "CREATE INDEX IF NOT EXISTS idx_bookings_user_id ON bookings(user_id)",
+        "CREATE INDEX IF NOT EXISTS idx_bookings_event_id ON bookings(event_id)",
+        "CREATE INDEX IF NOT EXISTS idx_bookings_status ON bookings(status)",
+        "CREATE INDEX IF NOT EXISTS idx_bookings_created_at ON bookings(created_at)",
+    ),
+}
+
+# schedule_start for rows copied from tables that predate the column
+SCHEDULE_START_SQL = {
+    "schedule_seats": "COALESCE((SELECT start_time FROM schedules WHERE schedules.schedule_id = old.schedule_id), "
+                      "old.created_at, now())",
+    "bookings": "COALESCE((SELECT start_time FROM schedules WHERE schedules.schedule_id = old.schedule_id), "
+                "(SELECT start_time FROM event_seats WHERE event_seats.event_seat_id = old.event_seat_id), "
+                "old.created_at, now())",
+}
+
+ID_COLUMNS = {"schedule_seats": "schedule_seat_id", "bookings": "booking_id"}
+
+# pg_advisory_xact_lock key, so concurrent workers / jobs don't race on the same DDL
+MAINTENANCE_LOCK = 7301036
+
+_partition_suffix = re.compile(r"_p(\d{4})(\d{2})$")
+
+
+def month_start(value: datetime) -> datetime:
+    return value.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def add_months(month: datetime, count: int) -> datetime:
+    index = month.year * 12 + month.month - 1 + count
+    return month.replace(year=index // 12, month=index % 12 + 1)
+
+
+def partition_name(table: str, month: datetime) -> str:
+    return f"{table}_p{month:%Y%m}"
+
+
+def list_partitions(connection, table: str):
+    """[(month, partition name)] of the monthly partitions attached to table, oldest first."""
+    names = connection.execute(text("""
+        SELECT child.relname
+        FROM pg_inherits
+        JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+        JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+        WHERE parent.oid = to_regclass(:table)
+    """), {"table": table}).scalars()
+
+    partitions = []
+    for name in names:
+        match = _partition_suffix.search(name)
+        if match:
+            partitions.append((datetime(int(match[1]), int(match[2]), 1), name))
+    return sorted(partitions)
+
+
+def _lock(connection):
+    connection.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": MAINTENANCE_LOCK})
+
+
+def ensure_partitions(connection, first: datetime, last: datetime):
+    """Create the missing monthly partitions covering first..last (both inclusive)."""
+    _lock(connection)
+    created = []
+    month, last = month_start(first), month_start(last)
+    while month <= last:
+        upper = add_months(month, 1)
+        for table in PARTITIONED_TABLES:
+            name = partition_name(table, month)
+            if connection.execute(text("SELECT to_regclass(:name)"), {"name": name}).scalar() is not None:
+                continue
+            connection.execute(text(
+                f"CREATE TABLE {name} PARTITION OF {table} "
+                f"FOR VALUES FROM ('{month:%Y-%m-%d}') TO ('{upper:%Y-%m-%d}')"
+            ))
+            created.append(name)
+        month = upper
+    return created
+
+
+def ensure_upcoming(connection, months_ahead: int = None):
+    months_ahead = settings.PARTITION_MONTHS_AHEAD if months_ahead is None else months_ahead
+    now = datetime.now()
+    return ensure_partitions(connection, now, add_months(month_start(now), months_ahead))
+
+
+def expire_partitions(connection, retention_months: int = None, drop: bool = False, dry_run: bool = False):
+    """
+    Detach the partitions of months older than the retention window. Detached partitions are
+    moved to PARTITION_ARCHIVE_SCHEMA (still queryable, no longer scanned) or dropped.
+    """
+    retention_months = settings.PARTITION_RETENTION_MONTHS if retention_months is None else retention_months
+    cutoff = add_months(month_start(datetime.now()), -retention_months)
+    archive = settings.PARTITION_ARCHIVE_SCHEMA
+
+    _lock(connection)
+    if not drop and not dry_run:
+        connection.execute(text(f"CREATE SCHEMA IF NOT EXISTS {archive}"))
+
+    expired = []
+    for table in PARTITIONED_TABLES:
+        for month, name in list_partitions(connection, table):
+            if month >= cutoff:
+                continue
+            expired.append(name)
+            if dry_run:
+                continue
+            if table == "bookings":
+                _expire_booking_dependents(connection, name, None if drop else archive)
+            connection.execute(text(f"ALTER TABLE {table} DETACH PARTITION {name}"))
+            if drop:
+                connection.execute(text(f"DROP TABLE {name}"))
+            else:
+                connection.execute(text(f"ALTER TABLE {name} SET SCHEMA {archive}"))
+    return expired
+
+
+def _expire_booking_dependents(connection, partition: str, archive: str = None):
+    """Delete the booking_seats/payments rows of a bookings partition's bookings, copying them to archive first."""
+    for dependent in BOOKING_DEPENDENTS:
+        doomed = f"DELETE FROM {dependent} WHERE booking_id IN (SELECT booking_id FROM {partition})"
+        if archive is None:
+            connection.execute(text(doomed))
+            continue
+        connection.execute(text(f"CREATE TABLE IF NOT EXISTS {archive}.{dependent} (LIKE {dependent})"))
+        connection.execute(text(
+            f"WITH moved AS ({doomed} RETURNING *) INSERT INTO {archive}.{dependent} SELECT * FROM moved"
+        ))
+
+
+def _relation_kind(connection, table: str, schema: str = "public"):
+    """pg_class.relkind: 'r' for a plain table, 'p' for a partitioned one, None if missing."""
+    return connection.execute(text("""
+        SELECT relkind FROM pg_class JOIN pg_namespace ON pg_namespace.oid = pg_class.relnamespace
+        WHERE relname = :table AND nspname = :schema
+    """), {"table": table, "schema": schema}).scalar()
+
+
+def migrate_to_partitions(connection, keep_old: bool = False):
+    """Copy-and-swap unpartitioned schedule_seats/bookings into partitioned tables; returns the tables migrated."""
+    _lock(connection)
+    old_schema = PRE_PARTITIONING_SCHEMA
+    migrated = []
+    for table in PARTITIONED_TABLES:
+        if _relation_kind(connection, table) != "r":
+            continue
+        if not migrated:
+            connection.execute(text(f"CREATE SCHEMA IF NOT EXISTS {old_schema}"))
+
+        # booking_seats / payments had FKs to the old tables; the partitioned ones can't be referenced
+        for referencing, constraint in connection.execute(text("""
+            SELECT conrelid::regclass::text, conname FROM pg_constraint
+            WHERE contype = 'f' AND confrelid = to_regclass(:table)
+        """), {"table": table}).all():
+            connection.execute(text(f'ALTER TABLE {referencing} DROP CONSTRAINT "{constraint}"'))
+
+        # Its indexes and id sequence move along, so the new table's names are free
+        connection.execute(text(f"ALTER TABLE {table} SET SCHEMA {old_schema}"))
+        Base.metadata.tables[table].create(connection)
+        for statement in PARTITIONED_TABLE_DDL[table]:
+            connection.execute(text(statement))
+        if connection.execute(text("SELECT to_regproc('update_updated_at_column')")).scalar():
+            connection.execute(text(
+                f"CREATE TRIGGER update_{table}_updated_at BEFORE UPDATE ON {table} "
+                f"FOR EACH ROW EXECUTE FUNCTION update_updated_at_column()"
+            ))
+
+        old_columns = set(connection.execute(text("""
+            SELECT column_name FROM information_schema.columns WHERE table_schema = :schema AND table_name = :table
+        """), {"schema": old_schema, "table": table}).scalars())
+        columns = [column.name for column in Base.metadata.tables[table].columns]
+        values = [
+            f"old.{column}" if column in old_columns
+            else SCHEDULE_START_SQL[table] if column == "schedule_start"
+            else "NULL"
+            for column in columns
+        ]
+        schedule_start = "old.schedule_start" if "schedule_start" in old_columns else SCHEDULE_START_SQL[table]
+        first, last = connection.execute(text(
+            f"SELECT min({schedule_start}), max({schedule_start}) FROM {old_schema}.{table} old"
+        )).one()
+        if first is not None:
+            ensure_partitions(connection, first, last)
+        connection.execute(text(
+            f"INSERT INTO {table} ({', '.join(columns)}) SELECT {', '.join(values)} FROM {old_schema}.{table} old"
+        ))
+
+        id_column = ID_COLUMNS[table]
+        connection.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('{table}', '{id_column}'), "
+            f"COALESCE((SELECT max({id_column}) FROM {table}), 0) + 1, false)"
+        ))
+        migrated.append(table)
+
+    if migrated and not keep_old:
+        connection.execute(text(f"DROP SCHEMA {old_schema} CASCADE"))
+    return migrated
+
+
+def _ensure_upcoming_now():
+    with engine.begin() as connection:
+        return ensure_upcoming(connection)
+
+
+async def maintain_partitions(interval: float = 24 * 3600):
+    """Keep PARTITION_MONTHS_AHEAD months of partitions created. Runs until cancelled."""
+    while True:
+        try:
+            created = await asyncio.to_thread(_ensure_upcoming_now)
+            if created:
+                logger.info("Created partitions %s", created)
+        except Exception as e:
+            logger.warning("Partition maintenance failed: %s", e)
+        await asyncio.sleep(interval)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage schedule_seats/bookings monthly partitions")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    commands.add_parser("list", help="Show attached partitions")
+
+    ensure = commands.add_parser("ensure", help="Create missing partitions up to --months-ahead")
+    ensure.add_argument("--months-ahead", type=int, default=settings.PARTITION_MONTHS_AHEAD)
+    ensure.add_argument("--from", dest="first", type=lambda value: datetime.strptime(value, "%Y-%m"),
+                        help="First month to cover (YYYY-MM), for back-filling; defaults to this month")
+
+    expire = commands.add_parser("expire", help="Detach and archive (or drop) partitions past retention")
+    expire.add_argument("--retention-months", type=int, default=settings.PARTITION_RETENTION_MONTHS)
+    expire.add_argument("--drop", action="store_true", help="Drop detached partitions instead of archiving them")
+    expire.add_argument("--dry-run", action="store_true")
+
+    migrate = commands.add_parser("migrate", help="Convert unpartitioned schedule_seats/bookings (copy and swap)")
+    migrate.add_argument("--keep-old", action="store_true",
+                         help=f"Keep the old tables in the {PRE_PARTITIONING_SCHEMA} schema")
+    args = parser.parse_args()
+
+    if engine.dialect.name != "postgresql":
+        parser.error("partitioning needs Postgres")
+
+    with engine.begin() as connection:
+        if args.command == "list":
+            for table in PARTITIONED_TABLES:
+                for month, name in list_partitions(connection, table):
+                    print(f"{table:15} {month:%Y-%m}  {name}")
+        elif args.command == "ensure":
+            last = add_months(month_start(datetime.now()), args.months_ahead)
+            created = ensure_partitions(connection, args.first or datetime.now(), last)
+            print(f"Created {len(created)} partitions: {', '.join(created) or '-'}")
+        elif args.command == "migrate":
+            migrated = migrate_to_partitions(connection, args.keep_old)
+            print(f"Migrated {', '.join(migrated) or 'nothing (already partitioned)'}")
+        else:
+            expired = expire_partitions(connection, args.retention_months, args.drop, args.dry_run)
+            action = "Would expire" if args.dry_run else ("Dropped" if args.drop else "Archived")
+            print(f"{action} {len(expired)} partitions: {', '.join(expired) or '-'}")
+
+
+if __name__ == "__main__":
+    main()
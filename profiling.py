@@ -0,0 +1,190 @@
+"""
+On-demand request profiling and allocation tracing (non-production only).
+
+A request sent with "X-Profile: 1" or "?profile=1" runs under a sampling
+profiler and the response body is replaced by the collapsed stacks
+("frame;frame;frame count" per line), which flamegraph.pl and speedscope
+read directly. Only the profiled request's own work is sampled, not other
+requests or background tasks running at the same time, and profiled
+requests bypass the response cache and singleflight (api.py) so the
+profile shows the handler actually running. tracemalloc snapshots are taken and diffed through the
+/test/tracemalloc endpoints.
+"""
+import contextvars
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from urllib.parse import parse_qs
+
+from starlette.datastructures import Headers
+
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# The sampler of the request being profiled; threadpool calls made from it run with a copy of its context
+_sampler = contextvars.ContextVar("profiling_sampler", default=None)
+
+
+class StackSampler:
+    """
+    Samples the stacks of one request at a fixed interval: the event loop thread while the
+    request's own coroutines are on it (entry is the frame that awaits the app), and threadpool
+    threads while they run a call made from the request's context. Only stacks that pass
+    through this project's code are kept.
+    """
+
+    def __init__(self, interval: float, loop_thread: int, entry):
+        self.interval = interval
+        self.loop_thread = loop_thread
+        self.entry = entry
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            self.samples += 1
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                frames = []
+                while frame is not None:
+                    frames.append(frame)
+                    frame = frame.f_back
+                if not self._serving(thread_id, frames):
+                    continue
+
+                stack = []
+                in_project = False
+                for frame in frames:
+                    code = frame.f_code
+                    if code.co_filename.startswith(PROJECT_DIR) and "site-packages" not in code.co_filename:
+                        in_project = True
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                if in_project:
+                    self.stacks[";".join(reversed(stack))] += 1
+
+    def _serving(self, thread_id: int, frames) -> bool:
+        """Whether the thread is running this request's work right now."""
+        if thread_id == self.loop_thread:
+            return any(frame is self.entry for frame in frames)
+        # A worker thread holds the context it runs the call in (anyio's WorkerThread.run), near its root
+        for frame in reversed(frames):
+            for value in frame.f_locals.values():
+                if isinstance(value, contextvars.Context) and value.get(_sampler) is self:
+                    return True
+        return False
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+def profile_requested(scope) -> bool:
+    if Headers(scope=scope).get("x-profile", "").lower() in ("1", "true"):
+        return True
+    query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+    return query.get("profile", [""])[0].lower() in ("1", "true")
+
+
+class ProfilingMiddleware:
+    def __init__(self, app, interval: float = 0.001):
+        self.app = app
+        self.interval = interval
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not profile_requested(scope):
+            await self.app(scope, receive, send)
+            return
+
+        status_code = None
+
+        async def discard_response(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+
+        sampler = StackSampler(self.interval, threading.get_ident(), sys._getframe())
+        token = _sampler.set(sampler)
+        started = time.perf_counter()
+        sampler.start()
+        try:
+            await self.app(scope, receive, discard_response)
+        finally:
+            sampler.stop()
+            _sampler.reset(token)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        body = sampler.collapsed().encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [
+                (b"content-type", b"text/plain; charset=utf-8"),
+                (b"content-length", str(len(body)).encode()),
+                (b"x-profile-duration-ms", f"{elapsed_ms:.1f}".encode()),
+                (b"x-profile-samples", str(sampler.samples).encode()),
+                (b"x-profiled-status", str(status_code).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+# tracemalloc -------------------------------------------------------------------------------------------
+
+_last_snapshot = None
+
+
+def start_tracing(frames: int = 10):
+    global _last_snapshot
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(frames)
+    _last_snapshot = None
+
+
+def stop_tracing():
+    global _last_snapshot
+    tracemalloc.stop()
+    _last_snapshot = None
+
+
+def _snapshot():
+    return tracemalloc.take_snapshot().filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        tracemalloc.Filter(False, "<unknown>"),
+    ))
+
+
+def snapshot_report(limit: int = 25, group_by: str = "lineno"):
+    """Top allocation sites now, and the growth since the previous call."""
+    global _last_snapshot
+    snapshot = _snapshot()
+    current, peak = tracemalloc.get_traced_memory()
+
+    report = {
+        "traced_current_bytes": current,
+        "traced_peak_bytes": peak,
+        "top": [
+            {"site": str(stat.traceback), "size_bytes": stat.size, "count": stat.count}
+            for stat in snapshot.statistics(group_by)[:limit]
+        ],
+        "diff": None,
+    }
+    if _last_snapshot is not None:
+        report["diff"] = [
+            {"site": str(stat.traceback), "size_diff_bytes": stat.size_diff, "count_diff": stat.count_diff}
+            for stat in snapshot.compare_to(_last_snapshot, group_by)[:limit]
+        ]
+    _last_snapshot = snapshot
+    return report
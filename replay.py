@@ -0,0 +1,176 @@
+"""
+Replays a traffic capture (see capture.py) against a running server.
+
+Every captured request is reissued at its original offset from the first one,
+divided by --speed, without waiting for earlier responses, so bursts and
+overlapping requests keep the concurrency they had in production (--speed 2
+is the same traffic shape at twice the rate). Body fields the capture redacted
+are filled with synthetic values, and since no headers are captured, --token
+is sent as the bearer token on every request. Redacted query parameters are
+filled the same way, or left out when there's no synthetic value for them
+(user_id: the token identifies the user).
+
+Reports, per route template, how many responses had the captured status and
+the replayed latency next to the captured one, plus how far sends lagged
+behind schedule (a large lag means this client, not the server, was the
+bottleneck).
+
+    python replay.py captures/requests.jsonl.1 captures/requests.jsonl --url http://localhost:8000 --speed 2
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import statistics
+import time
+from collections import Counter
+from urllib.parse import parse_qsl, urlencode
+
+import httpx
+
+from capture import REDACTED
+
+SYNTHETIC = {
+    "email": lambda n: f"replay-{n}@example.com",
+    "phone": lambda n: f"9{n:09d}"[-10:],
+    "name": lambda n: f"Replay User {n}",
+    "password": lambda n: "replay-password",
+    "token": lambda n: f"replay-token-{n}",
+    "card_number": lambda n: "4111111111111111",
+    "cvv": lambda n: "123",
+    "upi_id": lambda n: f"replay{n}@upi",
+    "transaction_id": lambda n: f"replay-{n}",
+}
+
+sequence = itertools.count(1)
+
+
+def load(paths, route=None, limit=None):
+    records = []
+    for path in paths:
+        with open(path) as capture_file:
+            records.extend(json.loads(line) for line in capture_file if line.strip())
+    if route:
+        records = [record for record in records if (record.get("route") or record["path"]).startswith(route)]
+    records.sort(key=lambda record: record["ts"])
+    return records[:limit] if limit else records
+
+
+def fill_redacted(value):
+    if isinstance(value, dict):
+        n = next(sequence)
+        return {
+            key: SYNTHETIC[key.lower()](n) if item == REDACTED and key.lower() in SYNTHETIC else fill_redacted(item)
+            for key, item in value.items()
+        }
+    if isinstance(value, list):
+        return [fill_redacted(item) for item in value]
+    return value
+
+
+def fill_query(query: str) -> str:
+    params = parse_qsl(query, keep_blank_values=True)
+    if all(value != REDACTED for _, value in params):
+        return query
+    n = next(sequence)
+    return urlencode([
+        (key, SYNTHETIC[key.lower()](n) if value == REDACTED else value)
+        for key, value in params
+        if value != REDACTED or key.lower() in SYNTHETIC
+    ])
+
+
+async def send(client, record, due, results):
+    lag = time.perf_counter() - due
+    body = record.get("body")
+    kwargs = {}
+    if isinstance(body, dict) and "_omitted_bytes" in body:
+        results["omitted"] += 1
+    elif body is not None:
+        kwargs["json"] = fill_redacted(body)
+    query = fill_query(record["query"]) if record.get("query") else None
+    url = record["path"] + (f"?{query}" if query else "")
+
+    started = time.perf_counter()
+    try:
+        response = await client.request(record["method"], url, **kwargs)
+        status = response.status_code
+    except httpx.HTTPError as e:
+        status = type(e).__name__
+    results["rows"].append((record.get("route") or record["path"], record["status"], status,
+                            record["duration_ms"], (time.perf_counter() - started) * 1000, lag * 1000))
+
+
+async def replay(records, url, speed, token, timeout):
+    headers = {"Authorization": f"Bearer {token}"} if token else {}
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    results = {"rows": [], "omitted": 0}
+    async with httpx.AsyncClient(base_url=url, headers=headers, timeout=timeout, limits=limits) as client:
+        tasks = []
+        t0 = records[0]["ts"]
+        start = time.perf_counter()
+        for record in records:
+            due = start + (record["ts"] - t0) / speed
+            delay = due - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(send(client, record, due, results)))
+        await asyncio.gather(*tasks)
+    return results, time.perf_counter() - start
+
+
+def p99(values):
+    return values[max(int(len(values) * 0.99) - 1, 0)]
+
+
+def report(results, elapsed, captured_span):
+    rows = results["rows"]
+    print(f"\n{len(rows)} requests in {elapsed:.1f} s ({len(rows) / elapsed:.0f} requests/s; "
+          f"captured over {captured_span:.1f} s)")
+    print(f"{'route':<48}{'calls':>7}{'match':>8}{'p50 ms':>9}{'was':>8}{'p99 ms':>9}{'was':>8}")
+    by_route = {}
+    for row in rows:
+        by_route.setdefault(row[0], []).append(row)
+    for route, route_rows in sorted(by_route.items()):
+        matched = sum(1 for row in route_rows if row[1] == row[2])
+        replayed = sorted(row[4] for row in route_rows)
+        captured = sorted(row[3] for row in route_rows)
+        print(f"{route[:47]:<48}{len(route_rows):>7}{matched / len(route_rows):>8.0%}"
+              f"{statistics.median(replayed):>9.1f}{statistics.median(captured):>8.1f}"
+              f"{p99(replayed):>9.1f}{p99(captured):>8.1f}")
+
+    mismatches = Counter((row[1], row[2]) for row in rows if row[1] != row[2])
+    if mismatches:
+        print("\nstatus mismatches (captured -> replayed): "
+              + ", ".join(f"{was} -> {now} x{count}" for (was, now), count in mismatches.most_common(10)))
+    lags = sorted(row[5] for row in rows)
+    print(f"send lag: p50 {statistics.median(lags):.1f} ms, p99 {p99(lags):.1f} ms, max {lags[-1]:.1f} ms")
+    if results["omitted"]:
+        print(f"{results['omitted']} requests sent without their body (too large or not JSON when captured)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a traffic capture at 1x-Nx speed")
+    parser.add_argument("captures", nargs="+", help="Capture files (include the rotated .1 file for the full window)")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--speed", type=float, default=1.0, help="Replay rate relative to the capture")
+    parser.add_argument("--route", help="Only replay routes starting with this prefix")
+    parser.add_argument("--limit", type=int, help="Replay only the first N requests")
+    parser.add_argument("--token", help="Bearer token sent with every request")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    args = parser.parse_args()
+    if args.speed <= 0:
+        parser.error("--speed must be positive")
+
+    records = load(args.captures, args.route, args.limit)
+    if not records:
+        parser.error("no requests to replay")
+    captured_span = records[-1]["ts"] - records[0]["ts"]
+    print(f"replaying {len(records)} requests against {args.url} at {args.speed:g}x "
+          f"(~{captured_span / args.speed:.1f} s)")
+    results, elapsed = asyncio.run(replay(records, args.url, args.speed, args.token, args.timeout))
+    report(results, elapsed, captured_span)
+
+
+if __name__ == "__main__":
+    main()
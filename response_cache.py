@@ -0,0 +1,105 @@
+"""
+Stale-while-revalidate response cache for catalog reads.
+
+Rendered bodies are kept per request key. Within fresh_ttl they are served
+as they are. Past it, and up to stale_ttl, the cached body is served
+straight away while one background render refreshes it. When a render fails
+because the database is down or saturated, or the circuit breaker is open,
+the last good body within stale_ttl is served instead of an error. Stale
+responses are marked by the caller (X-Cache: STALE, Age). Invalidation
+messages don't drop entries; they only mark them for revalidation, so the
+bodies can still cover an outage.
+"""
+import asyncio
+import time
+from collections import namedtuple
+
+from cachetools import LRUCache
+
+import metrics
+from database import is_database_outage
+
+# status: HIT (fresh cached), MISS (just rendered) or STALE; age in seconds
+Served = namedtuple("Served", "body media_type status age")
+
+
+class CacheEntry:
+    __slots__ = ("body", "media_type", "stored_at", "valid")
+
+    def __init__(self, body, media_type):
+        self.body = body
+        self.media_type = media_type
+        self.stored_at = time.monotonic()
+        self.valid = True
+
+
+class ResponseCache:
+    def __init__(self, fresh_ttl: float, stale_ttl: float, maxsize: int, available=lambda: True):
+        self.fresh_ttl = fresh_ttl
+        self.stale_ttl = stale_ttl
+        self.available = available  # False while the database circuit is open: serve stale only
+        self._entries = LRUCache(maxsize=maxsize)
+        self._refreshing = {}  # key -> background refresh task
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+
+    async def serve(self, key, render) -> Served:
+        """render() is a coroutine function returning (body, media_type); its errors propagate when nothing can cover them."""
+        entry = self._entries.get(key)
+        age = time.monotonic() - entry.stored_at if entry else None
+        usable = entry is not None and age <= self.stale_ttl
+
+        if entry is not None and entry.valid and age <= self.fresh_ttl:
+            self.hits += 1
+            return Served(entry.body, entry.media_type, "HIT", age)
+        if usable and not self.available():
+            return self._serve_stale(entry, age, "circuit_open")
+        if usable and entry.valid:
+            self._revalidate(key, render)
+            return self._serve_stale(entry, age, "revalidating")
+
+        try:
+            body, media_type = await render()
+        except Exception as e:
+            if usable and (is_database_outage(e) or isinstance(e, asyncio.TimeoutError)):
+                return self._serve_stale(entry, age, "database_error")
+            raise
+        self.misses += 1
+        self._entries[key] = CacheEntry(body, media_type)
+        return Served(body, media_type, "MISS", 0.0)
+
+    def _serve_stale(self, entry, age, reason):
+        self.stale += 1
+        metrics.stale_responses.inc(reason=reason)
+        return Served(entry.body, entry.media_type, "STALE", age)
+
+    def _revalidate(self, key, render):
+        if key in self._refreshing:
+            return
+
+        async def refresh():
+            try:
+                body, media_type = await render()
+                self._entries[key] = CacheEntry(body, media_type)
+            except Exception:
+                pass  # keep serving the old body until it ages out
+            finally:
+                self._refreshing.pop(key, None)
+
+        self._refreshing[key] = asyncio.ensure_future(refresh())
+
+    def invalidate_all(self):
+        for entry in list(self._entries.values()):
+            entry.valid = False
+
+    def stats(self):
+        return {
+            "entries": len(self._entries),
+            "fresh_ttl": self.fresh_ttl,
+            "stale_ttl": self.stale_ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "stale": self.stale,
+            "refreshing": len(self._refreshing),
+        }
@@ -0,0 +1,167 @@
+"""
+Set-based schedule generation from a recurrence rule (Postgres only).
+
+A rule is an event, a venue section, a date range, the weekdays to play and
+the showtimes on those days. The matching start times are expanded here,
+then a single statement inserts every schedule (skipping slots that overlap
+an existing schedule in the section) and generates their schedule_seats
+server-side with INSERT ... SELECT from seats, instead of building one ORM
+object per seat.
+
+    python schedule_generator.py --event 1 --section 3 --from 2025-01-01 --to 2025-01-31 \
+        --days mon,tue,wed,thu,fri,sat,sun --times 10:00,14:00,18:00,21:00 [--duration 150] [--dry-run]
+"""
+import argparse
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from database import SessionLocal, publish_invalidation
+from models import Event, Section
+from partitions import ensure_partitions
+
+WEEKDAYS = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+
+# Schedules one rule may create (each brings a section's worth of schedule_seats rows)
+MAX_SCHEDULES = 2000
+
+# pg_advisory_xact_lock(GENERATION_LOCK, section_id): generations for the same section run one at a
+# time, so two of them can't both pass the NOT EXISTS overlap check for the same slot
+GENERATION_LOCK = 7301043
+
+GENERATE_SQL = text("""
+    WITH slots AS (
+        SELECT unnest(CAST(:start_times AS timestamp[])) AS start_time
+    ), new_schedules AS (
+        INSERT INTO schedules (event_id, venue_id, section_id, start_time, end_time, created_at, updated_at)
+        SELECT :event_id, sections.venue_id, sections.section_id, slots.start_time,
+               slots.start_time + make_interval(mins => :duration), now(), now()
+        FROM slots CROSS JOIN sections
+        WHERE sections.section_id = :section_id
+          AND NOT EXISTS (
+              SELECT 1 FROM schedules existing
+              WHERE existing.section_id = sections.section_id
+                AND existing.start_time < slots.start_time + make_interval(mins => :duration)
+                AND existing.end_time > slots.start_time
+          )
+        RETURNING schedule_id, start_time
+    ), new_seats AS (
+        INSERT INTO schedule_seats (schedule_id, seat_id, schedule_start, status, created_at, updated_at)
+        SELECT new_schedules.schedule_id, seats.seat_id, new_schedules.start_time, 'AVAILABLE', now(), now()
+        FROM new_schedules CROSS JOIN seats
+        WHERE seats.section_id = :section_id
+    )
+    SELECT schedule_id, start_time FROM new_schedules ORDER BY start_time
+""")
+
+
+def parse_weekdays(value: str):
+    """Parse "mon,wed,fri" into ISO weekdays {1, 3, 5}."""
+    try:
+        return {WEEKDAYS.index(day.strip().lower()[:3]) + 1 for day in value.split(",") if day.strip()}
+    except ValueError:
+        raise ValueError(f"Weekdays must be among {', '.join(WEEKDAYS)}")
+
+
+def parse_showtimes(value: str):
+    """Parse "10:00,18:30" into sorted times."""
+    try:
+        return sorted({datetime.strptime(showtime.strip(), "%H:%M").time() for showtime in value.split(",") if showtime.strip()})
+    except ValueError:
+        raise ValueError("Showtimes must be HH:MM")
+
+
+def occurrences(first_day: date, last_day: date, weekdays, showtimes):
+    """Start times of the rule, in order."""
+    if first_day > last_day:
+        raise ValueError("The date range is empty")
+    if not weekdays or not showtimes:
+        raise ValueError("A rule needs at least one weekday and one showtime")
+
+    start_times = []
+    day = first_day
+    while day <= last_day:
+        if day.isoweekday() in weekdays:
+            start_times.extend(datetime.combine(day, showtime) for showtime in showtimes)
+        day += timedelta(days=1)
+    if len(start_times) > MAX_SCHEDULES:
+        raise ValueError(f"The rule matches {len(start_times)} shows; split it (at most {MAX_SCHEDULES})")
+    return start_times
+
+
+def generate_schedules(
+    db: Session, event_id: int, section_id: int, first_day: date, last_day: date,
+    weekdays, showtimes, duration: int = None
+):
+    """
+    Create the rule's schedules and their seat inventory in one statement (not committed).
+    Returns (created [(schedule_id, start_time)], rule start times, seats per schedule).
+    """
+    event = db.get(Event, event_id)
+    if event is None:
+        raise LookupError("Event not found")
+    section = db.get(Section, section_id)
+    if section is None:
+        raise LookupError("Section not found")
+    duration = duration or event.duration
+    if not duration:
+        raise ValueError("The event has no duration; pass one")
+
+    start_times = occurrences(first_day, last_day, weekdays, showtimes)
+    for earlier, later in zip(start_times, start_times[1:]):
+        if later - earlier < timedelta(minutes=duration):
+            raise ValueError(f"Shows at {earlier} and {later} would overlap")
+    db.execute(text("SELECT pg_advisory_xact_lock(:key, :section_id)"), {"key": GENERATION_LOCK, "section_id": section_id})
+    ensure_partitions(db.connection(), start_times[0], start_times[-1])
+    created = db.execute(GENERATE_SQL, {
+        "start_times": start_times, "event_id": event_id, "section_id": section_id, "duration": duration
+    }).all()
+    seats = db.execute(
+        text("SELECT count(*) FROM seats WHERE section_id = :section_id"), {"section_id": section_id}
+    ).scalar()
+
+    if created:
+        # Keyed, so workers patch their listings and drop only these entries instead of every schedule cache
+        for schedule_id, _ in created:
+            publish_invalidation(db, "schedule", schedule_id)
+        publish_invalidation(db, "event", event_id)
+    return [tuple(row) for row in created], start_times, seats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate an event's schedules from a recurrence rule")
+    parser.add_argument("--event", type=int, required=True, help="Event id")
+    parser.add_argument("--section", type=int, required=True, help="Venue section id")
+    parser.add_argument("--from", dest="first_day", type=date.fromisoformat, required=True, help="First day (YYYY-MM-DD)")
+    parser.add_argument("--to", dest="last_day", type=date.fromisoformat, required=True, help="Last day (YYYY-MM-DD)")
+    parser.add_argument("--days", default=",".join(WEEKDAYS), help="Weekdays, e.g. fri,sat,sun (default every day)")
+    parser.add_argument("--times", required=True, help="Showtimes, e.g. 14:00,19:30")
+    parser.add_argument("--duration", type=int, help="Minutes per show (default: the event's duration)")
+    parser.add_argument("--dry-run", action="store_true", help="Only list the start times the rule matches")
+    args = parser.parse_args()
+
+    try:
+        weekdays = parse_weekdays(args.days)
+        showtimes = parse_showtimes(args.times)
+        if args.dry_run:
+            for start_time in occurrences(args.first_day, args.last_day, weekdays, showtimes):
+                print(start_time)
+            return
+
+        with SessionLocal() as db:
+            if db.get_bind().dialect.name != "postgresql":
+                parser.error("schedule generation needs Postgres")
+            created, start_times, seats = generate_schedules(
+                db, args.event, args.section, args.first_day, args.last_day, weekdays, showtimes, args.duration
+            )
+            db.commit()
+    except (LookupError, ValueError) as e:
+        parser.error(str(e))
+
+    print(f"Created {len(created)} of {len(start_times)} schedules ({len(created) * seats} schedule seats); "
+          f"{len(start_times) - len(created)} overlapped existing schedules")
+
+
+if __name__ == "__main__":
+    main()
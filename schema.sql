@@ -19,6 +19,8 @@ CREATE TABLE venues (
     address TEXT,
     city VARCHAR(100),
     state VARCHAR(100),
+    latitude DOUBLE PRECISION,
+    longitude DOUBLE PRECISION,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
@@ -84,36 +86,79 @@ CREATE TABLE schedules (
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
+-- General-admission inventory: one capacity counter per schedule section/tier instead of a row per seat
+CREATE TABLE schedule_inventory (
+    inventory_id BIGSERIAL PRIMARY KEY,
+    schedule_id BIGINT NOT NULL REFERENCES schedules(schedule_id) ON DELETE CASCADE,
+    section_id BIGINT NOT NULL REFERENCES sections(section_id) ON DELETE CASCADE,
+    tier VARCHAR(20) NOT NULL DEFAULT 'GENERAL' CHECK (tier IN ('REGULAR', 'PREMIUM', 'VIP', 'GENERAL')),
+    price DECIMAL(10,2) NOT NULL,
+    capacity INTEGER NOT NULL,
+    available INTEGER NOT NULL CHECK (available >= 0 AND available <= capacity),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE(schedule_id, section_id, tier)
+);
+
+-- schedule_seats and bookings are range-partitioned by the month of schedule_start (the
+-- schedule's start_time, copied onto each row). The partition key has to be part of every
+-- primary key / unique constraint, so neither table can be the target of a foreign key:
+-- booking_seats and payments reference them by id only. Monthly partitions are created
+-- ahead of time and expired by partitions.py.
+
 -- Schedule Seats table (for recurring events)
 CREATE TABLE schedule_seats (
-    schedule_seat_id BIGSERIAL PRIMARY KEY,
+    schedule_seat_id BIGSERIAL NOT NULL,
     schedule_id BIGINT NOT NULL REFERENCES schedules(schedule_id) ON DELETE CASCADE,
     seat_id BIGINT NOT NULL REFERENCES seats(seat_id) ON DELETE CASCADE,
+    schedule_start TIMESTAMP NOT NULL,
     status VARCHAR(20) NOT NULL DEFAULT 'AVAILABLE' CHECK (status IN ('AVAILABLE', 'BOOKED', 'BLOCKED')),
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    UNIQUE(schedule_id, seat_id)
-);
+    PRIMARY KEY (schedule_seat_id, schedule_start),
+    UNIQUE(schedule_id, seat_id, schedule_start)
+) PARTITION BY RANGE (schedule_start);
 
 -- Bookings table
 CREATE TABLE bookings (
-    booking_id BIGSERIAL PRIMARY KEY,
+    booking_id BIGSERIAL NOT NULL,
     user_id BIGINT NOT NULL REFERENCES users(user_id) ON DELETE CASCADE,
     event_id BIGINT NOT NULL REFERENCES events(event_id) ON DELETE CASCADE,
     schedule_id BIGINT REFERENCES schedules(schedule_id) ON DELETE CASCADE, -- NULL if one-time event
     event_seat_id BIGINT REFERENCES event_seats(event_seat_id) ON DELETE CASCADE, -- NULL if recurring
+    inventory_id BIGINT REFERENCES schedule_inventory(inventory_id) ON DELETE CASCADE, -- general admission
+    quantity INTEGER, -- general-admission tickets, NULL for seated bookings
+    schedule_start TIMESTAMP NOT NULL, -- schedule (or one-time event) start
     amount DECIMAL(10,2) NOT NULL,
     status VARCHAR(20) NOT NULL DEFAULT 'PENDING' CHECK (status IN ('PENDING', 'CONFIRMED', 'CANCELLED')),
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-);
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (booking_id, schedule_start)
+) PARTITION BY RANGE (schedule_start);
+
+-- Partitions for this month and the next three (partitions.py keeps extending this)
+DO $$
+DECLARE
+    month DATE;
+    partitioned TEXT;
+BEGIN
+    FOR i IN 0..3 LOOP
+        month := date_trunc('month', CURRENT_DATE) + make_interval(months => i);
+        FOREACH partitioned IN ARRAY ARRAY['schedule_seats', 'bookings'] LOOP
+            EXECUTE format(
+                'CREATE TABLE IF NOT EXISTS %I PARTITION OF %I FOR VALUES FROM (%L) TO (%L)',
+                partitioned || '_p' || to_char(month, 'YYYYMM'), partitioned, month, month + INTERVAL '1 month'
+            );
+        END LOOP;
+    END LOOP;
+END $$;
 
 -- Booking Seats table (junction table for booking and seats)
 CREATE TABLE booking_seats (
     booking_seat_id BIGSERIAL PRIMARY KEY,
-    booking_id BIGINT NOT NULL REFERENCES bookings(booking_id) ON DELETE CASCADE,
+    booking_id BIGINT NOT NULL, -- bookings.booking_id
     event_seat_id BIGINT REFERENCES event_seats(event_seat_id) ON DELETE CASCADE, -- for one-time event
-    schedule_seat_id BIGINT REFERENCES schedule_seats(schedule_seat_id) ON DELETE CASCADE, -- for recurring
+    schedule_seat_id BIGINT, -- for recurring: schedule_seats.schedule_seat_id
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     CHECK ((event_seat_id IS NOT NULL AND schedule_seat_id IS NULL) OR 
            (event_seat_id IS NULL AND schedule_seat_id IS NOT NULL))
@@ -122,7 +167,7 @@ CREATE TABLE booking_seats (
 -- Payments table
 CREATE TABLE payments (
     payment_id BIGSERIAL PRIMARY KEY,
-    booking_id BIGINT NOT NULL REFERENCES bookings(booking_id) ON DELETE CASCADE,
+    booking_id BIGINT NOT NULL, -- bookings.booking_id
     amount DECIMAL(10,2) NOT NULL,
     payment_method VARCHAR(20) NOT NULL CHECK (payment_method IN ('UPI', 'CARD', 'NETBANKING', 'WALLET')),
     status VARCHAR(20) NOT NULL DEFAULT 'PENDING' CHECK (status IN ('SUCCESS', 'FAILED', 'PENDING')),
@@ -142,7 +187,7 @@ CREATE INDEX idx_event_seats_event_id ON event_seats(event_id);
 CREATE INDEX idx_event_seats_venue_id ON event_seats(venue_id);
 CREATE INDEX idx_event_seats_status ON event_seats(status);
 CREATE INDEX idx_schedules_event_id ON schedules(event_id);
-CREATE INDEX idx_schedules_venue_id ON schedules(venue_id);
+CREATE INDEX idx_schedules_venue_start ON schedules(venue_id, start_time);
 CREATE INDEX idx_schedule_seats_schedule_id ON schedule_seats(schedule_id);
 CREATE INDEX idx_schedule_seats_status ON schedule_seats(status);
 CREATE INDEX idx_bookings_user_id ON bookings(user_id);
@@ -150,6 +195,7 @@ CREATE INDEX idx_bookings_event_id ON bookings(event_id);
 CREATE INDEX idx_bookings_status ON bookings(status);
 CREATE INDEX idx_bookings_created_at ON bookings(created_at);
 CREATE INDEX idx_booking_seats_booking_id ON booking_seats(booking_id);
+CREATE INDEX idx_booking_seats_schedule_seat_id ON booking_seats(schedule_seat_id);
 CREATE INDEX idx_payments_booking_id ON payments(booking_id);
 CREATE INDEX idx_payments_status ON payments(status);
 
@@ -169,6 +215,7 @@ CREATE TRIGGER update_seats_updated_at BEFORE UPDATE ON seats FOR EACH ROW EXECU
 CREATE TRIGGER update_events_updated_at BEFORE UPDATE ON events FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
 CREATE TRIGGER update_event_seats_updated_at BEFORE UPDATE ON event_seats FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
 CREATE TRIGGER update_schedules_updated_at BEFORE UPDATE ON schedules FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
+CREATE TRIGGER update_schedule_inventory_updated_at BEFORE UPDATE ON schedule_inventory FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
 CREATE TRIGGER update_schedule_seats_updated_at BEFORE UPDATE ON schedule_seats FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
 CREATE TRIGGER update_bookings_updated_at BEFORE UPDATE ON bookings FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
 CREATE TRIGGER update_payments_updated_at BEFORE UPDATE ON payments FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
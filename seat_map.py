@@ -0,0 +1,106 @@
+"""
+Compact seat-map encodings for get_schedule_seats.
+
+The default seat map is a list of objects that repeats every key for every
+seat. The columnar form sends one array per field, dictionary-encodes
+seat_type/status and replaces per-seat prices with an index into a short
+list of price tiers.
+"""
+import msgpack
+
+JSON_MEDIA_TYPE = "application/json"
+COLUMNAR_MEDIA_TYPE = "application/vnd.epicly.seatmap+json"
+MSGPACK_MEDIA_TYPE = "application/vnd.epicly.seatmap+msgpack"
+
+FORMAT_JSON = "json"
+FORMAT_COLUMNAR = "columnar"
+FORMAT_MSGPACK = "msgpack"
+
+_ACCEPT_FORMATS = {
+    COLUMNAR_MEDIA_TYPE: FORMAT_COLUMNAR,
+    MSGPACK_MEDIA_TYPE: FORMAT_MSGPACK,
+    "application/msgpack": FORMAT_MSGPACK,
+    "application/x-msgpack": FORMAT_MSGPACK,
+}
+
+
+def negotiate_format(format: str = None, accept: str = None) -> str:
+    """Pick the seat-map format from ?format= first, then the Accept header."""
+    if format:
+        format = format.lower()
+        if format not in (FORMAT_JSON, FORMAT_COLUMNAR, FORMAT_MSGPACK):
+            raise ValueError(f"Unknown seat map format '{format}'")
+        return format
+
+    if accept:
+        for media_range in accept.split(","):
+            media_type = media_range.split(";")[0].strip().lower()
+            if media_type in _ACCEPT_FORMATS:
+                return _ACCEPT_FORMATS[media_type]
+
+    return FORMAT_JSON
+
+
+def _dictionary_encode(values):
+    dictionary = []
+    positions = {}
+    codes = []
+    for value in values:
+        code = positions.get(value)
+        if code is None:
+            code = positions[value] = len(dictionary)
+            dictionary.append(value)
+        codes.append(code)
+    return dictionary, codes
+
+
+def encode_columnar(seats) -> dict:
+    """
+    Build the columnar seat map from rows with seat_id, row_label, seat_number,
+    seat_type, base_price and status attributes, keeping the input order.
+    """
+    seat_types, seat_type_codes = _dictionary_encode(seat.seat_type for seat in seats)
+    statuses, status_codes = _dictionary_encode(seat.status for seat in seats)
+    price_tiers, price_tier_codes = _dictionary_encode(str(seat.base_price) for seat in seats)
+
+    return {
+        "format": FORMAT_COLUMNAR,
+        "count": len(seats),
+        "seat_id": [seat.seat_id for seat in seats],
+        "row_label": [seat.row_label for seat in seats],
+        "seat_number": [seat.seat_number for seat in seats],
+        "seat_type": {"values": seat_types, "codes": seat_type_codes},
+        "status": {"values": statuses, "codes": status_codes},
+        "price_tiers": price_tiers,
+        "price_tier": price_tier_codes,
+    }
+
+
+def decode_columnar(payload: dict) -> list:
+    """Expand a columnar seat map back into the per-seat JSON shape."""
+    seat_types = payload["seat_type"]["values"]
+    statuses = payload["status"]["values"]
+    price_tiers = payload["price_tiers"]
+
+    return [
+        {
+            "seat_id": seat_id,
+            "row_label": row_label,
+            "seat_number": seat_number,
+            "seat_type": seat_types[seat_type_code],
+            "base_price": price_tiers[price_tier_code],
+            "status": statuses[status_code],
+        }
+        for seat_id, row_label, seat_number, seat_type_code, price_tier_code, status_code in zip(
+            payload["seat_id"],
+            payload["row_label"],
+            payload["seat_number"],
+            payload["seat_type"]["codes"],
+            payload["price_tier"],
+            payload["status"]["codes"],
+        )
+    ]
+
+
+def pack_msgpack(payload: dict) -> bytes:
+    return msgpack.packb(payload, use_bin_type=True)
@@ -6,8 +6,9 @@ from decimal import Decimal
 from sqlalchemy.orm import Session
 
 from database import SessionLocal, create_tables
+from partitions import ensure_partitions
 from models import (
-    User, Venue, Section, Seat, Event, Schedule, ScheduleSeat,
+    User, Venue, Section, Seat, Event, Schedule, ScheduleSeat, ScheduleInventory,
     EventType, SeatType, SeatStatus
 )
 
@@ -21,6 +22,7 @@ def seed_database():
         
         # Clear existing data (for development)
         db.query(ScheduleSeat).delete()
+        db.query(ScheduleInventory).delete()
         db.query(Schedule).delete()
         db.query(Seat).delete()
         db.query(Section).delete()
@@ -46,7 +48,9 @@ def seed_database():
                 capacity=200,
                 address="Phoenix Marketcity, Whitefield Road, Bangalore",
                 city="Bangalore",
-                state="Karnataka"
+                state="Karnataka",
+                latitude=12.9975,
+                longitude=77.6966
             ),
             Venue(
                 name="Inox Forum Mall",
@@ -54,7 +58,9 @@ def seed_database():
                 capacity=150,
                 address="Forum Mall, Koramangala, Bangalore",
                 city="Bangalore",
-                state="Karnataka"
+                state="Karnataka",
+                latitude=12.9346,
+                longitude=77.6113
             ),
             Venue(
                 name="Kanteerava Stadium",
@@ -62,7 +68,9 @@ def seed_database():
                 capacity=25000,
                 address="Kanteerava Stadium, Bangalore",
                 city="Bangalore",
-                state="Karnataka"
+                state="Karnataka",
+                latitude=12.9698,
+                longitude=77.5933
             ),
             Venue(
                 name="Palace Grounds",
@@ -70,7 +78,9 @@ def seed_database():
                 capacity=50000,
                 address="Palace Grounds, Bangalore",
                 city="Bangalore",
-                state="Karnataka"
+                state="Karnataka",
+                latitude=12.9984,
+                longitude=77.5921
             ),
         ]
         db.add_all(venues)
@@ -282,6 +292,27 @@ def seed_database():
         db.add_all(schedules)
         db.commit()
         
+        # General admission for the concert's standing area: one capacity counter, no seat rows
+        general_section = sections[9]
+        db.add(ScheduleInventory(
+            schedule_id=schedules[-1].schedule_id,
+            section_id=general_section.section_id,
+            tier=SeatType.GENERAL.value,
+            price=Decimal('1000.00'),
+            capacity=general_section.capacity,
+            available=general_section.capacity
+        ))
+        db.commit()
+        
+        # schedule_seats is partitioned by schedule start month; make sure every seeded month has one
+        if db.get_bind().dialect.name == "postgresql":
+            ensure_partitions(
+                db.connection(),
+                min(schedule.start_time for schedule in schedules),
+                max(schedule.start_time for schedule in schedules)
+            )
+            db.commit()
+        
         # Create schedule seats (link seats to schedules with availability)
         schedule_seats = []
         
@@ -293,6 +324,7 @@ def seed_database():
                 schedule_seats.append(ScheduleSeat(
                     schedule_id=schedule.schedule_id,
                     seat_id=seat.seat_id,
+                    schedule_start=schedule.start_time,
                     status=SeatStatus.AVAILABLE.value
                 ))
         
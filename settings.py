@@ -31,10 +31,22 @@ class Settings:
             self.DB_SSL_MODE = None
             self.DB_SSL_CERT = None
         
+        # "psycopg2" (default) or "psycopg" (psycopg 3: server-side prepared statements + pipeline mode),
+        # or "sqlite" for the embedded mode (local benchmarks and checks) on SQLITE_PATH
+        self.DB_DRIVER = os.getenv("DB_DRIVER", "psycopg2").lower()
+        if self.DB_DRIVER not in ("psycopg2", "psycopg", "sqlite"):
+            raise ValueError(f"Unsupported DB_DRIVER '{self.DB_DRIVER}'")
+        self.SQLITE_PATH = os.getenv("SQLITE_PATH", ":memory:")
+        # psycopg 3 prepares a statement server-side after it has run this many times on a connection
+        self.DB_PREPARE_THRESHOLD = int(os.getenv("DB_PREPARE_THRESHOLD", 2))
+        
         self.SERVER_HOST = os.getenv(f"{env_prefix}SERVER_HOST", "localhost" if self.is_development else "0.0.0.0")
         self.SERVER_PORT = int(os.getenv(f"{env_prefix}SERVER_PORT", 8000))
         
         self.SECRET_KEY = os.getenv(f"{env_prefix}SECRET_KEY", "dev-secret-key" if self.is_development else "")
+        if not self.SECRET_KEY:
+            # Fail at startup rather than with a 500 on the first login or token check
+            raise ValueError(f"{env_prefix}SECRET_KEY must be set (it signs session tokens)")
         allowed_hosts_str = os.getenv(f"{env_prefix}ALLOWED_HOSTS", "localhost,127.0.0.1" if self.is_development else "*")
         self.ALLOWED_HOSTS = [host.strip() for host in allowed_hosts_str.split(",")]
         
@@ -42,15 +54,123 @@ class Settings:
         self.LOG_LEVEL = os.getenv(f"{env_prefix}LOG_LEVEL", "DEBUG" if self.is_development else "INFO")
         
         self.AWS_REGION = os.getenv("AWS_REGION", "us-east-1") if self.is_production else None
-        
-    def get_database_url(self) -> str:
+
+        # Response compression (bytes / brotli quality 0-11 / gzip level 1-9)
+        self.COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", 1024))
+        self.BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", 4))
+        self.GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", 6))
+
+        # Entity cache (entries per entity / TTL in seconds)
+        self.CACHE_MAXSIZE = int(os.getenv("CACHE_MAXSIZE", 10000))
+        self.CACHE_TTL_EVENT = float(os.getenv("CACHE_TTL_EVENT", 300))
+        self.CACHE_TTL_SCHEDULE = float(os.getenv("CACHE_TTL_SCHEDULE", 120))
+        self.CACHE_TTL_USER = float(os.getenv("CACHE_TTL_USER", 60))
+        self.CACHE_TTL_VENUE = float(os.getenv("CACHE_TTL_VENUE", 3600))
+        self.CACHE_LAYOUT_MAXSIZE = int(os.getenv("CACHE_LAYOUT_MAXSIZE", 64))
+        # Directory of mmap'd seat layout files (layout_store.py) shared by all workers; empty = per-process cache
+        self.LAYOUT_STORE_DIR = os.getenv("LAYOUT_STORE_DIR", "")
+
+        # Venue proximity index: grid cell size in degrees (0.1 is ~11 km of latitude)
+        self.GEO_GRID_CELL_DEGREES = float(os.getenv("GEO_GRID_CELL_DEGREES", 0.1))
+
+        # Faceted browse counts on /events?facets=true: seconds before the facet index is rebuilt
+        self.FACETS_TTL = float(os.getenv("FACETS_TTL", 60))
+
+        # Materialized (city, day) listing behind /events?city=&date=: seconds before a full rebuild
+        self.LISTING_TTL = float(os.getenv("LISTING_TTL", 3600))
+
+        # Request coalescing: max seconds a request waits on a shared in-flight read
+        self.SINGLEFLIGHT_WAIT_TIMEOUT = float(os.getenv("SINGLEFLIGHT_WAIT_TIMEOUT", 10))
+
+        # POST /batch runs up to this many of its reads at once, each on its own session (pool connection)
+        self.BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", 4))
+
+        # Group commit for /seats/lock: collect a schedule's lock requests for this many ms, up to LOCK_BATCH_MAX
+        self.LOCK_BATCHING = os.getenv("LOCK_BATCHING", "false").lower() == "true"
+        self.LOCK_BATCH_WINDOW_MS = float(os.getenv("LOCK_BATCH_WINDOW_MS", 2))
+        self.LOCK_BATCH_MAX = int(os.getenv("LOCK_BATCH_MAX", 256))
+
+        # In-memory seat inventory (inventory_engine.py) for this worker's shard of schedules,
+        # optionally only the listed ones; transitions are fsynced to INVENTORY_WAL_DIR
+        self.INVENTORY_ENGINE = os.getenv("INVENTORY_ENGINE", "false").lower() == "true"
+        self.INVENTORY_ENGINE_SCHEDULES = [
+            int(schedule_id) for schedule_id in os.getenv("INVENTORY_ENGINE_SCHEDULES", "").split(",") if schedule_id.strip()
+        ]
+        self.INVENTORY_SHARD = int(os.getenv("INVENTORY_SHARD", 0))
+        self.INVENTORY_SHARDS = int(os.getenv("INVENTORY_SHARDS", 1))
+        self.INVENTORY_WAL_DIR = os.getenv("INVENTORY_WAL_DIR", "inventory_wal")
+        self.INVENTORY_FLUSH_INTERVAL_MS = float(os.getenv("INVENTORY_FLUSH_INTERVAL_MS", 200))
+
+        # Signed session tokens from /users/login; with REQUIRE_SESSION_TOKEN, raw user_ids are refused
+        self.SESSION_TOKEN_TTL = int(os.getenv("SESSION_TOKEN_TTL", 7 * 24 * 3600))
+        self.REQUIRE_SESSION_TOKEN = os.getenv("REQUIRE_SESSION_TOKEN", "false").lower() == "true"
+        # /admin routes need an "X-Admin-Token: <ADMIN_TOKEN>" header; without ADMIN_TOKEN they are
+        # open in development and disabled in production
+        self.ADMIN_TOKEN = os.getenv(f"{env_prefix}ADMIN_TOKEN", "")
+
+        # Read responses (events, event details, schedules) are cached RESPONSE_CACHE_TTL seconds and,
+        # while revalidating or when the database is failing, served up to RESPONSE_STALE_TTL old
+        self.RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", 5))
+        self.RESPONSE_STALE_TTL = float(os.getenv("RESPONSE_STALE_TTL", 600))
+        self.RESPONSE_CACHE_MAXSIZE = int(os.getenv("RESPONSE_CACHE_MAXSIZE", 5000))
+        # Database circuit breaker: consecutive failures to open it, seconds before a probe
+        self.DB_BREAKER_THRESHOLD = int(os.getenv("DB_BREAKER_THRESHOLD", 5))
+        self.DB_BREAKER_RESET = float(os.getenv("DB_BREAKER_RESET", 10))
+
+        # Request deadlines: per-route latency budgets ("METHOD /path=ms", comma-separated; others get
+        # REQUEST_BUDGET_MS) become statement_timeout on the request's transactions; lock waits are capped
+        # at LOCK_TIMEOUT_MS. Timeouts answer 503, lock timeouts 409.
+        self.REQUEST_BUDGET_MS = float(os.getenv("REQUEST_BUDGET_MS", 10000))
+        self.ROUTE_BUDGETS_MS = {
+            route.strip(): float(budget)
+            for route, _, budget in (
+                entry.rpartition("=") for entry in os.getenv(
+                    "ROUTE_BUDGETS_MS",
+                    "POST /seats/lock=2000,POST /bookings=3000,POST /payments=5000,POST /admin/schedules/generate=120000"
+                ).split(",") if entry.strip()
+            )
+        }
+        self.LOCK_TIMEOUT_MS = float(os.getenv("LOCK_TIMEOUT_MS", 500))
+
+        # Traffic capture for replay.py: sanitized request records appended to CAPTURE_PATH (rotated to
+        # CAPTURE_PATH.1 at CAPTURE_MAX_BYTES) for a CAPTURE_SAMPLE fraction of requests
+        self.CAPTURE_ENABLED = os.getenv("CAPTURE_ENABLED", "false").lower() == "true"
+        self.CAPTURE_PATH = os.getenv("CAPTURE_PATH", "captures/requests.jsonl")
+        self.CAPTURE_MAX_BYTES = int(os.getenv("CAPTURE_MAX_BYTES", 100 * 1024 * 1024))
+        self.CAPTURE_SAMPLE = float(os.getenv("CAPTURE_SAMPLE", 1.0))
+        self.CAPTURE_QUEUE_SIZE = int(os.getenv("CAPTURE_QUEUE_SIZE", 10000))
+        self.CAPTURE_EXCLUDE = [path.strip() for path in os.getenv("CAPTURE_EXCLUDE", "/metrics,/health").split(",") if path.strip()]
+
+        # Slow-query log: threshold in ms, fraction of slow read-only SELECTs to EXPLAIN ANALYZE (each
+        # capped at SLOW_QUERY_EXPLAIN_TIMEOUT_MS), ring buffer size
+        self.SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", 200))
+        self.SLOW_QUERY_EXPLAIN_SAMPLE = float(os.getenv("SLOW_QUERY_EXPLAIN_SAMPLE", 0.1))
+        self.SLOW_QUERY_EXPLAIN_TIMEOUT_MS = int(os.getenv("SLOW_QUERY_EXPLAIN_TIMEOUT_MS", 5000))
+        self.SLOW_QUERY_BUFFER_SIZE = int(os.getenv("SLOW_QUERY_BUFFER_SIZE", 200))
+
+        # On-demand request profiling (non-production only): stack sampling interval
+        self.PROFILE_SAMPLE_INTERVAL_MS = float(os.getenv("PROFILE_SAMPLE_INTERVAL_MS", 1))
+
+        # Monthly partitions of schedule_seats/bookings: months created ahead, months kept attached, archive schema
+        self.PARTITION_MONTHS_AHEAD = int(os.getenv("PARTITION_MONTHS_AHEAD", 3))
+        self.PARTITION_RETENTION_MONTHS = int(os.getenv("PARTITION_RETENTION_MONTHS", 12))
+        self.PARTITION_ARCHIVE_SCHEMA = os.getenv("PARTITION_ARCHIVE_SCHEMA", "archive")
+
+        # Startup warm-up: pool pre-fill, hot queries and cache preload before /health reports ready
+        self.WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "true").lower() == "true"
+        self.WARMUP_PRELOAD_DAYS = int(os.getenv("WARMUP_PRELOAD_DAYS", 7))
+
+    def get_database_url(self, driver: str = None) -> str:
+        if (driver or self.DB_DRIVER) == "sqlite":
+            return "sqlite://" if self.SQLITE_PATH == ":memory:" else f"sqlite:///{self.SQLITE_PATH}"
+        scheme = "postgresql+psycopg" if (driver or self.DB_DRIVER) == "psycopg" else "postgresql"
         if self.is_production:
-            url = f"postgresql://{self.DB_USER}:{self.DB_PASSWORD}@{self.DB_HOST}:{self.DB_PORT}/{self.DB_NAME}"
+            url = f"{scheme}://{self.DB_USER}:{self.DB_PASSWORD}@{self.DB_HOST}:{self.DB_PORT}/{self.DB_NAME}"
             if self.DB_SSL_MODE:
                 url += f"?sslmode={self.DB_SSL_MODE}"
             return url
         else:
-            return f"postgresql://{self.DB_USER}:{self.DB_PASSWORD}@{self.DB_HOST}:{self.DB_PORT}/{self.DB_NAME}"
+            return f"{scheme}://{self.DB_USER}:{self.DB_PASSWORD}@{self.DB_HOST}:{self.DB_PORT}/{self.DB_NAME}"
     
     def __repr__(self):
         return f"Settings(environment={self.ENVIRONMENT}, debug={self.DEBUG})"
@@ -0,0 +1,65 @@
+"""
+Request coalescing (single-flight) for read endpoints.
+
+Concurrent requests with the same key share one in-flight execution: the
+first caller starts it, everyone else awaits the same result (or the same
+exception). Waiting is bounded, and a caller that gives up does not cancel
+the shared work for the others.
+"""
+import asyncio
+
+from fastapi import Request
+
+
+def request_key(request: Request, *extra):
+    """Route template + path params + normalized (sorted, non-empty) query params."""
+    route = request.scope.get("route")
+    return (
+        getattr(route, "path", request.url.path),
+        tuple(sorted(request.path_params.items())),
+        tuple(sorted((k, v) for k, v in request.query_params.multi_items() if v != "")),
+    ) + extra
+
+
+class SingleFlight:
+    def __init__(self, wait_timeout: float):
+        self.wait_timeout = wait_timeout
+        self._inflight = {}
+        self.requests = 0
+        self.executions = 0
+        self.errors = 0
+        self.timeouts = 0
+
+    async def do(self, key, fn):
+        """Run fn() (a coroutine function) once per key among concurrent callers."""
+        self.requests += 1
+        task = self._inflight.get(key)
+        if task is None:
+            self.executions += 1
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._finished(key, done))
+
+        try:
+            return await asyncio.wait_for(asyncio.shield(task), self.wait_timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise
+
+    def _finished(self, key, task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled() and task.exception() is not None:
+            self.errors += 1
+
+    def stats(self):
+        collapsed = self.requests - self.executions
+        return {
+            "requests": self.requests,
+            "executions": self.executions,
+            "collapsed": collapsed,
+            "collapse_ratio": round(collapsed / self.requests, 4) if self.requests else None,
+            "errors": self.errors,
+            "timeouts": self.timeouts,
+            "in_flight": len(self._inflight),
+        }
@@ -0,0 +1,128 @@
+"""
+Startup warm-up.
+
+Opens the pool's connections up front, runs each hot query on every one of
+them (so SQLAlchemy's compiled cache and, with psycopg 3, the per-connection
+prepared statements are populated) and preloads upcoming schedules and their
+section layouts into the entity caches. /health reports 503 until it ends.
+"""
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+import geo
+import cache
+import layout_store
+from database import engine, session_scope
+from models import Event, Schedule, ScheduleSeat, Venue, Section
+from settings import settings
+
+logger = logging.getLogger("uvicorn.error")
+
+state = {
+    "ready": not settings.WARMUP_ENABLED,
+    "duration_ms": None,
+    "steps": {},
+    "error": None,
+}
+
+
+def pool_capacity() -> int:
+    size = getattr(engine.pool, "size", None)
+    return size() if callable(size) else 1
+
+
+def preload_caches(db: Session):
+    now = datetime.now()
+    upcoming = db.query(Schedule).filter(
+        Schedule.start_time > now,
+        Schedule.start_time < now + timedelta(days=settings.WARMUP_PRELOAD_DAYS)
+    ).all()
+
+    for schedule in upcoming:
+        cache.schedules.set(schedule.schedule_id, cache.snapshot(schedule))
+
+    event_ids = {schedule.event_id for schedule in upcoming}
+    for event in db.query(Event).filter(Event.event_id.in_(event_ids)).all() if event_ids else []:
+        cache.events.set(event.event_id, cache.snapshot(event))
+    for venue in db.query(Venue).all():
+        cache.venues.set(venue.venue_id, cache.snapshot(venue))
+    for section in db.query(Section).all():
+        cache.sections.set(section.section_id, cache.snapshot(section))
+
+    geo.venue_grid(db)
+    
+    section_ids = sorted({schedule.section_id for schedule in upcoming})
+    if settings.LAYOUT_STORE_DIR:
+        # Missing or stale files on this host are (re)written, atomically, so racing workers are harmless
+        layout_store.build_layouts(db, section_ids)
+    else:
+        for section_id in section_ids[:settings.CACHE_LAYOUT_MAXSIZE]:
+            cache.section_layouts.set(section_id, cache.load_section_layout(db, section_id))
+
+    return upcoming[0] if upcoming else None
+
+
+def run_hot_queries(db: Session, sample: Schedule):
+    # Imported here because api imports this module for /health
+    from api import fetch_event_schedules, fetch_schedule_seats
+
+    in_schedule = (ScheduleSeat.schedule_id == sample.schedule_id, ScheduleSeat.schedule_start == sample.start_time)
+    seat_id = db.query(ScheduleSeat.seat_id).filter(*in_schedule).limit(1).scalar()
+
+    for _ in range(max(settings.DB_PREPARE_THRESHOLD, 1)):
+        fetch_schedule_seats(db, sample.schedule_id)
+        fetch_event_schedules(db, sample.event_id, None, None, None)
+        db.query(Event).distinct().all()
+        db.query(ScheduleSeat).filter(*in_schedule, ScheduleSeat.seat_id.in_([seat_id])).all()
+        db.rollback()
+
+
+def warm_connections(sample: Schedule):
+    """Check out every pool connection at once, so each one is really opened, and warm it."""
+    count = pool_capacity()
+    all_open = threading.Barrier(count)
+
+    def warm_one(_):
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+            all_open.wait(timeout=30)
+            if sample is not None:
+                with Session(bind=connection) as db:
+                    run_hot_queries(db, sample)
+
+    with ThreadPoolExecutor(max_workers=count) as executor:
+        list(executor.map(warm_one, range(count)))
+    return count
+
+
+def warm_up():
+    started = time.perf_counter()
+    try:
+        step_started = time.perf_counter()
+        with session_scope() as db:
+            sample = preload_caches(db)
+        state["steps"]["preload_ms"] = round((time.perf_counter() - step_started) * 1000, 1)
+
+        step_started = time.perf_counter()
+        state["steps"]["connections"] = warm_connections(sample)
+        state["steps"]["connections_ms"] = round((time.perf_counter() - step_started) * 1000, 1)
+    except Exception as e:
+        # A failed warm-up only means a colder start; never keep the instance out of rotation for it
+        state["error"] = str(e)
+        logger.warning("Warm-up failed: %s", e)
+    finally:
+        state["duration_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        state["ready"] = True
+        logger.info("Warm-up finished in %.1f ms %s", state["duration_ms"], state["steps"])
+
+
+async def run_warmup():
+    if settings.WARMUP_ENABLED:
+        await asyncio.to_thread(warm_up)